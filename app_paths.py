@@ -0,0 +1,17 @@
+import os
+
+
+def data_dir():
+    """Directory for vlc_tagger's persistent files (indexes, caches, settings)
+
+    Defaults to ~/.vlc_tagger and can be moved with the VLC_TAGGER_HOME
+    environment variable. Created on first use.
+    """
+    path = os.environ.get('VLC_TAGGER_HOME') or os.path.join(os.path.expanduser('~'), '.vlc_tagger')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def data_path(name):
+    """Full path of a file inside the data directory"""
+    return os.path.join(data_dir(), name)
@@ -0,0 +1,111 @@
+import queue
+import threading
+import logging
+
+
+class BackgroundLoader:
+    """Run a batch producer on a worker thread and hand its output to the Tk thread
+
+    The producer is a generator function taking a threading.Event. It yields
+    (items, progress) tuples and should return early once the event is set.
+    Batches are delivered to on_batch from the Tk main loop via widget.after,
+    so callbacks are free to touch widgets.
+    """
+
+    def __init__(self, widget, poll_interval=30, max_batches_per_tick=4):
+        self.logger = logging.getLogger(__name__)
+        self.widget = widget
+        self.poll_interval = poll_interval
+        self.max_batches_per_tick = max_batches_per_tick
+
+        self._cancel_event = None
+        self._queue = None
+        self._after_id = None
+        self._callbacks = None
+
+    def start(self, producer, on_batch, on_done=None, on_progress=None):
+        """Start a new load, cancelling any load still in progress"""
+        self.cancel()
+
+        self._cancel_event = threading.Event()
+        # Bounded so a fast producer cannot run far ahead of the UI
+        self._queue = queue.Queue(maxsize=64)
+        self._callbacks = (on_batch, on_done, on_progress)
+
+        thread = threading.Thread(
+            target=self._run,
+            args=(producer, self._cancel_event, self._queue),
+            daemon=True
+        )
+        thread.start()
+        self._after_id = self.widget.after(self.poll_interval, self._poll)
+
+    def cancel(self):
+        """Stop the current load; batches not yet delivered are dropped"""
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+            self.logger.debug('Background load cancelled')
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+        self._cancel_event = None
+        self._queue = None
+        self._after_id = None
+        self._callbacks = None
+
+    def is_running(self):
+        return self._cancel_event is not None
+
+    def _run(self, producer, cancel_event, out_queue):
+        error = None
+        try:
+            for batch in producer(cancel_event):
+                if cancel_event.is_set():
+                    return
+                self._put(out_queue, cancel_event, ('batch', batch))
+        except Exception as e:
+            error = e
+        if not cancel_event.is_set():
+            self._put(out_queue, cancel_event, ('done', error))
+
+    @staticmethod
+    def _put(out_queue, cancel_event, message):
+        # Never block forever on a queue nobody is draining any more
+        while not cancel_event.is_set():
+            try:
+                out_queue.put(message, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _poll(self):
+        self._after_id = None
+        in_queue = self._queue
+        if in_queue is None:
+            return
+        on_batch, on_done, on_progress = self._callbacks
+
+        for _ in range(self.max_batches_per_tick):
+            try:
+                kind, payload = in_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == 'batch':
+                items, progress = payload
+                if items:
+                    on_batch(items)
+                if on_progress is not None and progress is not None:
+                    on_progress(progress)
+            else:
+                self._cancel_event = None
+                self._queue = None
+                self._callbacks = None
+                if on_done is not None:
+                    on_done(payload)
+                return
+
+            # A callback may have started or cancelled a load
+            if self._queue is not in_queue:
+                return
+
+        self._after_id = self.widget.after(self.poll_interval, self._poll)
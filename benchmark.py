@@ -0,0 +1,427 @@
+"""Reproducible benchmarks for the parsing, scanning and navigation hot paths
+
+Generates synthetic M3U/M3U8 playlists and directory trees in a temporary
+directory, times the code paths below and writes the results as JSON:
+
+    python benchmark.py --output bench.json
+    python benchmark.py --baseline bench.json --threshold 1.25
+
+Headless benchmarks (M3U parsing and cache hits, folder scanning, indexed
+lookups, filter search) always run; libvlc instance creation per profile
+in vlc_profiles.json runs when libvlc is installed, and so does track
+switch latency when a folder of real media is given with --switch-media.
+The end-to-end ones
+(window startup, M3UPanel.parse_m3u_file, PlaylistPanel.load_playlist,
+play_file panel resolution, next_track/previous_track) need Tk and run when
+a display is available (e.g. under xvfb-run); libvlc is replaced by a stub
+there so only the application code is measured.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import tracemalloc
+import threading
+import types
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+FULL_SIZES = DEFAULT_SIZES + (1000000,)
+# (depth, subfolders per folder, videos per folder)
+TREE_SHAPES = ((1, 1, 2000), (2, 12, 40), (4, 4, 20))
+
+
+def generate_m3u(path, count, seed=0):
+    """Write an extended M3U mixing relative, absolute and URL entries"""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('#EXTM3U\n#PLAYLIST:Benchmark\n')
+        for i in range(count):
+            kind = rng.random()
+            if kind < 0.5:
+                entry = f'videos/clip_{i:07d}.mp4'
+            elif kind < 0.85:
+                entry = f'/media/library/season_{i % 40:02d}/episode_{i:07d}.mkv'
+            else:
+                entry = f'https://streams.example.com/live/{i:07d}.m3u8'
+            if rng.random() < 0.7:
+                f.write(f'#EXTINF:{rng.randint(30, 7200)},Clip number {i}\n')
+            f.write(entry + '\n')
+
+
+def generate_tree(root, depth, width, files_per_dir):
+    """Create a directory tree of empty video files (plus some non-video noise)"""
+    count = 0
+    stack = [(root, 0)]
+    while stack:
+        folder, level = stack.pop()
+        os.makedirs(folder, exist_ok=True)
+        for i in range(files_per_dir):
+            extension = ('.mp4', '.mkv', '.avi', '.txt')[i % 4]
+            open(os.path.join(folder, f'file_{i:05d}{extension}'), 'w').close()
+            count += extension != '.txt'
+        if level < depth:
+            stack.extend((os.path.join(folder, f'dir_{j:03d}'), level + 1) for j in range(width))
+    return count
+
+
+def timed(func, repeat):
+    """Best and all wall-clock times of repeat calls"""
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - started)
+    return {'seconds': min(runs), 'runs': runs}
+
+
+def traced_bytes(func):
+    """Python heap still allocated by func's return value"""
+    tracemalloc.start()
+    try:
+        result = func()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def plain_playlist(paths):
+    """Baseline for the memory benchmark: path strings in a list plus a path -> position dict"""
+    items = list(paths)
+    return items, {path: i for i, path in enumerate(items)}
+
+
+def bench_headless(workdir, sizes, repeat):
+    from m3u_parser import M3UStreamParser
+    from m3u_cache import M3UCache
+    from folder_scanner import FolderScanner
+    from indexed_playlist import IndexedPlaylist
+    from entry_store import EntryStore
+    from search_index import TrigramIndex, path_tail
+
+    results = {}
+    for size in sizes:
+        playlist = os.path.join(workdir, f'bench_{size}.m3u8')
+        generate_m3u(playlist, size)
+
+        def parse():
+            for _ in M3UStreamParser(playlist)(threading.Event()):
+                pass
+        results[f'm3u_parse/{size}'] = dict(timed(parse, repeat), size=size)
+
+        cache = M3UCache(os.path.join(workdir, 'm3u_cache'))
+        for _ in M3UStreamParser(playlist, cache=cache)(threading.Event()):
+            pass
+
+        def parse_cached():
+            for _ in M3UStreamParser(playlist, cache=cache)(threading.Event()):
+                pass
+        results[f'm3u_cache_hit/{size}'] = dict(timed(parse_cached, repeat), size=size)
+
+        paths = IndexedPlaylist(f'/media/{i:07d}.mp4' for i in range(size))
+        probes = [f'/media/{random.randrange(size):07d}.mp4' for _ in range(1000)]
+
+        def lookup():
+            for path in probes:
+                if path in paths:
+                    paths.index(path)
+        results[f'playlist_lookup_x1000/{size}'] = dict(timed(lookup, repeat), size=size)
+
+        def library_paths():
+            return (f'/media/library/season_{i % 40:02d}/episode_{i:07d}.mkv' for i in range(size))
+        results[f'playlist_memory/{size}'] = {
+            'bytes': traced_bytes(lambda: IndexedPlaylist(library_paths(), store=EntryStore())),
+            'plain_bytes': traced_bytes(lambda: plain_playlist(library_paths())),
+            'size': size,
+        }
+
+        texts = [path_tail(path).lower() for path in paths]
+        index = TrigramIndex()
+
+        def build():
+            index.clear()
+            index.add(texts)
+        results[f'search_index_build/{size}'] = dict(timed(build, repeat), size=size)
+
+        queries = [f'{random.randrange(size):07d}'[:length] for length in range(3, 8) for _ in range(20)]
+
+        def search():
+            for query in queries:
+                [i for i in index.candidates(query) if query in texts[i]]
+        results[f'search_query_x100/{size}'] = dict(timed(search, repeat), size=size)
+
+    for depth, width, files in TREE_SHAPES:
+        tree = os.path.join(workdir, f'tree_{depth}_{width}_{files}')
+        count = generate_tree(tree, depth, width, files)
+        for recursive in (False, True):
+            def scan():
+                for _ in FolderScanner(tree, recursive=recursive)(threading.Event()):
+                    pass
+            key = f'folder_scan/{"recursive" if recursive else "flat"}/d{depth}w{width}f{files}'
+            results[key] = dict(timed(scan, repeat), size=count)
+    return results
+
+
+def bench_vlc_instances(repeat):
+    """Instance plus media player creation for the default arguments and each profile
+
+    This is what window startup paid before the instance became lazy; it is
+    now paid by the first playback instead.
+    """
+    try:
+        import vlc
+        vlc.libvlc_get_version()
+    except (ImportError, OSError, NameError) as e:
+        return {'vlc_instance': {'skipped': f'libvlc unavailable: {e}'}}
+    from vlc_profiles import ProfileConfig
+
+    config = ProfileConfig()
+    variants = [('default', [])] + [(name, config.args(name)) for name in sorted(config.profiles)]
+    results = {}
+    for name, args in variants:
+        def create():
+            instance = vlc.Instance(args)
+            instance.media_player_new().release()
+            instance.release()
+        results[f'vlc_instance/{name}'] = timed(create, repeat)
+    return results
+
+
+def bench_track_switch(media_dir, repeat, dwell=1.0):
+    """Switch latency, play request to MediaPlayerPlaying, without and with the Media cache
+
+    'uncached' is what play_file did before the MediaCache: media_new and
+    set_media on every switch. 'prefetched' takes the media from a
+    MediaCache that prefetched it while the previous file played, as
+    play_file does now. Each file plays for dwell seconds before the next
+    switch, which is when the prefetch runs.
+    """
+    if media_dir is None:
+        return {'track_switch': {'skipped': 'no --switch-media folder given'}}
+    try:
+        import vlc
+        vlc.libvlc_get_version()
+    except (ImportError, OSError, NameError) as e:
+        return {'track_switch': {'skipped': f'libvlc unavailable: {e}'}}
+    from folder_scanner import scan_directory
+    from media_cache import MediaCache
+    from vlc_profiles import ProfileConfig
+
+    files, _ = scan_directory(media_dir)
+    if len(files) < 2:
+        return {'track_switch': {'skipped': f'need at least two media files in {media_dir}'}}
+
+    instance = vlc.Instance(ProfileConfig().args() + ['--vout=dummy', '--aout=dummy'])
+    player = instance.media_player_new()
+    playing = threading.Event()
+    player.event_manager().event_attach(vlc.EventType.MediaPlayerPlaying, lambda event: playing.set())
+    cache = MediaCache(instance)
+
+    def switch(path, cached):
+        playing.clear()
+        started = time.perf_counter()
+        if cached:
+            player.set_media(cache.get(path))
+        else:
+            media = instance.media_new(path)
+            player.set_media(media)
+            media.release()
+        player.play()
+        if not playing.wait(10):
+            raise TimeoutError(f'{path} did not start playing')
+        return time.perf_counter() - started
+
+    results = {}
+    try:
+        for name, cached in (('uncached', False), ('prefetched', True)):
+            runs = []
+            for _ in range(repeat):
+                for position, path in enumerate(files):
+                    runs.append(switch(path, cached))
+                    if cached:
+                        cache.prefetch(files[(position + 1) % len(files)])
+                    time.sleep(dwell)
+            results[f'track_switch/{name}'] = {'seconds': statistics.median(runs), 'best': min(runs),
+                                               'runs': runs, 'size': len(files)}
+    finally:
+        player.stop()
+        cache.clear()
+        player.release()
+        instance.release()
+    return results
+
+
+def install_vlc_stub():
+    """Replace the vlc module with a no-op stub so play_file runs without libvlc
+
+    Getters the app does arithmetic or comparisons on return 0, as libvlc
+    does with no media playing.
+    """
+    numeric = {'get_time', 'get_length', 'get_position', 'get_fps', 'get_rate', 'is_playing'}
+
+    class Stub:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def __getattr__(self, name):
+            if name in numeric:
+                return lambda *args, **kwargs: 0
+            return Stub()
+
+        def __call__(self, *args, **kwargs):
+            return Stub()
+
+    stub = types.ModuleType('vlc')
+    stub.__getattr__ = lambda name: Stub()
+    sys.modules['vlc'] = stub
+
+
+def pump_until(root, done, timeout=600):
+    """Run the Tk loop until done() is true; returns (seconds, longest UI stall)"""
+    started = last = time.perf_counter()
+    longest = 0.0
+    while not done():
+        root.update()
+        now = time.perf_counter()
+        longest = max(longest, now - last)
+        last = now
+        if now - started > timeout:
+            raise TimeoutError('benchmark did not finish')
+    return time.perf_counter() - started, longest
+
+
+def bench_tk(workdir, sizes, repeat):
+    import tkinter as tk
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        return {'skipped': f'no display for Tk: {e}'}
+    root.withdraw()
+
+    install_vlc_stub()
+    from main import SimpleVideoPlayer
+
+    started = time.perf_counter()
+    app = SimpleVideoPlayer(root, probe_urls=False)  # Generated stream URLs must not be probed
+    root.update()
+    results = {'startup_window': {'seconds': time.perf_counter() - started}}
+
+    for size in sizes:
+        playlist = os.path.join(workdir, f'bench_{size}.m3u8')
+        if not os.path.exists(playlist):
+            generate_m3u(playlist, size)
+        runs, stalls = [], []
+        for _ in range(repeat):
+            app.m3u_panel.parse_m3u_file(playlist)
+            seconds, stall = pump_until(root, lambda: not app.m3u_panel.loader.is_running())
+            runs.append(seconds)
+            stalls.append(stall)
+        results[f'parse_m3u_file/{size}'] = {'seconds': min(runs), 'runs': runs,
+                                             'max_ui_stall': max(stalls), 'size': size}
+
+        panel = app.m3u_panel
+        targets = [panel.playlist_files[random.randrange(size)] for _ in range(200)]
+        results[f'play_file_resolution_x200/{size}'] = dict(
+            timed(lambda: [app.play_file(path) for path in targets], repeat), size=size)
+
+        def navigate():
+            app.play_file(panel.playlist_files[size // 2])
+            for _ in range(100):
+                app.next_track()
+            for _ in range(100):
+                app.previous_track()
+        results[f'next_previous_x200/{size}'] = dict(timed(navigate, repeat), size=size)
+
+    for depth, width, files in TREE_SHAPES:
+        tree = os.path.join(workdir, f'tree_{depth}_{width}_{files}')
+        if not os.path.exists(tree):
+            generate_tree(tree, depth, width, files)
+        runs = []
+        for _ in range(repeat):
+            app.playlist_panel.load_playlist(tree, recursive=True)
+            seconds, _ = pump_until(root, lambda: not app.playlist_panel.loader.is_running())
+            runs.append(seconds)
+        results[f'load_playlist/recursive/d{depth}w{width}f{files}'] = {
+            'seconds': min(runs), 'runs': runs, 'size': len(app.playlist_panel.playlist_files)}
+
+    app.on_close()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print ratios against a baseline run; returns the names that regressed"""
+    regressions = []
+    for name, result in sorted(results.items()):
+        base = baseline.get('results', {}).get(name)
+        if not isinstance(result, dict) or not base or 'seconds' not in result:
+            continue
+        ratio = result['seconds'] / base['seconds'] if base['seconds'] else float('inf')
+        flag = ' REGRESSION' if ratio > threshold else ''
+        print(f'{name:55s} {base["seconds"] * 1000:10.2f} ms -> {result["seconds"] * 1000:10.2f} ms'
+              f'  x{ratio:.2f}{flag}')
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default='bench_output.json')
+    parser.add_argument('--baseline', help='previous JSON output to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown ratio counted as a regression')
+    parser.add_argument('--sizes', help='comma separated playlist sizes')
+    parser.add_argument('--full', action='store_true', help='include 1M-entry playlists')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-tk', action='store_true', help='skip the end-to-end Tk benchmarks')
+    parser.add_argument('--switch-media', help='folder of real media files for the track switch latency benchmark')
+    args = parser.parse_args(argv)
+
+    if args.sizes:
+        sizes = tuple(int(size) for size in args.sizes.split(','))
+    else:
+        sizes = FULL_SIZES if args.full else DEFAULT_SIZES
+
+    random.seed(0)
+    workdir = tempfile.mkdtemp(prefix='vlc_tagger_bench_')
+    # Keep the app's indexes and caches away from the real data directory
+    os.environ['VLC_TAGGER_HOME'] = os.path.join(workdir, 'home')
+    try:
+        results = bench_headless(workdir, sizes, args.repeat)
+        results.update(bench_vlc_instances(args.repeat))
+        results.update(bench_track_switch(args.switch_media, args.repeat))
+        if not args.no_tk:
+            results.update({f'tk/{name}': value for name, value in bench_tk(workdir, sizes, args.repeat).items()})
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'sizes': sizes,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f'Wrote {len(results)} results to {args.output}')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
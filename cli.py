@@ -0,0 +1,164 @@
+"""Command-line entry point for vlc_tagger
+
+Batch commands only import what they need, so they start quickly and run
+without a display; tkinter and vlc are imported only when the player window
+is launched (no command, or the 'play' command).
+
+    python cli.py                          # launch the player
+    python cli.py play --profile network   # ... with a libvlc profile from vlc_profiles.json
+    python cli.py validate-m3u a.m3u b.m3u8 ... [--check-urls]
+    python cli.py list-videos FOLDER [--recursive]
+    python cli.py export-tags [--label LABEL] [--file PATH] [--format csv|json]
+"""
+import os
+import sys
+import json
+import argparse
+import threading
+
+
+def validate_m3u(args):
+    """Parse playlists and report entries pointing at missing local files"""
+    from m3u_parser import parse_m3u
+
+    failed = 0
+    for playlist in args.playlists:
+        try:
+            title, entries = parse_m3u(playlist)
+        except OSError as e:
+            print(f'{playlist}: ERROR {e}')
+            failed += 1
+            continue
+
+        missing = []
+        if not args.skip_files:
+            missing = [path for path, _, _ in entries if '://' not in path and not os.path.exists(path)]
+        dead = []
+        if args.check_urls:
+            import asyncio
+            from url_prober import probe_urls
+
+            results = asyncio.run(probe_urls([path for path, _, _ in entries if '://' in path]))
+            dead = [(url, result) for url, result in results.items() if not result.alive]
+        problems = []
+        if missing:
+            problems.append(f'{len(missing)} missing')
+        if dead:
+            problems.append(f'{len(dead)} unreachable')
+        status = ', '.join(problems) or 'OK'
+        print(f'{playlist}: {len(entries)} entries, {status}' + (f' ({title})' if title else ''))
+        for path in missing:
+            print(f'  missing: {path}')
+        for url, result in dead:
+            print(f'  unreachable: {url} ({result.error})')
+        if missing or dead:
+            failed += 1
+    return 1 if failed else 0
+
+
+def list_videos(args):
+    """Print the video files the folder panel would load"""
+    from folder_scanner import FolderScanner, VIDEO_EXTENSIONS
+
+    extensions = tuple(args.ext) if args.ext else VIDEO_EXTENSIONS
+    if args.index:
+        from library_index import LibraryIndex
+
+        library = LibraryIndex()
+        for _ in library.rescan(args.folder, args.recursive, extensions)(threading.Event()):
+            pass
+        paths = library.cached_files(args.folder, args.recursive, extensions)
+        library.close()
+    else:
+        paths = []
+        for batch, _ in FolderScanner(args.folder, args.recursive, extensions)(threading.Event()):
+            paths.extend(batch)
+
+    for path in paths:
+        print(path)
+    return 0
+
+
+def export_tags(args):
+    """Write tags as CSV or JSON to stdout"""
+    import csv
+    from tag_store import TagStore
+
+    store = TagStore()
+    try:
+        if args.file:
+            tags = store.tags_for_file(args.file)
+        else:
+            labels = [args.label] if args.label else store.labels()
+            tags = []
+            for label in labels:
+                for path in store.files_with_label(label):
+                    tags.extend(tag for tag in store.tags_for_file(path) if tag.label == label)
+        if args.label:
+            tags = [tag for tag in tags if tag.label == args.label]
+    finally:
+        store.close()
+
+    if args.format == 'json':
+        json.dump([tag._asdict() for tag in tags], sys.stdout, indent=2)
+        print()
+    else:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(['id', 'path', 'label', 'start_ms', 'end_ms'])
+        writer.writerows(tags)
+    return 0
+
+
+def play(args):
+    """Launch the player window"""
+    import tkinter as tk
+    from log_setup import setup_logging
+    from main import SimpleVideoPlayer
+
+    log_listener = setup_logging()
+    root = tk.Tk()
+    app = SimpleVideoPlayer(root, profile=getattr(args, 'profile', None))
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
+    root.mainloop()
+    log_listener.stop()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='vlc_tagger', description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command')
+
+    command = commands.add_parser('play', help='launch the player (default)')
+    command.add_argument('--profile', help='libvlc instance profile (default: the active one in vlc_profiles.json)')
+    command.set_defaults(func=play)
+
+    command = commands.add_parser('validate-m3u', help='check M3U/M3U8 playlists')
+    command.add_argument('playlists', nargs='+')
+    command.add_argument('--skip-files', action='store_true', help='do not check that local entries exist')
+    command.add_argument('--check-urls', action='store_true', help='check that stream URL entries respond')
+    command.set_defaults(func=validate_m3u)
+
+    command = commands.add_parser('list-videos', help="list a folder's video files")
+    command.add_argument('folder')
+    command.add_argument('-r', '--recursive', action='store_true')
+    command.add_argument('--ext', action='append', help='extension to include (repeatable)')
+    command.add_argument('--index', action='store_true', help='go through the persistent library index')
+    command.set_defaults(func=list_videos)
+
+    command = commands.add_parser('export-tags', help='export tags')
+    command.add_argument('--label')
+    command.add_argument('--file', help='only tags of this media file')
+    command.add_argument('--format', choices=('csv', 'json'), default='csv')
+    command.set_defaults(func=export_tags)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    func = getattr(args, 'func', play)
+    return func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+import os
+from array import array
+
+# Characters a path may be split at: '/' always (URLs), plus the native separator
+_SEPARATORS = tuple({'/', os.sep, os.altsep or '/'})
+
+
+def _basename_start(path):
+    if len(_SEPARATORS) == 1:
+        return path.rfind('/') + 1
+    return max(path.rfind(separator) for separator in _SEPARATORS) + 1
+
+
+class EntryStore:
+    """Deduplicated, reference-counted storage for playlist paths
+
+    A path is stored once, however many playlists contain it, and is
+    referred to by an integer entry id. Directory prefixes (everything up to
+    the last separator) are interned in a table and basenames are packed
+    into one UTF-8 buffer, so an entry costs a directory id, the offsets
+    of its basename, its hash and a reference count in array-backed
+    columns, plus the encoded basename itself; no per-entry Python objects
+    are kept. Lookup by path goes through an open-addressing table of entry
+    ids keyed by that hash instead of a dict of path strings. Full paths
+    are rebuilt on demand.
+
+    add() takes a reference and release() drops one; an entry nobody
+    references is unlinked and its id reused, and the basename buffer is
+    compacted once most of it is dead, so the store only holds what the
+    live playlists refer to. Like the panels, it is only used from the Tk
+    thread.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self.directories = []  # None where a directory id is free
+        self._directory_ids = {}
+        self._directory_refs = array('I')
+        self._free_directories = []
+        self.directory_ids = array('I')
+        self._names = bytearray()
+        self._name_starts = array('Q')
+        self._name_ends = array('Q')
+        self._hashes = array('q')
+        self._refs = array('I')
+        self._free = array('I')  # Released entry ids, reused by add()
+        self._live = 0
+        self._dead_bytes = 0
+        self._table = array('i', [-1]) * 1024
+        self._mask = len(self._table) - 1
+
+    def __len__(self):
+        return self._live
+
+    def add(self, path):
+        """Entry id of path, storing it first if it is new; takes a reference"""
+        path_hash = hash(path)
+        slot = self._probe(path, path_hash)
+        entry_id = self._table[slot]
+        if entry_id >= 0:
+            self._refs[entry_id] += 1
+            return entry_id
+
+        split = _basename_start(path)
+        directory_id = self._add_directory(path[:split])
+        name = path[split:].encode('utf-8', errors='surrogateescape')
+        start = len(self._names)
+        self._names += name
+        if self._free:
+            entry_id = self._free.pop()
+            self.directory_ids[entry_id] = directory_id
+            self._name_starts[entry_id] = start
+            self._name_ends[entry_id] = len(self._names)
+            self._hashes[entry_id] = path_hash
+            self._refs[entry_id] = 1
+        else:
+            entry_id = len(self._refs)
+            self.directory_ids.append(directory_id)
+            self._name_starts.append(start)
+            self._name_ends.append(len(self._names))
+            self._hashes.append(path_hash)
+            self._refs.append(1)
+        self._table[slot] = entry_id
+        self._live += 1
+        if self._live * 2 > len(self._table):
+            self._grow()
+        return entry_id
+
+    def release(self, entry_id):
+        """Drop one reference; the entry is removed with its last one"""
+        refs = self._refs[entry_id] - 1
+        self._refs[entry_id] = refs
+        if not refs:
+            self._remove(entry_id)
+
+    def release_many(self, entry_ids):
+        refs = self._refs
+        for entry_id in entry_ids:
+            count = refs[entry_id] - 1
+            refs[entry_id] = count
+            if not count:
+                self._remove(entry_id)
+
+    def find(self, path):
+        """Entry id of path, or -1 if it is not stored"""
+        return self._table[self._probe(path, hash(path))]
+
+    def name(self, entry_id):
+        return self._names[self._name_starts[entry_id]:self._name_ends[entry_id]].decode(
+            'utf-8', errors='surrogateescape')
+
+    def path(self, entry_id):
+        return self.directories[self.directory_ids[entry_id]] + self.name(entry_id)
+
+    def _add_directory(self, directory):
+        directory_id = self._directory_ids.get(directory)
+        if directory_id is None:
+            if self._free_directories:
+                directory_id = self._free_directories.pop()
+                self.directories[directory_id] = directory
+            else:
+                directory_id = len(self.directories)
+                self.directories.append(directory)
+                self._directory_refs.append(0)
+            self._directory_ids[directory] = directory_id
+        self._directory_refs[directory_id] += 1
+        return directory_id
+
+    def _remove(self, entry_id):
+        self._unlink(self._probe(self.path(entry_id), self._hashes[entry_id]))
+        self._live -= 1
+        if not self._live:
+            self._reset()  # Nothing left: give every column back
+            return
+
+        directory_id = self.directory_ids[entry_id]
+        self._directory_refs[directory_id] -= 1
+        if not self._directory_refs[directory_id]:
+            del self._directory_ids[self.directories[directory_id]]
+            self.directories[directory_id] = None
+            self._free_directories.append(directory_id)
+
+        self._dead_bytes += self._name_ends[entry_id] - self._name_starts[entry_id]
+        self._name_starts[entry_id] = self._name_ends[entry_id] = 0
+        self._free.append(entry_id)
+        if self._dead_bytes > 65536 and self._dead_bytes * 2 > len(self._names):
+            self._compact()
+
+    def _probe(self, path, path_hash):
+        """Slot holding path, or the empty slot where it would go"""
+        table, hashes, mask = self._table, self._hashes, self._mask
+        slot = path_hash & mask
+        while True:
+            entry_id = table[slot]
+            if entry_id < 0 or (hashes[entry_id] == path_hash and self.path(entry_id) == path):
+                return slot
+            slot = (slot + 1) & mask
+
+    def _unlink(self, slot):
+        """Empty a table slot, moving later entries of the probe run back so lookups still find them"""
+        table, hashes, mask = self._table, self._hashes, self._mask
+        hole = slot
+        while True:
+            slot = (slot + 1) & mask
+            entry_id = table[slot]
+            if entry_id < 0:
+                break
+            home = hashes[entry_id] & mask
+            # The entry may fill the hole unless its home lies cyclically in (hole, slot]
+            if (home - hole - 1) & mask >= (slot - hole) & mask:
+                table[hole] = entry_id
+                hole = slot
+        table[hole] = -1
+
+    def _grow(self):
+        table = array('i', [-1]) * (len(self._table) * 2)
+        mask = len(table) - 1
+        for entry_id, path_hash in enumerate(self._hashes):
+            if not self._refs[entry_id]:
+                continue
+            slot = path_hash & mask
+            while table[slot] >= 0:
+                slot = (slot + 1) & mask
+            table[slot] = entry_id
+        self._table = table
+        self._mask = mask
+
+    def _compact(self):
+        """Repack the basenames of live entries into a buffer of their own size"""
+        names, old = bytearray(), self._names
+        starts, ends = self._name_starts, self._name_ends
+        for entry_id, refs in enumerate(self._refs):
+            if refs:
+                start = len(names)
+                names += old[starts[entry_id]:ends[entry_id]]
+                starts[entry_id] = start
+                ends[entry_id] = len(names)
+        self._names = names
+        self._dead_bytes = 0
+
+
+# Shared by both playlist panels so a file in both is stored once
+shared_store = EntryStore()
@@ -0,0 +1,122 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Video file extensions to look for
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv')
+
+
+def scan_directory(dir_path, extensions=VIDEO_EXTENSIONS):
+    """List one directory with os.scandir
+
+    Returns (files, subdirs): the matching file paths sorted by name and the
+    subdirectories found. Symlinked directories are not followed so a link
+    loop cannot make a recursive scan run forever.
+    """
+    files = []
+    subdirs = []
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.name.lower().endswith(extensions) and entry.is_file():
+                    files.append(entry.path)
+            except OSError:
+                continue
+    files.sort(key=lambda path: os.path.basename(path).lower())
+    subdirs.sort()
+    return files, subdirs
+
+
+def scan_order_key(path):
+    """Sort key for the order a recursive scan lists files in
+
+    Depth-first by folder name, and within a folder its files by name
+    (case-insensitive) before its subfolders.
+    """
+    directory, name = os.path.split(path)
+    return [(1, part) for part in directory.split(os.sep)] + [(0, name.lower(), name)]
+
+
+class PreorderBuffer:
+    """Hand out per-directory results in depth-first order while directories finish in any order
+
+    add() records a listed directory with the subdirectories that will be
+    listed under it; ready() returns the results that are next in walk order.
+    Every subdirectory passed to add() must itself be added later.
+    """
+
+    def __init__(self, root):
+        self._stack = [root]
+        self._done = {}
+
+    def add(self, dir_path, subdirs, result):
+        self._done[dir_path] = (sorted(subdirs), result)
+
+    def ready(self):
+        results = []
+        while self._stack and self._stack[-1] in self._done:
+            subdirs, result = self._done.pop(self._stack.pop())
+            self._stack.extend(reversed(subdirs))
+            results.append(result)
+        return results
+
+
+class FolderScanner:
+    """Find video files under a folder, optionally descending into subfolders
+
+    Meant to run through BackgroundLoader: calling the scanner with a
+    cancel event yields (paths, progress) batches, one sorted batch per
+    directory. In recursive mode subdirectories are listed in parallel on a
+    thread pool, which hides the per-directory latency of network mounts;
+    the batches are still yielded in scan_order_key order, so every scan
+    (and a reopen from the library index) gives the same playlist order.
+    """
+
+    def __init__(self, folder_path, recursive=False, extensions=VIDEO_EXTENSIONS, max_workers=8):
+        self.logger = logging.getLogger(__name__)
+        self.folder_path = folder_path
+        self.recursive = recursive
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.max_workers = max_workers
+
+    def __call__(self, cancel_event):
+        if not self.recursive:
+            files, _ = scan_directory(self.folder_path, self.extensions)
+            yield files, 1.0
+            return
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='folder-scan')
+        try:
+            pending = {executor.submit(scan_directory, self.folder_path, self.extensions): self.folder_path}
+            in_order = PreorderBuffer(self.folder_path)
+            discovered = 1
+            finished = 0
+
+            while pending:
+                if cancel_event.is_set():
+                    return
+                done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    dir_path = pending.pop(future)
+                    finished += 1
+                    try:
+                        files, subdirs = future.result()
+                    except OSError as e:
+                        # The top folder failing is fatal, a subfolder is just skipped
+                        if dir_path == self.folder_path:
+                            raise
+                        self.logger.warning('Skipping unreadable folder %s: %s', dir_path, e)
+                        files, subdirs = [], []
+
+                    for subdir in subdirs:
+                        pending[executor.submit(scan_directory, subdir, self.extensions)] = subdir
+                    discovered += len(subdirs)
+                    in_order.add(dir_path, subdirs, files)
+
+                for files in in_order.ready():
+                    if files:
+                        yield files, finished / discovered
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,412 @@
+import os
+import sys
+import time
+import errno
+import struct
+import select
+import logging
+import threading
+import collections
+import ctypes
+import ctypes.util
+from folder_scanner import scan_directory, VIDEO_EXTENSIONS
+from tk_wakeup import TkWakeup
+
+# Quiet period before a burst of changes is handed to the panel, and the
+# longest a steady stream of changes (a bulk copy) is held back
+DEBOUNCE_MS = 500
+MAX_DELAY_MS = 3000
+POLL_INTERVAL = 5.0
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+_EVENT = struct.Struct('iIII')
+
+# Net effect of a batch of changes:
+#   added - new video files, in the order they appeared
+#   removed - video files that are gone
+#   renamed - {old path: new path} for files that were moved within the folder
+#   removed_dirs - subfolders that vanished (every entry below them is gone)
+#   resync - events were lost; the folder has to be compared in full
+FolderChanges = collections.namedtuple('FolderChanges', 'added removed renamed removed_dirs resync')
+
+
+class PendingChanges:
+    """Accumulates changes between deliveries, cancelling out the ones that undo each other"""
+
+    def __init__(self):
+        self.added = {}
+        self.removed = set()
+        self.renamed = {}
+        self.removed_dirs = []
+        self.resync = False
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.renamed or self.removed_dirs or self.resync)
+
+    def add(self, path):
+        if path in self.removed:
+            self.removed.discard(path)  # Replaced in place, the panel still lists it
+        else:
+            self.added[path] = None
+
+    def remove(self, path):
+        if path in self.added:
+            del self.added[path]  # Came and went before the panel saw it
+            return
+        for old, new in self.renamed.items():
+            if new == path:
+                del self.renamed[old]
+                path = old
+                break
+        self.removed.add(path)
+
+    def rename(self, old, new):
+        if old in self.added:
+            del self.added[old]
+            self.added[new] = None
+            return
+        for source, target in self.renamed.items():
+            if target == old:
+                old = source
+                break
+        self.renamed[old] = new
+
+    def remove_dir(self, path):
+        self.removed_dirs.append(path)
+
+    def mark_resync(self):
+        self.resync = True
+
+    def take(self):
+        changes = FolderChanges(list(self.added), self.removed, self.renamed, self.removed_dirs, self.resync)
+        self.__init__()
+        return changes
+
+
+class _Inotify:
+    """Minimal ctypes binding of the Linux inotify API"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = (ctypes.c_int, ctypes.c_int)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+    def add_watch(self, path, mask):
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+        return wd
+
+    def rm_watch(self, wd):
+        self._rm_watch(self.fd, wd)
+
+    def read_events(self, timeout):
+        """(wd, mask, cookie, name) tuples, waiting at most timeout seconds for the first"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            events.append((wd, mask, cookie, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """Watch a loaded folder and report video files appearing, vanishing or being renamed
+
+    On Linux a background thread reads inotify events (one watch per
+    directory); elsewhere, or when inotify is unavailable or out of watches,
+    the folder tree is polled every POLL_INTERVAL seconds: every directory
+    is stat'ed, but only the ones whose mtime changed are listed again,
+    the subfolders of the others come from the previous pass.
+
+    A new file is only reported once it is complete, so a file still being
+    copied is not preparsed half-written: with inotify when it is closed
+    after writing (IN_CLOSE_WRITE) or moved in, when polling once its size
+    has not changed for a whole poll interval.
+
+    Changes are merged as they arrive and handed to on_changes(FolderChanges)
+    on the Tk thread once the folder has been quiet for DEBOUNCE_MS, or at
+    least every MAX_DELAY_MS while a bulk copy keeps it busy.
+    """
+
+    def __init__(self, widget, folder_path, recursive, on_changes, extensions=VIDEO_EXTENSIONS,
+                 debounce_ms=DEBOUNCE_MS):
+        self.logger = logging.getLogger(__name__)
+        self.widget = widget
+        self.folder_path = folder_path
+        self.recursive = recursive
+        self.on_changes = on_changes
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.debounce_ms = debounce_ms
+
+        self._lock = threading.Lock()
+        self._pending = PendingChanges()
+        self._first_change = 0.0
+        self._last_change = 0.0
+        self._flush_job = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.backend = None
+
+        self._wakeup = TkWakeup(widget, self._on_wakeup)
+
+    def start(self):
+        inotify = None
+        if sys.platform.startswith('linux'):
+            try:
+                inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                self.logger.info('inotify unavailable, polling %s instead: %s', self.folder_path, e)
+        target = self._run_inotify if inotify is not None else self._run_polling
+        self.backend = 'inotify' if inotify is not None else 'polling'
+        self._thread = threading.Thread(target=target, args=(inotify,) if inotify is not None else (),
+                                        name='folder-watch', daemon=True)
+        self._thread.start()
+        self.logger.info('Watching %s (%s)', self.folder_path, self.backend)
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.close()
+        if self._flush_job is not None:
+            self.widget.after_cancel(self._flush_job)
+            self._flush_job = None
+
+    def _is_video(self, name):
+        return name.lower().endswith(self.extensions)
+
+    # Worker side
+
+    def _record(self, change, *paths):
+        """Worker thread: merge one change (a PendingChanges method name) and wake the Tk loop if it was idle"""
+        now = time.monotonic()
+        with self._lock:
+            if not self._pending:
+                self._first_change = now
+            self._last_change = now
+            getattr(self._pending, change)(*paths)
+        self._wakeup.set()
+
+    def _walk_dirs(self, root):
+        """root and, in recursive mode, every directory below it (symlinks not followed)"""
+        stack = [root]
+        while stack:
+            dir_path = stack.pop()
+            yield dir_path
+            if not self.recursive:
+                continue
+            try:
+                _, subdirs = scan_directory(dir_path, self.extensions)
+            except OSError:
+                continue
+            stack.extend(subdirs)
+
+    def _run_inotify(self, inotify):
+        watches = {}
+
+        def watch_tree(root, report_files):
+            for dir_path in self._walk_dirs(root):
+                try:
+                    watches[inotify.add_watch(dir_path, WATCH_MASK)] = dir_path
+                except OSError as e:
+                    if e.errno == errno.ENOSPC:
+                        raise
+                    continue
+                if report_files:
+                    try:
+                        files, _ = scan_directory(dir_path, self.extensions)
+                    except OSError:
+                        continue
+                    for path in files:
+                        self._record('add', path)
+
+        try:
+            watch_tree(self.folder_path, report_files=False)
+        except OSError as e:
+            self.logger.warning('Out of inotify watches (%s), polling %s instead', e, self.folder_path)
+            inotify.close()
+            self.backend = 'polling'
+            self._run_polling()
+            return
+
+        moves = {}  # cookie -> path moved away, waiting for its IN_MOVED_TO
+        try:
+            while not self._stop.is_set():
+                events = inotify.read_events(timeout=0.5)
+                for wd, mask, cookie, name in events:
+                    if mask & IN_Q_OVERFLOW:
+                        self._record('mark_resync')
+                        continue
+                    if mask & IN_IGNORED:
+                        watches.pop(wd, None)
+                        continue
+                    dir_path = watches.get(wd)
+                    if dir_path is None:
+                        continue
+                    if mask & (IN_DELETE_SELF | IN_MOVE_SELF) and dir_path == self.folder_path:
+                        self._record('remove_dir', dir_path)  # The whole folder is gone
+                        continue
+                    if not name:
+                        continue
+                    path = os.path.join(dir_path, name)
+
+                    if mask & IN_ISDIR:
+                        if not self.recursive:
+                            continue
+                        if mask & (IN_CREATE | IN_MOVED_TO):
+                            try:
+                                watch_tree(path, report_files=True)
+                            except OSError:
+                                self._record('mark_resync')
+                        elif mask & (IN_DELETE | IN_MOVED_FROM):
+                            prefix = path + os.sep
+                            for old_wd, old_dir in list(watches.items()):
+                                if old_dir == path or old_dir.startswith(prefix):
+                                    inotify.rm_watch(old_wd)
+                                    del watches[old_wd]
+                            self._record('remove_dir', path)
+                        continue
+
+                    if not self._is_video(name):
+                        if mask & IN_MOVED_FROM:
+                            moves[cookie] = None  # Renamed to a video name later: plain add
+                        elif mask & IN_MOVED_TO and moves.get(cookie) is not None:
+                            self._record('remove', moves.pop(cookie))  # No longer a video name
+                        continue
+                    if mask & IN_CLOSE_WRITE:
+                        self._record('add', path)  # Written and closed; IN_CREATE comes too early
+                    elif mask & IN_DELETE:
+                        self._record('remove', path)
+                    elif mask & IN_MOVED_FROM:
+                        moves[cookie] = path
+                    elif mask & IN_MOVED_TO:
+                        old = moves.pop(cookie, None)
+                        if old is not None:
+                            self._record('rename', old, path)
+                        else:
+                            self._record('add', path)
+
+                # A move whose IN_MOVED_TO never came left the watched tree
+                if not events and moves:
+                    for old in moves.values():
+                        if old is not None:
+                            self._record('remove', old)
+                    moves.clear()
+        finally:
+            inotify.close()
+
+    def _run_polling(self):
+        snapshot = {}  # dir -> (mtime_ns, set of video file names, subdirectories)
+        growing = {}  # New file -> size at the last pass, reported once the size holds still
+
+        def list_dir(dir_path):
+            try:
+                mtime = os.stat(dir_path).st_mtime_ns
+                files, subdirs = scan_directory(dir_path, self.extensions)
+            except OSError:
+                return None
+            return mtime, {os.path.basename(path) for path in files}, subdirs if self.recursive else []
+
+        def poll(initial):
+            seen = set()
+            stack = [self.folder_path]
+            while stack:
+                dir_path = stack.pop()
+                seen.add(dir_path)
+                try:
+                    mtime = os.stat(dir_path).st_mtime_ns
+                except OSError:
+                    continue
+                old = snapshot.get(dir_path)
+                if old is not None and old[0] == mtime:
+                    stack.extend(old[2])
+                    continue
+                listing = list_dir(dir_path)
+                if listing is None:
+                    continue
+                snapshot[dir_path] = listing
+                stack.extend(listing[2])
+                if initial:
+                    continue
+                old_names = old[1] if old is not None else set()
+                for name in sorted(listing[1] - old_names):
+                    growing[os.path.join(dir_path, name)] = -1
+                for name in old_names - listing[1]:
+                    path = os.path.join(dir_path, name)
+                    if growing.pop(path, None) is None:
+                        self._record('remove', path)
+
+            for dir_path in [path for path in snapshot if path not in seen]:
+                del snapshot[dir_path]
+                self._record('remove_dir', dir_path)
+
+            for path, size in list(growing.items()):
+                try:
+                    current = os.stat(path).st_size
+                except OSError:
+                    del growing[path]
+                    continue
+                if current == size:
+                    del growing[path]
+                    self._record('add', path)
+                else:
+                    growing[path] = current
+
+        poll(initial=True)
+        while not self._stop.wait(POLL_INTERVAL):
+            poll(initial=False)
+
+    # Tk side
+
+    def _on_wakeup(self):
+        if self._flush_job is None and not self._stop.is_set():
+            self._flush_job = self.widget.after(self.debounce_ms, self._flush)
+
+    def _flush(self):
+        self._flush_job = None
+        now = time.monotonic()
+        with self._lock:
+            quiet_ms = (now - self._last_change) * 1000
+            waited_ms = (now - self._first_change) * 1000
+            if quiet_ms < self.debounce_ms and waited_ms < MAX_DELAY_MS:
+                self._flush_job = self.widget.after(int(self.debounce_ms - quiet_ms) + 1, self._flush)
+                return
+            changes = self._pending.take()
+        if self._stop.is_set():
+            return
+        try:
+            self.on_changes(changes)
+        except Exception as e:
+            self.logger.error('Error applying folder changes: %s', e)
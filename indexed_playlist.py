@@ -0,0 +1,241 @@
+from array import array
+from entry_store import shared_store
+
+
+class IndexedPlaylist:
+    """Ordered list of playlist paths kept in sync with a position index
+
+    Behaves like the plain list the panels used before (len, iteration,
+    indexing, append/extend) but membership tests and index() are O(1).
+    Paths live in an EntryStore (the shared one by default); the playlist
+    itself only holds an array of entry ids plus a small open-addressing
+    table of the first position of each of its distinct entries, sized to
+    the playlist rather than to the store. Duplicate paths are allowed; the
+    positions of entries that appear more than once are kept in a small
+    side dict. Every position holds a reference on its store entry, which
+    is given back when the row is removed or the playlist is discarded.
+    """
+
+    def __init__(self, paths=(), store=None):
+        self.store = store if store is not None else shared_store
+        self.ids = array('I')
+        self._first = array('i', [-1]) * 8  # Slots holding the first position of each distinct entry
+        self._distinct = 0
+        self._duplicates = {}     # Entry id -> sorted positions, repeated entries only
+        self.extend(paths)
+
+    def __del__(self):
+        self.store.release_many(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return map(self.store.path, self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.store.path(entry_id) for entry_id in self.ids[index]]
+        return self.store.path(self.ids[index])
+
+    def __contains__(self, path):
+        return self._first_position(self.store.find(path)) >= 0
+
+    def __repr__(self):
+        return f'IndexedPlaylist({list(self)!r})'
+
+    def name(self, index):
+        """Basename of the path at index, without building the full path"""
+        return self.store.name(self.ids[index])
+
+    def append(self, path):
+        entry_id = self.store.add(path)
+        self._add_position(entry_id, len(self.ids))
+        self.ids.append(entry_id)
+
+    def extend(self, paths):
+        add, ids = self.store.add, self.ids
+        for path in paths:
+            entry_id = add(path)
+            self._add_position(entry_id, len(ids))
+            ids.append(entry_id)
+
+    def clear(self):
+        ids = self.ids
+        self.ids = array('I')
+        self._first = array('i', [-1]) * 8
+        self._distinct = 0
+        self._duplicates.clear()
+        self.store.release_many(ids)
+
+    def index(self, path, prefer=None):
+        """Position of path, raising ValueError if it is not in the playlist
+
+        When the path appears more than once, prefer is returned if it is one
+        of its positions (so re-selecting the current duplicate keeps its place),
+        otherwise the first occurrence.
+        """
+        entry_id = self.store.find(path)
+        first = self._first_position(entry_id)
+        if first < 0:
+            raise ValueError(f'{path!r} is not in playlist')
+        positions = self._duplicates.get(entry_id)
+        if positions is not None and prefer is not None and prefer in positions:
+            return prefer
+        return first
+
+    def positions(self, path):
+        """All positions of path, in order"""
+        entry_id = self.store.find(path)
+        first = self._first_position(entry_id)
+        if first < 0:
+            return ()
+        positions = self._duplicates.get(entry_id)
+        return tuple(positions) if positions is not None else (first,)
+
+    def insert(self, index, path):
+        """Insert path before index; positions after it are shifted (O(n - index))"""
+        self.insert_many(index, [path])
+
+    def insert_many(self, index, paths):
+        """Insert paths before index in one shift of the positions after it"""
+        index = max(0, min(index, len(self.ids)))
+        self._drop_tail(index)
+        self.ids[index:index] = array('I', map(self.store.add, paths))
+        self._index_tail(index)
+
+    def delete(self, start, end):
+        """Remove the paths at positions start..end-1; positions after them are shifted"""
+        self._drop_tail(start)
+        removed = self.ids[start:end]
+        del self.ids[start:end]
+        self._index_tail(start)
+        self.store.release_many(removed)
+
+    def delete_positions(self, positions):
+        """Remove the paths at the sorted positions in one shift of everything after the first"""
+        if not positions:
+            return
+        start, removed = positions[0], set(positions)
+        self._drop_tail(start)
+        tail = self.ids[start:]
+        released = array('I', (tail[position - start] for position in positions))
+        self.ids[start:] = array('I', (entry_id for position, entry_id in enumerate(tail, start)
+                                       if position not in removed))
+        self._index_tail(start)
+        self.store.release_many(released)
+
+    def positions_under(self, prefixes):
+        """Positions of the paths below any of the directory prefixes (each ending in a separator)
+
+        Prefixes are matched once per interned directory of the store rather
+        than once per path, so no paths are rebuilt.
+        """
+        store = self.store
+        matching = {directory_id for directory_id, directory in enumerate(store.directories)
+                    if directory is not None and directory.startswith(prefixes)}
+        if not matching:
+            return []
+        directory_ids = store.directory_ids
+        return [position for position, entry_id in enumerate(self.ids) if directory_ids[entry_id] in matching]
+
+    def pop(self, index=-1):
+        """Remove and return the path at index; positions after it are shifted"""
+        if index < 0:
+            index += len(self.ids)
+        path = self[index]
+        self.delete(index, index + 1)
+        return path
+
+    def replace(self, index, path):
+        """Swap the path at index for another one in place (O(1))"""
+        entry_id = self.store.add(path)
+        old_id = self.ids[index]
+        self._remove_position(old_id, index)
+        self.ids[index] = entry_id
+        self._add_position(entry_id, index)
+        self.store.release(old_id)
+
+    def _slot(self, entry_id):
+        """Slot of _first holding entry_id's first position, or the empty slot where it would go"""
+        first, ids = self._first, self.ids
+        mask = len(first) - 1
+        slot = (entry_id * 2654435761) & mask
+        while True:
+            position = first[slot]
+            if position < 0 or ids[position] == entry_id:
+                return slot
+            slot = (slot + 1) & mask
+
+    def _first_position(self, entry_id):
+        if entry_id < 0:
+            return -1
+        return self._first[self._slot(entry_id)]
+
+    def _add_position(self, entry_id, index):
+        slot = self._slot(entry_id)
+        first = self._first[slot]
+        if first < 0:
+            self._first[slot] = index
+            self._distinct += 1
+            if self._distinct * 2 > len(self._first):
+                self._grow(entry_id, index)
+            return
+        positions = self._duplicates.get(entry_id)
+        if positions is None:
+            positions = self._duplicates[entry_id] = [first]
+        positions.append(index)
+        if positions[-2] > index:
+            positions.sort()
+        self._first[slot] = positions[0]
+
+    def _remove_position(self, entry_id, index):
+        slot = self._slot(entry_id)
+        positions = self._duplicates.get(entry_id)
+        if positions is None:
+            self._unlink(slot)
+            self._distinct -= 1
+            return
+        positions.remove(index)
+        if len(positions) == 1:
+            del self._duplicates[entry_id]
+        self._first[slot] = positions[0]
+
+    def _unlink(self, slot):
+        """Empty a slot, moving later entries of the probe run back so lookups still find them"""
+        first, ids = self._first, self.ids
+        mask = len(first) - 1
+        hole = slot
+        while True:
+            slot = (slot + 1) & mask
+            position = first[slot]
+            if position < 0:
+                break
+            home = (ids[position] * 2654435761) & mask
+            if (home - hole - 1) & mask >= (slot - hole) & mask:
+                first[hole] = position
+                hole = slot
+        first[hole] = -1
+
+    def _grow(self, entry_id, index):
+        """Double the slot table; positions of the entry being added need not be in ids yet"""
+        old = self._first
+        self._first = first = array('i', [-1]) * (len(old) * 2)
+        mask = len(first) - 1
+        ids = self.ids
+        for position in old:
+            if position < 0:
+                continue
+            key = entry_id if position == index else ids[position]
+            slot = (key * 2654435761) & mask
+            while first[slot] >= 0:
+                slot = (slot + 1) & mask
+            first[slot] = position
+
+    def _drop_tail(self, start):
+        for offset, entry_id in enumerate(self.ids[start:]):
+            self._remove_position(entry_id, start + offset)
+
+    def _index_tail(self, start):
+        for offset, entry_id in enumerate(self.ids[start:]):
+            self._add_position(entry_id, start + offset)
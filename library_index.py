@@ -0,0 +1,263 @@
+import os
+import sqlite3
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from app_paths import data_path
+from folder_scanner import VIDEO_EXTENSIONS, PreorderBuffer, scan_order_key
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime REAL
+);
+CREATE INDEX IF NOT EXISTS directories_parent ON directories (parent);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    size INTEGER,
+    mtime REAL,
+    extension TEXT
+);
+CREATE INDEX IF NOT EXISTS files_directory ON files (directory);
+'''
+
+# How often a running rescan commits its pending writes, in seconds
+COMMIT_INTERVAL = 1.0
+
+
+def _probe_directory(dir_path, known_mtime, extensions):
+    """Stat a directory and list it only if its mtime differs from known_mtime
+
+    Returns (mtime, files, subdirs). files maps path -> (size, mtime, extension)
+    for matching files; files and subdirs are None when the directory is unchanged.
+    """
+    mtime = os.stat(dir_path).st_mtime
+    if mtime == known_mtime:
+        return mtime, None, None
+
+    files = {}
+    subdirs = []
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.name.lower().endswith(extensions) and entry.is_file():
+                    stat = entry.stat()
+                    extension = os.path.splitext(entry.name)[1].lower()
+                    files[entry.path] = (stat.st_size, stat.st_mtime, extension)
+            except OSError:
+                continue
+    return mtime, files, subdirs
+
+
+def _subtree_range(folder):
+    """Bounds selecting every path strictly below folder with a plain range query"""
+    prefix = folder.rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+class LibraryIndex:
+    """Persistent SQLite index of scanned folders
+
+    Stores every listed directory with its mtime and every matching file with
+    its size, mtime and extension. Reopening a folder reads the file list
+    straight from the index; a background rescan then only lists directories
+    whose mtime changed and reports the differences.
+    """
+
+    def __init__(self, db_path=None):
+        self.logger = logging.getLogger(__name__)
+        self.db_path = db_path or data_path('library.db')
+        self._lock = threading.Lock()
+        # Shared between the UI thread (lookups) and the rescan thread (writes)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+        self.logger.debug('Library index opened at %s', self.db_path)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def is_indexed(self, folder):
+        """True if the folder has been listed before"""
+        folder = os.path.normpath(folder)
+        with self._lock:
+            row = self._conn.execute('SELECT mtime FROM directories WHERE path = ?', (folder,)).fetchone()
+        return row is not None and row[0] is not None
+
+    def cached_files(self, folder, recursive=False, extensions=VIDEO_EXTENSIONS):
+        """Indexed files of a folder (and its subfolders when recursive), in scan_order_key order"""
+        folder = os.path.normpath(folder)
+        extensions = [ext.lower() for ext in extensions]
+        placeholders = ','.join('?' * len(extensions))
+        if recursive:
+            low, high = _subtree_range(folder)
+            query = (f'SELECT path FROM files WHERE (directory = ? OR (directory >= ? AND directory < ?)) '
+                     f'AND extension IN ({placeholders})')
+            params = [folder, low, high] + extensions
+        else:
+            query = f'SELECT path FROM files WHERE directory = ? AND extension IN ({placeholders})'
+            params = [folder] + extensions
+        with self._lock:
+            paths = [row[0] for row in self._conn.execute(query, params)]
+        return sorted(paths, key=scan_order_key)
+
+    def rescan(self, folder, recursive=False, extensions=VIDEO_EXTENSIONS, max_workers=8):
+        """Return a BackgroundLoader producer that brings the index up to date
+
+        Each yielded batch is ((added, removed), progress) for one directory,
+        in the same directory order as FolderScanner.
+        An unknown folder is simply listed in full, so this also serves as the
+        first scan.
+        """
+        return IncrementalRescan(self, folder, recursive, extensions, max_workers)
+
+    def _execute(self, query, params=()):
+        with self._lock:
+            return self._conn.execute(query, params).fetchall()
+
+    def _commit(self):
+        with self._lock:
+            self._conn.commit()
+
+
+class IncrementalRescan:
+    """Walk a folder, re-listing only directories whose mtime changed"""
+
+    def __init__(self, index, folder, recursive, extensions, max_workers):
+        self.logger = logging.getLogger(__name__)
+        self.index = index
+        self.folder = os.path.normpath(folder)
+        self.recursive = recursive
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.max_workers = max_workers
+
+    def __call__(self, cancel_event):
+        index = self.index
+
+        # A different extension set invalidates every stored listing
+        signature = ','.join(sorted(self.extensions))
+        row = index._execute("SELECT value FROM meta WHERE key = 'extensions'")
+        force = not row or row[0][0] != signature
+        if force:
+            index._execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('extensions', ?)", (signature,))
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='library-scan')
+        last_commit = time.monotonic()
+        try:
+            pending = {}
+            self._submit(executor, pending, self.folder, force)
+            in_order = PreorderBuffer(self.folder)
+            discovered = 1
+            finished = 0
+
+            while pending:
+                if cancel_event.is_set():
+                    return
+                done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    dir_path = pending.pop(future)
+                    finished += 1
+                    try:
+                        mtime, files, subdirs = future.result()
+                    except OSError as e:
+                        self.logger.warning('Folder no longer readable, dropping from index: %s: %s', dir_path, e)
+                        in_order.add(dir_path, [], ([], self._purge_subtree(dir_path)))
+                        continue
+
+                    if files is None:
+                        # Unchanged: trust the stored listing, but still check its subfolders
+                        subdirs = [r[0] for r in index._execute(
+                            'SELECT path FROM directories WHERE parent = ?', (dir_path,))]
+                        added, removed = [], []
+                    else:
+                        added, removed, subdirs = self._apply_listing(dir_path, mtime, files, subdirs)
+
+                    if not self.recursive:
+                        subdirs = []
+                    for subdir in subdirs:
+                        self._submit(executor, pending, subdir, force)
+                    discovered += len(subdirs)
+                    in_order.add(dir_path, subdirs, (added, removed))
+
+                if time.monotonic() - last_commit > COMMIT_INTERVAL:
+                    index._commit()
+                    last_commit = time.monotonic()
+
+                for added, removed in in_order.ready():
+                    if added or removed:
+                        yield (added, removed), finished / discovered
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            index._commit()
+
+    def _submit(self, executor, pending, dir_path, force):
+        known_mtime = None
+        if not force:
+            row = self.index._execute('SELECT mtime FROM directories WHERE path = ?', (dir_path,))
+            known_mtime = row[0][0] if row else None
+        future = executor.submit(_probe_directory, dir_path, known_mtime, self.extensions)
+        pending[future] = dir_path
+
+    def _apply_listing(self, dir_path, mtime, files, subdirs):
+        """Write a fresh directory listing and return (added, removed, subdirs)"""
+        index = self.index
+        stored = {path: (size, file_mtime) for path, size, file_mtime in index._execute(
+            'SELECT path, size, mtime FROM files WHERE directory = ?', (dir_path,))}
+
+        added = sorted((path for path in files if path not in stored), key=lambda p: os.path.basename(p).lower())
+        removed = [path for path in stored if path not in files]
+        changed = [(path, dir_path) + info for path, info in files.items()
+                   if stored.get(path) != info[:2]]
+
+        with index._lock:
+            conn = index._conn
+            conn.executemany('DELETE FROM files WHERE path = ?', ((path,) for path in removed))
+            conn.executemany(
+                'INSERT OR REPLACE INTO files (path, directory, size, mtime, extension) VALUES (?, ?, ?, ?, ?)',
+                changed
+            )
+            parent = os.path.dirname(dir_path) if dir_path != self.folder else None
+            conn.execute(
+                'INSERT INTO directories (path, parent, mtime) VALUES (?, ?, ?) '
+                'ON CONFLICT(path) DO UPDATE SET mtime = excluded.mtime',
+                (dir_path, parent, mtime)
+            )
+            old_subdirs = {r[0] for r in conn.execute('SELECT path FROM directories WHERE parent = ?', (dir_path,))}
+            # Placeholder rows (mtime NULL) so an unchanged parent still leads to unlisted children
+            conn.executemany(
+                'INSERT INTO directories (path, parent, mtime) VALUES (?, ?, NULL) '
+                'ON CONFLICT(path) DO UPDATE SET parent = excluded.parent',
+                ((subdir, dir_path) for subdir in subdirs)
+            )
+
+        for gone in old_subdirs.difference(subdirs):
+            removed.extend(self._purge_subtree(gone))
+
+        return added, removed, subdirs
+
+    def _purge_subtree(self, dir_path):
+        """Drop a directory and everything under it; returns the removed file paths"""
+        low, high = _subtree_range(dir_path)
+        with self.index._lock:
+            conn = self.index._conn
+            removed = [r[0] for r in conn.execute(
+                'SELECT path FROM files WHERE directory = ? OR (directory >= ? AND directory < ?)',
+                (dir_path, low, high))]
+            conn.execute('DELETE FROM files WHERE directory = ? OR (directory >= ? AND directory < ?)',
+                         (dir_path, low, high))
+            conn.execute('DELETE FROM directories WHERE path = ? OR (path >= ? AND path < ?)',
+                         (dir_path, low, high))
+        return removed
@@ -0,0 +1,220 @@
+import logging
+import vlc
+
+# Entries mirrored into the libvlc list ahead of (and kept behind) the current one
+MIRROR_AHEAD = 100
+MIRROR_BEHIND = 20
+
+PLAYBACK_MODES = ('default', 'loop', 'repeat')
+
+
+def _address(media):
+    return media._as_parameter_.value
+
+
+class ListPlayerEngine:
+    """Lets libvlc's MediaListPlayer advance through a panel's playlist
+
+    play() mirrors the playlist into a vlc.MediaList and starts the list
+    player at the given index; from then on end-of-track transitions, loop
+    and repeat happen inside libvlc without the Tk thread. Only a window of
+    MIRROR_AHEAD entries past the current one is mirrored (plus MIRROR_BEHIND
+    for previous()), topped up whenever the list player moves on, so huge
+    playlists cost no more than small ones. A playlist that fits entirely in
+    the window uses libvlc's native loop mode; a larger one is looped by
+    wrapping the window back to the start. Entries the playable(index)
+    predicate rejects (nested playlists, dead stream URLs) are never
+    mirrored. When the panel inserts or removes rows mid-playlist
+    (expanding or collapsing a nested playlist), rows_changed() renumbers
+    the mirror and mirrors everything after the current item again.
+
+    on_track(index) is called on the Tk thread (through the event bridge)
+    with the playlist index of each item the list player starts, so the
+    panels can follow along. on_finished() is called when it runs off the
+    end of the list.
+    """
+
+    def __init__(self, instance, player, bridge, on_track, on_finished):
+        self.logger = logging.getLogger(__name__)
+        self.instance = instance
+        self.list_player = instance.media_list_player_new()
+        self.list_player.set_media_player(player)
+        self.on_track = on_track
+        self.on_finished = on_finished
+
+        self.mode = 'default'
+        self.paths = None
+        self.playable = None
+        self.media_list = None
+        self._indices = {}  # Media address -> playlist index
+        self._order = []  # Playlist index of each list item
+        self._current = None  # Playlist index of the item the list player is on
+        self._next_fill = 0
+        self._wrapped = False
+
+        events = self.list_player.event_manager()
+        bridge.connect(events, vlc.EventType.MediaListPlayerNextItemSet, self._on_next_item,
+                       extract=lambda event: event.u.media)
+        bridge.connect(events, vlc.EventType.MediaListPlayerPlayed, lambda value: self.on_finished())
+
+    def play(self, paths, index, playable=None):
+        """Mirror paths (a panel's playlist_files) and play entry index, which must be playable"""
+        self.stop()
+        self.paths = paths
+        self.playable = playable
+        self.media_list = self.instance.media_list_new()
+        self._indices = {}
+        self._order = []
+        self._current = index
+        self._next_fill = index
+        self._wrapped = False
+        self._fill(index)
+        self._apply_mode()
+        self.list_player.set_media_list(self.media_list)
+        self.list_player.play_item_at_index(0)
+        self.logger.debug('List player started at %s with %s mirrored entries', index, len(self._order))
+
+    def set_mode(self, mode):
+        """Switch between 'default', 'loop' and 'repeat' (applies immediately)"""
+        self.mode = mode
+        if self.media_list is not None:
+            self._apply_mode()
+
+    def next(self):
+        """Advance natively; False if there is no next item"""
+        return self.media_list is not None and self.list_player.next() == 0
+
+    def previous(self):
+        return self.media_list is not None and self.list_player.previous() == 0
+
+    def stop(self):
+        """Stop the list player and detach the mirrored list"""
+        if self.media_list is not None:
+            self.list_player.stop()
+        self.detach()
+
+    def detach(self):
+        """Detach the mirrored list without stopping the player, so the list player no longer advances
+
+        The media player is shared, so the track playing carries on; the list
+        player gets an empty list, as one left attached would still move on
+        at the end of whatever the player plays next.
+        """
+        if self.media_list is not None:
+            empty = self.instance.media_list_new()
+            self.list_player.set_media_list(empty)  # The list player holds its own reference
+            empty.release()
+            self.media_list.release()
+            self.media_list = None
+        self._indices = {}
+        self._order = []
+        self._current = None
+
+    def release(self):
+        self.stop()
+        self.list_player.release()
+
+    def rows_changed(self, start, removed, inserted):
+        """Playlist rows start..start+removed-1 were replaced by inserted new rows
+
+        Mirrored items keep playing under their new row numbers; the ones
+        whose rows are gone are dropped, and everything after the current
+        item is mirrored again so newly inserted rows play in order.
+        """
+        if self.media_list is None:
+            return
+        end, shift = start + removed, inserted - removed
+
+        def renumber(index):
+            if index >= end:
+                return index + shift
+            return index if index < start else None
+
+        self.media_list.lock()
+        try:
+            position = self._order.index(self._current) if self._current in self._order else len(self._order) - 1
+            for item in reversed(range(len(self._order))):
+                if item > position or (item < position and renumber(self._order[item]) is None):
+                    self._remove_item(item)
+                    if item < position:
+                        position -= 1
+            current = renumber(self._current) if self._current is not None else None
+            if current is None:
+                current = start - 1  # The current item's row was removed; carry on after the block
+            self._indices = {address: renumber(index) for address, index in self._indices.items()
+                             if renumber(index) is not None}
+            self._order = [renumber(index) for index in self._order]
+            if self._order:
+                self._order[position] = current
+        finally:
+            self.media_list.unlock()
+        self._current = current
+        self._next_fill = current + 1
+        self._fill(current)
+        self._apply_mode()
+
+    def _whole_list(self):
+        """True when each playable entry is mirrored exactly once, so libvlc can loop on its own"""
+        if self._wrapped or len(self.paths) > MIRROR_AHEAD or len(set(self._order)) != len(self._order):
+            return False
+        playable = self.playable or (lambda index: True)
+        return set(self._order) == {index for index in range(len(self.paths)) if playable(index)}
+
+    def _apply_mode(self):
+        if self.mode == 'repeat':
+            mode = vlc.PlaybackMode.repeat
+        elif self.mode == 'loop' and self._whole_list():
+            mode = vlc.PlaybackMode.loop
+        else:
+            mode = vlc.PlaybackMode.default
+        self.list_player.set_playback_mode(mode)
+
+    def _fill(self, current):
+        """Top the mirrored window up to MIRROR_AHEAD entries past current and trim old ones"""
+        ahead = len(self._order) - self._order.index(current) - 1 if current in self._order else 0
+        scanned = 0
+        self.media_list.lock()
+        try:
+            while ahead < MIRROR_AHEAD and scanned < len(self.paths):
+                if self._next_fill >= len(self.paths):
+                    if self.mode != 'loop' or self._whole_list():
+                        break
+                    self._next_fill = 0  # Loop a large playlist by wrapping the window
+                    self._wrapped = True
+                scanned += 1
+                if self.playable is not None and not self.playable(self._next_fill):
+                    self._next_fill += 1
+                    continue
+                media = self.instance.media_new(self.paths[self._next_fill])
+                self.media_list.add_media(media)
+                self._indices[_address(media)] = self._next_fill
+                self._order.append(self._next_fill)
+                media.release()  # The list holds its own reference
+                self._next_fill += 1
+                ahead += 1
+
+            behind = self._order.index(current) if current in self._order else 0
+            for _ in range(max(0, behind - MIRROR_BEHIND)):
+                self._remove_item(0)
+        finally:
+            self.media_list.unlock()
+
+    def _remove_item(self, position):
+        """Take the list item at position out of the mirror (media list locked)"""
+        media = self.media_list.item_at_index(position)
+        self._indices.pop(_address(media), None)
+        media.release()
+        self.media_list.remove_index(position)
+        self._order.pop(position)
+
+    def _on_next_item(self, address):
+        """Tk thread: the list player moved to another item"""
+        index = self._indices.get(address)
+        if index is None or self.paths is None:
+            return
+        if index >= len(self.paths):
+            return  # The panel's playlist shrank underneath the mirror
+        self._current = index
+        self._fill(index)
+        self._apply_mode()
+        self.on_track(index)
@@ -0,0 +1,109 @@
+import os
+import time
+import queue
+import logging
+import logging.handlers
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Per-module levels; 'main' also covers main.py when it runs as __main__
+DEFAULT_LEVELS = {
+    'main': logging.INFO,
+    'playlist_panel': logging.INFO,
+    'm3u_panel': logging.INFO,
+}
+
+
+def parse_level(name):
+    """Numeric level for a name like 'debug' or '10', or None if it is not a level"""
+    name = name.strip().upper()
+    if name.isdigit():
+        return int(name)
+    level = logging.getLevelName(name)
+    return level if isinstance(level, int) else None
+
+
+def parse_levels(spec, invalid=None):
+    """Parse 'main=DEBUG,m3u_panel=WARNING' into a {module: level} dict
+
+    Items with an unknown level are left out (and appended to invalid if given).
+    """
+    levels = {}
+    for item in spec.split(','):
+        if '=' not in item:
+            continue
+        name, level_name = item.split('=', 1)
+        level = parse_level(level_name)
+        if level is None:
+            if invalid is not None:
+                invalid.append(item.strip())
+            continue
+        levels[name.strip()] = level
+    return levels
+
+
+def setup_logging(log_file='vlc_tagger.log', level=logging.INFO, module_levels=None,
+                  max_bytes=5 * 1024 * 1024, backup_count=3):
+    """Route all logging through a queue to a rotating file and the console
+
+    Callers pay for merging the message arguments (QueueHandler.prepare()
+    does that on the thread that logs, so mutable arguments cannot change
+    before the record is written) and for putting the record on a queue;
+    LOG_FORMAT formatting, timestamps and file I/O happen on the
+    QueueListener's thread. Levels can be overridden with
+    VLC_TAGGER_LOG_LEVEL (root) and VLC_TAGGER_LOG_LEVELS (per module).
+    Unknown level names there are reported and ignored.
+    Returns the started listener; stop() it on shutdown to flush the sinks.
+    """
+    invalid = []
+    env_level = os.environ.get('VLC_TAGGER_LOG_LEVEL', '')
+    if env_level.strip():
+        parsed = parse_level(env_level)
+        if parsed is None:
+            invalid.append(f'VLC_TAGGER_LOG_LEVEL={env_level}')
+        else:
+            level = parsed
+    levels = dict(DEFAULT_LEVELS)
+    levels.update(module_levels or {})
+    levels.update(parse_levels(os.environ.get('VLC_TAGGER_LOG_LEVELS', ''), invalid))
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level)
+        if name == 'main':
+            logging.getLogger('__main__').setLevel(module_level)
+
+    listener.start()
+    for item in invalid:
+        logging.getLogger(__name__).warning('Ignoring unknown log level in %s', item)
+    return listener
+
+
+class LogThrottle:
+    """Let log calls on hot UI paths through at most once per interval per key"""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self._last = {}
+
+    def ready(self, key):
+        now = time.monotonic()
+        if now - self._last.get(key, float('-inf')) < self.interval:
+            return False
+        self._last[key] = now
+        return True
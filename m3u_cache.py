@@ -0,0 +1,130 @@
+import os
+import zlib
+from array import array
+import struct
+import hashlib
+import logging
+import threading
+from app_paths import data_path
+
+CACHE_LIMIT_BYTES = 64 * 1024 * 1024
+
+# magic, source size, source mtime_ns, entry count, title/paths/names/durations blob lengths
+_HEADER = struct.Struct('<8sQqIIIII')
+_MAGIC = b'VTM3U\x00\x02\x00'
+
+
+class M3UCache:
+    """Size-bounded binary cache of parsed playlists keyed by (path, size, mtime)
+
+    Every playlist is one file named after its absolute path. It holds a
+    fixed header with the source file's size and mtime, then the title,
+    the resolved paths and display names, each list newline-joined and
+    zlib-compressed, and the #EXTINF durations as a compressed uint32
+    array. A hit is one read, three decompressions and two splits; no
+    per-line parsing or path resolution happens. Entries are refreshed
+    on every hit and the least recently used ones are deleted once the
+    directory passes limit_bytes. Safe to use from worker threads.
+    """
+
+    def __init__(self, root=None, limit_bytes=CACHE_LIMIT_BYTES):
+        self.logger = logging.getLogger(__name__)
+        self.root = root or data_path('m3u_cache')
+        self.limit_bytes = limit_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def entry_path(self, file_path):
+        name = hashlib.sha1(os.path.abspath(file_path).encode('utf-8', errors='surrogatepass')).hexdigest()
+        return os.path.join(self.root, name + '.bin')
+
+    def load(self, file_path, stat=None):
+        """(title, paths, display names, durations) for an unchanged playlist, or None"""
+        stat = stat or os.stat(file_path)
+        entry_path = self.entry_path(file_path)
+        try:
+            with open(entry_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) < _HEADER.size:
+            return None
+        magic, size, mtime_ns, count, title_len, paths_len, names_len, durations_len = _HEADER.unpack_from(data)
+        if magic != _MAGIC or size != stat.st_size or mtime_ns != stat.st_mtime_ns:
+            return None
+
+        try:
+            offset = _HEADER.size
+            title = data[offset:offset + title_len].decode('utf-8')
+            offset += title_len
+            paths = zlib.decompress(data[offset:offset + paths_len]).decode('utf-8', errors='surrogateescape')
+            offset += paths_len
+            names = zlib.decompress(data[offset:offset + names_len]).decode('utf-8', errors='surrogateescape')
+            offset += names_len
+            durations = array('I', zlib.decompress(data[offset:offset + durations_len]))
+        except (zlib.error, UnicodeDecodeError) as e:
+            self.logger.warning('Discarding corrupt playlist cache %s: %s', entry_path, e)
+            self._remove(entry_path)
+            return None
+
+        paths = paths.split('\n') if count else []
+        names = names.split('\n') if count else []
+        if len(paths) != count or len(names) != count or len(durations) != count:
+            self._remove(entry_path)
+            return None
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return title, paths, names, durations
+
+    def store(self, file_path, stat, title, paths, names, durations):
+        """Save a parsed playlist; stat is the source's os.stat from before it was read"""
+        title = title.encode('utf-8')
+        paths_blob = zlib.compress('\n'.join(paths).encode('utf-8', errors='surrogateescape'), 1)
+        names_blob = zlib.compress('\n'.join(names).encode('utf-8', errors='surrogateescape'), 1)
+        durations_blob = zlib.compress(array('I', durations).tobytes(), 1)
+        header = _HEADER.pack(_MAGIC, stat.st_size, stat.st_mtime_ns, len(paths),
+                              len(title), len(paths_blob), len(names_blob), len(durations_blob))
+
+        entry_path = self.entry_path(file_path)
+        temp_path = f'{entry_path}.{threading.get_ident()}.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(header)
+                f.write(title)
+                f.write(paths_blob)
+                f.write(names_blob)
+                f.write(durations_blob)
+            os.replace(temp_path, entry_path)
+        except OSError as e:
+            self.logger.warning('Could not cache playlist %s: %s', file_path, e)
+            self._remove(temp_path)
+            return
+        self._evict(keep=entry_path)
+
+    def _evict(self, keep):
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.root):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.limit_bytes:
+                    break
+                if path == keep:
+                    continue
+                self._remove(path)
+                total -= size
+                self.logger.debug('Evicted playlist cache %s', path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -2,33 +2,168 @@ import tkinter as tk
 from tkinter import filedialog
 import os
 import logging
+import time
+import multiprocessing
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from virtual_list import VirtualListbox
+from indexed_playlist import IndexedPlaylist
+from media_metadata import format_duration
+from background_loader import BackgroundLoader
+from m3u_parser import M3UStreamParser, PooledM3UParse, is_playlist_path
+from perf import perf, timed
+from search_index import PlaylistFilter, path_tail
+
+MAX_NESTING_DEPTH = 8
+# Entries per batch when a nested playlist is read in; each batch shifts the rows after it once
+NESTED_BATCH_SIZE = 20000
+# Entries kept in memory over all open playlist tabs; past this the least recently
+# shown tabs are unloaded and read again (normally from the playlist cache) when shown
+MAX_LOADED_ENTRIES = 2000000
+PARSE_WORKERS = min(4, os.cpu_count() or 1)
+TABS_PER_ROW = 3
+TAB_LABEL_LENGTH = 18
+
+# Row kinds: playable media, or a nested playlist that is collapsed, expanded or cannot be
+# expanded (a cycle, too deep or unreadable)
+ROW_MEDIA, ROW_COLLAPSED, ROW_EXPANDED, ROW_BLOCKED = range(4)
+ROW_MARKERS = {ROW_MEDIA: '', ROW_COLLAPSED: '\u25b8 ', ROW_EXPANDED: '\u25be ', ROW_BLOCKED: '\u2298 '}
+
+
+class M3UTab:
+    """One playlist open in the M3U panel: its entries, per-row columns and view state
+
+    A loaded tab keeps everything in memory, so showing it again costs
+    nothing. unload() drops the entries, which frees the paths no other
+    playlist refers to in the shared entry store, but keeps the file,
+    current_index and the scroll position, which are restored once it is
+    loaded again.
+    """
+
+    def __init__(self, file_path, widget, on_filter_update):
+        self.file_path = file_path  # Absolute path, None for the empty tab shown before any playlist
+        self.loader = BackgroundLoader(widget)
+        self.expander = BackgroundLoader(widget)  # Reads the nested playlist being expanded
+        self.search = PlaylistFilter(widget, self.search_text, lambda done: on_filter_update(self, done))
+        self.current_index = -1
+        self.scroll_top = 0
+        self.selected_index = None
+        self.loaded = False
+        self.restore_pending = False
+        self.load_started = 0.0
+        self.status = "No playlist loaded"
+        self.clear()
+
+    def clear(self):
+        self.playlist_files = IndexedPlaylist()
+        self.display_names = []  # #EXTINF titles, None where the filename is shown
+        self.durations = array('I')  # Per row, from #EXTINF or preparsing; 0 while unknown
+        self.row_kinds = array('B')  # ROW_* per row
+        self.depths = array('B')  # Nesting level per row, entries of expanded playlists are deeper
+        self.expanding = None  # Row of the nested playlist being read in, if any
+        self.expand_end = 0  # Where its next batch of entries goes
+        self.expand_started = 0.0
+        self.pending_step = None  # (step, start row or None) of a next/previous waiting for it
+        self.total_duration_ms = 0
+        self.playlist_title = ""
+        self.search.reset()
+
+    def unload(self):
+        """Stop loading and free the entries; the view state stays"""
+        self.loader.cancel()
+        self.expander.cancel()
+        self.clear()
+        self.loaded = False
+
+    @property
+    def name(self):
+        if self.playlist_title:
+            return self.playlist_title
+        return os.path.basename(self.file_path) if self.file_path else "No playlist loaded"
+
+    def search_text(self, index):
+        """What the filter matches against - the display name plus file and folder name"""
+        title = self.display_names[index] or ''
+        return f'{title}\n{path_tail(self.playlist_files[index])}'.lower()
+
+
+def _tab_attribute(name):
+    """Panel attribute that reads and writes the active tab's"""
+    return property(lambda self: getattr(self.tab, name),
+                    lambda self, value: setattr(self.tab, name, value))
+
 
 class M3UPanel:
-    def __init__(self, parent, callback_play):
+    # The playlist shown is the active tab's
+    playlist_files = _tab_attribute('playlist_files')
+    display_names = _tab_attribute('display_names')
+    durations = _tab_attribute('durations')
+    row_kinds = _tab_attribute('row_kinds')
+    depths = _tab_attribute('depths')
+    current_index = _tab_attribute('current_index')
+    total_duration_ms = _tab_attribute('total_duration_ms')
+    playlist_title = _tab_attribute('playlist_title')
+    playlist_path = _tab_attribute('file_path')
+    search = _tab_attribute('search')
+    loader = _tab_attribute('loader')
+
+    def __init__(self, parent, callback_play, metadata=None, playlist_cache=None, prober=None,
+                 on_rows_changed=None):
         self.logger = logging.getLogger(__name__)
         self.logger.debug('Initializing M3UPanel')
 
         self.parent = parent
         self.callback_play = callback_play
-        self.playlist_files = []
-        self.current_index = -1
-        self.playlist_title = ""
+        self.metadata = metadata  # Optional MediaPreparser for durations
+        self.playlist_cache = playlist_cache  # Optional M3UCache, skips re-parsing unchanged files
+        self.prober = prober  # Optional UrlProber, marks and skips unreachable stream URLs
+        # Optional on_rows_changed(playlist, start, removed, inserted), when expanding or collapsing shifts rows
+        self.on_rows_changed = on_rows_changed
+        self._executor = None  # Process pool for parsing several playlists at once, created on first use
 
         # Create main frame for M3U playlist
         self.frame = tk.Frame(parent, width=200)
 
+        # Open playlists by absolute path, least recently shown first; the empty tab is shown until one is loaded
+        self.tabs = OrderedDict()
+        self.tab = M3UTab(None, self.frame, self._on_filter_update)
+
         # Title label
         self.title_label = tk.Label(self.frame, text="M3U Playlists", font=("Arial", 10, "bold"))
         self.title_label.pack(fill=tk.X, padx=5, pady=(5, 0))
 
-        # Create a button to select M3U file
-        self.file_button = tk.Button(self.frame, text="Load M3U/M3U8", command=self.load_m3u_file)
-        self.file_button.pack(fill=tk.X, padx=5, pady=5)
+        # Buttons to select M3U files and close the shown one
+        self.button_frame = tk.Frame(self.frame)
+        self.button_frame.pack(fill=tk.X, padx=5, pady=5)
+        self.file_button = tk.Button(self.button_frame, text="Load M3U/M3U8", command=self.load_m3u_file)
+        self.file_button.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.close_button = tk.Button(self.button_frame, text="Close tab", command=self.close_tab)
+        self.close_button.pack(side=tk.LEFT, padx=(5, 0))
+
+        # One button per open playlist, in the order they were opened
+        self.tab_var = tk.StringVar()
+        self.tab_bar = tk.Frame(self.frame)
+        self.tab_bar.pack(fill=tk.X, padx=5)
+        for column in range(TABS_PER_ROW):
+            self.tab_bar.columnconfigure(column, weight=1, uniform='tab')
+        self.tab_buttons = {}
 
         # Playlist name display
         self.playlist_name_label = tk.Label(self.frame, text="No playlist loaded", wraplength=180)
         self.playlist_name_label.pack(fill=tk.X, padx=5)
 
+        # Filter box: narrows the list to entries containing the typed text
+        self._filter_selection = None
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add('write', self._on_filter_typed)
+        self.filter_entry = tk.Entry(self.frame, textvariable=self.filter_var)
+        self.filter_entry.pack(fill=tk.X, padx=5, pady=(5, 0))
+
+        self.filter_nav_var = tk.BooleanVar(value=False)
+        self.filter_nav_check = tk.Checkbutton(self.frame, text="Next/previous within filter", variable=self.filter_nav_var)
+        self.filter_nav_check.pack(anchor=tk.W, padx=5)
+
         # Create a listbox to display playlist items
         self.list_frame = tk.Frame(self.frame)
         self.list_frame.pack(fill=tk.BOTH, expand=True, padx=5)
@@ -36,149 +171,531 @@ class M3UPanel:
         self.scrollbar = tk.Scrollbar(self.list_frame)
         self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-        self.playlist_box = tk.Listbox(self.list_frame)
+        # Only the visible rows are drawn, straight from the playlist model
+        self.playlist_box = VirtualListbox(
+            self.list_frame,
+            row_count=lambda: self.search.row_count(len(self.playlist_files)),
+            row_text=lambda row: self.get_display_name(self.search.index_of(row)),
+            yscrollcommand=self.scrollbar.set,
+            on_view_change=self._on_view_change
+        )
         self.playlist_box.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-
-        # Connect scrollbar to listbox
-        self.playlist_box.config(yscrollcommand=self.scrollbar.set)
         self.scrollbar.config(command=self.playlist_box.yview)
 
-        # Bind double-click to play selected file
+        # Total duration of the entries whose metadata is known
+        self.duration_label = tk.Label(self.frame, text="")
+        self.duration_label.pack(fill=tk.X, padx=5)
+
+        # Bind double-click to play selected file (or open/close a nested playlist)
         self.playlist_box.bind("<Double-Button-1>", self.play_selected)
 
         self.logger.debug('M3UPanel initialized')
 
     def load_m3u_file(self):
-        """Open file dialog and load M3U/M3U8 playlist"""
-        self.logger.debug('Selecting M3U playlist file')
-        file_path = filedialog.askopenfilename(
-            title="Select M3U Playlist",
+        """Open file dialog and load the chosen M3U/M3U8 playlists, each into its own tab"""
+        self.logger.debug('Selecting M3U playlist files')
+        file_paths = filedialog.askopenfilenames(
+            title="Select M3U Playlists",
             filetypes=[("M3U files", "*.m3u"), ("M3U8 files", "*.m3u8"), ("All files", "*.*")]
         )
-        if file_path:
-            self.logger.info(f'M3U file selected: {file_path}')
-            self.parse_m3u_file(file_path)
-        else:
+        if not file_paths:
             self.logger.info('No M3U file selected')
+        elif len(file_paths) == 1:
+            self.logger.info('M3U file selected: %s', file_paths[0])
+            self.parse_m3u_file(file_paths[0])
+        else:
+            self.logger.info('%s M3U files selected', len(file_paths))
+            self.parse_m3u_files(file_paths)
 
+    @timed('m3u_panel.parse_m3u_file')
     def parse_m3u_file(self, file_path):
-        """Parse M3U/M3U8 playlist file"""
-        self.logger.debug(f'Parsing M3U file: {file_path}')
-
-        # Clear current playlist
-        self.playlist_box.delete(0, tk.END)
-        self.playlist_files = []
-        self.playlist_title = ""
-
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-
-            playlist_dir = os.path.dirname(file_path)
-            current_title = None
-
-            for line in lines:
-                line = line.strip()
-
-                # Skip empty lines and comments (except #EXTINF)
-                if not line:
-                    continue
-
-                # Handle playlist title
-                if line.startswith('#PLAYLIST:'):
-                    self.playlist_title = line[10:].strip()
-
-                # Handle track info
-                elif line.startswith('#EXTINF:'):
-                    # Extract title from EXTINF line
-                    if ',' in line:
-                        current_title = line.split(',', 1)[1].strip()
-
-                # Skip other comments
-                elif line.startswith('#'):
-                    continue
-
-                # This should be a file path or URL
-                else:
-                    file_url = line
-                    display_name = current_title if current_title else os.path.basename(file_url)
-
-                    # Handle relative paths
-                    if not (file_url.startswith('http') or file_url.startswith('https') or os.path.isabs(file_url)):
-                        file_url = os.path.join(playlist_dir, file_url)
-                        file_url = os.path.normpath(file_url)
-
-                    # Add to playlist
-                    self.playlist_files.append(file_url)
-                    self.playlist_box.insert(tk.END, display_name)
-
-                    # Reset current title for next track
-                    current_title = None
-
-            # Update playlist name display
-            display_name = self.playlist_title if self.playlist_title else os.path.basename(file_path)
-            self.playlist_name_label.config(text=display_name)
-
-            self.logger.info(f'Loaded {len(self.playlist_files)} items from M3U playlist')
-
-        except Exception as e:
-            self.logger.error(f'Error parsing M3U file: {e}')
-            self.playlist_name_label.config(text="Error loading playlist")
+        """Parse M3U/M3U8 playlist file in the background into its tab, filling the list in batches"""
+        self.logger.debug('Parsing M3U file: %s', file_path)
+        tab = self._tab_for(file_path)
+        self._start_load(tab, M3UStreamParser(file_path, cache=self.playlist_cache))
+        self.show_tab(tab)
+
+    def parse_m3u_files(self, file_paths):
+        """Parse several playlists in parallel on a process pool, one tab each; the first is shown"""
+        if self._executor is None:
+            # Spawned, not forked: a fork would copy the Tk and libvlc state of this process
+            self._executor = ProcessPoolExecutor(max_workers=PARSE_WORKERS,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        cache_root = self.playlist_cache.root if self.playlist_cache is not None else None
+        tabs = []
+        for file_path in file_paths:
+            tab = self._tab_for(file_path)
+            self._start_load(tab, PooledM3UParse(self._executor, file_path, cache_root=cache_root))
+            tabs.append(tab)
+        self.show_tab(tabs[0])
+
+    def _start_load(self, tab, parser, keep_view=False):
+        """Clear a tab and stream parser's entries into it (this also cancels a parse still in progress)"""
+        tab.unload()
+        if not keep_view:
+            tab.current_index = -1
+            tab.scroll_top = 0
+            tab.selected_index = None
+        tab.restore_pending = keep_view
+        tab.status = "Loading..."
+        tab.load_started = time.perf_counter()
+        tab.loader.start(
+            parser,
+            on_batch=lambda entries: self._on_parse_batch(tab, entries),
+            on_done=lambda error: self._on_parse_done(tab, parser, error),
+            on_progress=lambda progress: self._on_parse_progress(tab, progress)
+        )
+        if tab is self.tab:
+            self.playlist_box.selection_clear()
+            self.playlist_name_label.config(text=tab.status)
+            self._update_duration_label()
+
+    def _on_parse_batch(self, tab, entries):
+        """Append a batch of parsed (path, display name, duration) entries"""
+        paths = [path for path, _, _ in entries]
+        tab.playlist_files.extend(paths)
+        # Filenames are already in the entry store, only distinct titles are kept
+        tab.display_names.extend(None if name == os.path.basename(path) else name for path, name, _ in entries)
+        tab.durations.extend(duration for _, _, duration in entries)
+        tab.row_kinds.extend(ROW_COLLAPSED if is_playlist_path(path) else ROW_MEDIA for path in paths)
+        tab.depths.extend(bytes(len(paths)))
+        self._entries_added(tab, paths)
+        if tab is self.tab:
+            self.playlist_box.refresh()
+
+    def _on_parse_progress(self, tab, progress):
+        tab.status = f"Loading... {int(progress * 100)}%"
+        if tab is self.tab:
+            self.playlist_name_label.config(text=tab.status)
+
+    def _on_parse_done(self, tab, parser, error):
+        if error is not None:
+            self.logger.error('Error parsing M3U file: %s', error)
+            tab.status = "Error loading playlist"
+        else:
+            tab.playlist_title = parser.playlist_title
+            tab.loaded = True
+            tab.status = tab.name
+            perf.record('m3u_panel.load_total', time.perf_counter() - tab.load_started)
+            self.logger.info('Loaded %s items from M3U playlist%s', len(tab.playlist_files),
+                             ' (cached)' if parser.from_cache else '')
+            button = self.tab_buttons.get(tab.file_path)
+            if button is not None:
+                button.config(text=self._tab_label(tab))
+
+        if tab is self.tab:
+            if tab.restore_pending:
+                self._restore_view()
+            else:
+                self.playlist_name_label.config(text=tab.status)
+        tab.restore_pending = False
+        self._unload_stale_tabs()
+
+    def _tab_for(self, file_path):
+        """The open tab of a playlist file, adding one if it is not open yet"""
+        key = os.path.abspath(file_path)
+        tab = self.tabs.get(key)
+        if tab is None:
+            tab = M3UTab(key, self.frame, self._on_filter_update)
+            self.tabs[key] = tab
+            self.tab_buttons[key] = tk.Radiobutton(
+                self.tab_bar, text=self._tab_label(tab), variable=self.tab_var, value=key,
+                indicatoron=0, command=lambda: self.show_tab(self.tabs[key]))
+            self._layout_tabs()
+        return tab
+
+    @staticmethod
+    def _tab_label(tab):
+        name = tab.name
+        return name if len(name) <= TAB_LABEL_LENGTH else name[:TAB_LABEL_LENGTH - 1] + '\u2026'
+
+    def _layout_tabs(self):
+        for position, button in enumerate(self.tab_buttons.values()):
+            button.grid(row=position // TABS_PER_ROW, column=position % TABS_PER_ROW, sticky=tk.EW)
+
+    @timed('m3u_panel.show_tab')
+    def show_tab(self, tab):
+        """Show an open playlist tab, loading it again first if it was unloaded"""
+        if tab.file_path in self.tabs:
+            self.tabs.move_to_end(tab.file_path)
+        self.tab_var.set(tab.file_path or '')
+        if tab is self.tab:
+            return
+
+        previous = self.tab
+        previous.scroll_top = self.playlist_box.top
+        previous.selected_index = self._selected_index()
+        if previous.file_path not in self.tabs:
+            previous.unload()  # The empty tab, or one that was closed
+        self.tab = tab
+        self._filter_selection = None
+
+        if tab.file_path is not None and not tab.loaded and not tab.loader.is_running():
+            self.logger.debug('Reloading unloaded playlist tab %s', tab.file_path)
+            self._start_load(tab, M3UStreamParser(tab.file_path, cache=self.playlist_cache), keep_view=True)
+        self._restore_view()
+        # Each tab keeps the query it was last filtered with; catch up with the filter box
+        query = self.filter_var.get()
+        if query.strip().lower() != self.search.query:
+            self._filter_selection = tab.selected_index
+            self.search.set_query(query)
+        self._unload_stale_tabs()
+
+    def _restore_view(self):
+        """Bring back the active tab's labels, highlight and scroll position"""
+        tab = self.tab
+        self.playlist_name_label.config(text=tab.status)
+        self._update_duration_label()
+        if tab.selected_index is not None and tab.selected_index < len(tab.playlist_files):
+            self._select_index(tab.selected_index)
+        else:
+            self.playlist_box.selection_clear()
+        self.playlist_box.scroll_to(tab.scroll_top)
+        self.playlist_box.refresh()
+
+    def close_tab(self):
+        """Close the shown playlist tab and show the one used most recently before it"""
+        tab = self.tab
+        if tab.file_path not in self.tabs:
+            return
+        del self.tabs[tab.file_path]
+        self.tab_buttons.pop(tab.file_path).destroy()
+        self._layout_tabs()
+        self.logger.info('Closed playlist tab %s', tab.file_path)
+        if self.tabs:
+            self.show_tab(next(reversed(self.tabs.values())))
+        else:
+            self.show_tab(M3UTab(None, self.frame, self._on_filter_update))
+
+    def _unload_stale_tabs(self):
+        """Unload the least recently shown tabs while open playlists hold over MAX_LOADED_ENTRIES entries"""
+        total = sum(len(tab.playlist_files) for tab in self.tabs.values())
+        for tab in list(self.tabs.values()):
+            if total <= MAX_LOADED_ENTRIES:
+                break
+            if tab is self.tab or not tab.loaded:
+                continue
+            total -= len(tab.playlist_files)
+            self.logger.info('Unloading playlist tab %s (%s entries) to stay under %s entries',
+                             tab.file_path, len(tab.playlist_files), MAX_LOADED_ENTRIES)
+            tab.unload()
+
+    def _open_tabs(self):
+        """Every tab holding entries, including the empty tab while it is shown"""
+        tabs = list(self.tabs.values())
+        if self.tab.file_path not in self.tabs:
+            tabs.append(self.tab)
+        return tabs
+
+    def shutdown(self):
+        for tab in self._open_tabs():
+            tab.loader.cancel()
+            tab.expander.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_display_name(self, index):
+        """Text shown for a playlist row - the #EXTINF title or filename, indented when nested"""
+        title = self.display_names[index] or self.playlist_files.name(index)
+        if self._is_dead(index):
+            title = f'\u2717 {title}'
+        title = '  ' * self.depths[index] + ROW_MARKERS[self.row_kinds[index]] + title
+        if self.durations[index]:
+            return f'{title}  [{format_duration(self.durations[index])}]'
+        return title
+
+    def _entries_added(self, tab, paths):
+        """Index new entries for the filter, count known durations and queue the rest for preparsing"""
+        end = len(tab.playlist_files)
+        tab.search.entries_added(end - len(paths), end)
+        self._rows_added(tab, end - len(paths), end)
+
+    def _rows_added(self, tab, start, end):
+        """Add the durations of rows start..end-1 to the total and queue their URLs and unknown durations"""
+        paths = tab.playlist_files[start:end]
+        if self.prober is not None:
+            self.prober.request([path for path in paths if '://' in path])
+        unknown = []
+        for index, path in enumerate(paths, start):
+            if tab.durations[index] or tab.row_kinds[index] != ROW_MEDIA:
+                continue
+            info = self.metadata.info(path) if self.metadata is not None else None
+            if info is not None:
+                tab.durations[index] = info.duration_ms
+            else:
+                unknown.append(path)
+        tab.total_duration_ms += sum(tab.durations[start:end])
+        if self.metadata is not None and unknown:
+            self.metadata.request(unknown)
+        if tab is self.tab:
+            self._update_duration_label()
+
+    def on_metadata(self, results):
+        """Fill in durations #EXTINF did not give from freshly parsed media info, in every open tab"""
+        for tab in self._open_tabs():
+            changed = False
+            for path, info in results:
+                for index in tab.playlist_files.positions(path):
+                    if not tab.durations[index] and tab.row_kinds[index] == ROW_MEDIA:
+                        tab.durations[index] = info.duration_ms
+                        tab.total_duration_ms += info.duration_ms
+                        changed = True
+            if changed and tab is self.tab:
+                self._update_duration_label()
+                self.playlist_box.refresh()
+
+    def on_probe_results(self, results):
+        """Redraw once stream checks for entries of this playlist come back"""
+        if any(url in self.playlist_files for url, _ in results):
+            self.playlist_box.refresh()
+
+    def is_playable(self, index):
+        """Whether the row at index is media that can be played (not a nested playlist or a dead URL)"""
+        return self.row_kinds[index] == ROW_MEDIA and not self._is_dead(index)
+
+    def _is_dead(self, index):
+        """Whether the entry at index is a stream URL that failed its last reachability check"""
+        if self.prober is None:
+            return False
+        path = self.playlist_files[index]
+        return '://' in path and self.prober.is_dead(path)
+
+    def _update_duration_label(self):
+        """Total duration of the known entries, and what is left from the current one on"""
+        text = ""
+        if self.total_duration_ms:
+            text = f"Total: {format_duration(self.total_duration_ms)}"
+            if 0 <= self.current_index < len(self.durations):
+                remaining = sum(self.durations[self.current_index:])
+                text += f"  Remaining: {format_duration(remaining)}"
+        self.duration_label.config(text=text)
+
+    def toggle_nested(self, index):
+        """Open a collapsed nested playlist row, or close an open one"""
+        if self.row_kinds[index] == ROW_COLLAPSED:
+            self._expand(index)
+        elif self.row_kinds[index] == ROW_EXPANDED:
+            self._collapse(index)
+        else:
+            return
+        self._select_index(index)
+
+    def _expand(self, index, step=None):
+        """Start reading the nested playlist at index in the background; its entries go below it in batches
+
+        Blocks the row instead when the playlist is one of its own ancestors
+        or is nested deeper than MAX_NESTING_DEPTH. A tab reads one nested
+        playlist at a time: while one is in progress others are not opened,
+        and a next/previous (step) that reaches one waits for it to finish.
+        A step that opens the playlist is completed once it has been read.
+        """
+        tab = self.tab
+        path = tab.playlist_files[index]
+        depth = tab.depths[index] + 1
+        if depth > MAX_NESTING_DEPTH:
+            self.logger.warning('Not expanding %s: nested deeper than %s levels', path, MAX_NESTING_DEPTH)
+            tab.row_kinds[index] = ROW_BLOCKED
+            return
+        if os.path.realpath(path) in self._ancestors(index):
+            self.logger.warning('Not expanding %s: it includes itself', path)
+            tab.row_kinds[index] = ROW_BLOCKED
+            return
+        if tab.expanding is not None:
+            if step is not None:
+                tab.pending_step = (step, index - step)  # Try again from where the step came from
+            else:
+                self.logger.debug('Not expanding %s yet: still reading another nested playlist', path)
+            return
+
+        tab.row_kinds[index] = ROW_EXPANDED
+        tab.expanding, tab.expand_end = index, index + 1
+        tab.pending_step = (step, None) if step is not None else None
+        tab.expand_started = time.perf_counter()
+        tab.expander.start(
+            M3UStreamParser(path, batch_size=NESTED_BATCH_SIZE, cache=self.playlist_cache),
+            on_batch=lambda entries: self._on_nested_batch(tab, entries),
+            on_done=lambda error: self._on_nested_done(tab, error)
+        )
+        self.playlist_box.refresh()
+
+    def _on_nested_batch(self, tab, entries):
+        """Insert a batch of the nested playlist's entries below the ones read so far"""
+        start, count = tab.expand_end, len(entries)
+        selected = self._selected_index() if tab is self.tab else None
+        paths = [path for path, _, _ in entries]
+        tab.playlist_files.insert_many(start, paths)
+        tab.display_names[start:start] = [None if name == os.path.basename(path) else name
+                                          for path, name, _ in entries]
+        tab.durations[start:start] = array('I', (duration for _, _, duration in entries))
+        tab.row_kinds[start:start] = array('B', (ROW_COLLAPSED if is_playlist_path(path) else ROW_MEDIA
+                                                 for path in paths))
+        tab.depths[start:start] = array('B', [tab.depths[tab.expanding] + 1]) * count
+        tab.expand_end += count
+        tab.search.entries_inserted(start, count)
+        self._rows_moved(tab, start, 0, count)
+        self._rows_added(tab, start, start + count)
+        if tab is self.tab:
+            if selected is not None and selected >= start:
+                row = self.search.row_of(selected + count)
+                if row is not None:
+                    self.playlist_box.selection_set(row)
+            self.playlist_box.refresh()
+
+    def _on_nested_done(self, tab, error):
+        index, pending = tab.expanding, tab.pending_step
+        tab.expanding = tab.pending_step = None
+        path = tab.playlist_files[index]
+        if error is not None:
+            self.logger.error('Error reading nested playlist %s: %s', path, error)
+            self._collapse(index, tab)
+            tab.row_kinds[index] = ROW_BLOCKED
+        else:
+            perf.record('m3u_panel.expand_nested', time.perf_counter() - tab.expand_started)
+            self.logger.info('Expanded nested playlist %s: %s entries', path, tab.expand_end - index - 1)
+        if tab is not self.tab:
+            return
+        self.playlist_box.refresh()
+        if pending is None:
+            return
+
+        # Finish the next/previous that was waiting for this playlist
+        step, start = pending
+        if start is None:
+            start = index if step > 0 or error is not None else self._subtree_end(index)
+        next_index = self._step_index(step, start=start)
+        if next_index is not None:
+            self.current_index = next_index
+            self._select_index(next_index)
+            self._update_duration_label()
+            self.logger.info('Moving to M3U track %s after reading %s', self.playlist_files[next_index], path)
+            self.callback_play(self.playlist_files[next_index])
+
+    def _collapse(self, index, tab=None):
+        """Remove the rows of the expanded nested playlist at index, stopping a read in progress under it"""
+        tab = tab or self.tab
+        start, end = index + 1, self._subtree_end(index, tab)
+        if tab.expanding is not None and index <= tab.expanding < end:
+            tab.expander.cancel()
+            tab.expanding = tab.pending_step = None
+        tab.total_duration_ms -= sum(tab.durations[start:end])
+        tab.playlist_files.delete(start, end)
+        del tab.display_names[start:end]
+        del tab.durations[start:end]
+        del tab.row_kinds[start:end]
+        del tab.depths[start:end]
+        tab.row_kinds[index] = ROW_COLLAPSED
+        tab.search.entries_removed(range(start, end))
+        self._rows_moved(tab, start, end - start, 0)
+        if tab is self.tab:
+            self._update_duration_label()
+            self.playlist_box.refresh()
+
+    def _rows_moved(self, tab, start, removed, inserted):
+        """Rows start..start+removed-1 were replaced by inserted new ones: renumber the rows kept elsewhere
+
+        A row that was removed is replaced by the nested playlist row just above it.
+        """
+        def renumber(row):
+            if row >= start + removed:
+                return row + inserted - removed
+            return row if row < start else start - 1
+
+        if tab.current_index >= 0:
+            tab.current_index = renumber(tab.current_index)
+        if tab.expanding is not None and tab.expanding >= start + removed:
+            tab.expanding = renumber(tab.expanding)
+            tab.expand_end += inserted - removed
+        if tab.pending_step is not None and tab.pending_step[1] is not None:
+            tab.pending_step = (tab.pending_step[0], renumber(tab.pending_step[1]))
+        if self.on_rows_changed is not None:
+            self.on_rows_changed(tab.playlist_files, start, removed, inserted)
+
+    def _subtree_end(self, index, tab=None):
+        """Index just past the rows nested under index"""
+        depths = (tab or self.tab).depths
+        depth = depths[index]
+        end = index + 1
+        while end < len(depths) and depths[end] > depth:
+            end += 1
+        return end
+
+    def _ancestors(self, index):
+        """Real paths of the playlists that contain the row at index, including the loaded one"""
+        ancestors = {os.path.realpath(self.playlist_path)} if self.playlist_path else set()
+        depth = self.depths[index]
+        while depth and index > 0:
+            index -= 1
+            if self.depths[index] < depth:
+                depth = self.depths[index]
+                ancestors.add(os.path.realpath(self.playlist_files[index]))
+        return ancestors
+
+    def _on_view_change(self, top, rows):
+        """Parse the rows on screen before the rest of the playlist"""
+        if self.metadata is not None:
+            if self.search.active:
+                rows = min(rows, len(self.search.rows) - top)
+                self.metadata.prioritize([self.playlist_files[index] for index in self.search.rows[top:top + rows]])
+            else:
+                self.metadata.prioritize(self.playlist_files[top:top + rows])
 
     def add_to_playlist(self, file_path):
         """Add a single file to the playlist (for compatibility)"""
         if file_path not in self.playlist_files:
             self.playlist_files.append(file_path)
             filename = os.path.basename(file_path)
-            self.playlist_box.insert(tk.END, filename)
-            self.logger.debug(f'Added {filename} to M3U playlist')
+            self.display_names.append(None)
+            self.durations.append(0)
+            self.row_kinds.append(ROW_COLLAPSED if is_playlist_path(file_path) else ROW_MEDIA)
+            self.depths.append(0)
+            self._entries_added(self.tab, [file_path])
+            self.playlist_box.refresh()
+            self.logger.debug('Added %s to M3U playlist', filename)
 
             # If this is the first file, set it as current
             if len(self.playlist_files) == 1:
                 self.current_index = 0
-                self.playlist_box.selection_set(0)
+                self._select_index(0)
         else:
             # If the file is already in the playlist, select it only if this panel is being used
-            index = self.playlist_files.index(file_path)
+            index = self.playlist_files.index(file_path, prefer=self.current_index)
             self.current_index = index
-            self.playlist_box.selection_clear(0, tk.END)
-            self.playlist_box.selection_set(index)
-            self.playlist_box.see(index)
-            self.logger.debug(f'File already in M3U playlist, selected at index {index}')
+            self._select_index(index)
+            self.logger.debug('File already in M3U playlist, selected at index %s', index)
 
     def set_current_file(self, file_path):
         """Set current file without affecting UI selection - for internal tracking only"""
         if file_path in self.playlist_files:
-            self.current_index = self.playlist_files.index(file_path)
-            self.logger.debug(f'Updated current index to {self.current_index} for M3U file: {file_path}')
+            self.current_index = self.playlist_files.index(file_path, prefer=self.current_index)
+            self.logger.debug('Updated current index to %s for M3U file: %s', self.current_index, file_path)
+            self._update_duration_label()
             return True
         return False
 
     def update_visual_selection(self, file_path):
         """Update the visual selection in this panel"""
         if file_path in self.playlist_files:
-            index = self.playlist_files.index(file_path)
+            index = self.playlist_files.index(file_path, prefer=self.current_index)
             self.current_index = index
-            self.playlist_box.selection_clear(0, tk.END)
-            self.playlist_box.selection_set(index)
-            self.playlist_box.see(index)
-            self.logger.debug(f'Updated M3U visual selection to index {index}')
+            self._select_index(index)
+            self._update_duration_label()
+            self.logger.debug('Updated M3U visual selection to index %s', index)
 
     def clear_visual_selection(self):
         """Clear the visual selection in this panel"""
         self.playlist_box.selection_clear(0, tk.END)
 
     def play_selected(self, event=None):
-        """Play the selected file in the playlist"""
-        selection = self.playlist_box.curselection()
-        if selection:
-            index = selection[0]
+        """Play the selected file in the playlist, or open/close it if it is a nested playlist"""
+        index = self._selected_index()
+        if index is not None and self.row_kinds[index] != ROW_MEDIA:
+            self.toggle_nested(index)
+        elif index is not None:
             self.current_index = index
-            self.logger.debug(f'Selected M3U item at index {index}: {self.playlist_files[index]}')
+            self.logger.debug('Selected M3U item at index %s: %s', index, self.playlist_files[index])
             self.callback_play(self.playlist_files[index])
             # Highlight the currently playing item
-            self.playlist_box.selection_clear(0, tk.END)
-            self.playlist_box.selection_set(index)
+            self._select_index(index)
 
     def next_track(self):
         """Play the next track in the playlist"""
@@ -186,12 +703,19 @@ class M3UPanel:
             self.logger.debug('No tracks in M3U playlist')
             return None
 
-        if self.current_index < len(self.playlist_files) - 1:
-            self.current_index += 1
-            self.playlist_box.selection_clear(0, tk.END)
-            self.playlist_box.selection_set(self.current_index)
-            self.playlist_box.see(self.current_index)  # Ensure visible
-            self.logger.info(f'Moving to next M3U track: {self.playlist_files[self.current_index]}')
+        if self.stepping:
+            self.logger.debug('Still reading a nested playlist for the last next track')
+            return None
+
+        index = self._step_index(1)
+        if self.stepping:
+            self.logger.info('Reading nested playlist before moving to the next track')
+            return None
+        if index is not None:
+            self.current_index = index
+            self._select_index(index)  # Ensure visible
+            self._update_duration_label()
+            self.logger.info('Moving to next M3U track: %s', self.playlist_files[self.current_index])
             return self.playlist_files[self.current_index]
         else:
             self.logger.info('Already at last M3U track')
@@ -203,13 +727,98 @@ class M3UPanel:
             self.logger.debug('No tracks in M3U playlist')
             return None
 
-        if self.current_index > 0:
-            self.current_index -= 1
-            self.playlist_box.selection_clear(0, tk.END)
-            self.playlist_box.selection_set(self.current_index)
-            self.playlist_box.see(self.current_index)  # Ensure visible
-            self.logger.info(f'Moving to previous M3U track: {self.playlist_files[self.current_index]}')
+        if self.stepping:
+            self.logger.debug('Still reading a nested playlist for the last previous track')
+            return None
+
+        index = self._step_index(-1)
+        if self.stepping:
+            self.logger.info('Reading nested playlist before moving to the previous track')
+            return None
+        if index is not None:
+            self.current_index = index
+            self._select_index(index)  # Ensure visible
+            self._update_duration_label()
+            self.logger.info('Moving to previous M3U track: %s', self.playlist_files[self.current_index])
             return self.playlist_files[self.current_index]
         else:
             self.logger.info('Already at first M3U track')
             return None
+
+    def peek_next(self):
+        """Path next_track would move to, without moving (or opening nested playlists)"""
+        index = self._step_index(1, expand=False)
+        return self.playlist_files[index] if index is not None else None
+
+    def peek_previous(self):
+        """Path previous_track would move to, without moving (or opening nested playlists)"""
+        index = self._step_index(-1, expand=False)
+        return self.playlist_files[index] if index is not None else None
+
+    def _step_index(self, step, expand=True, start=None):
+        """Playlist index one track forward (step=1) or back (step=-1) from start (the current one), or None
+
+        With "Next/previous within filter" ticked, entries hidden by the
+        filter are skipped. Stream URLs known to be unreachable are skipped too.
+        Nested playlist rows are never played: a collapsed one that is reached
+        is expanded, and the step finishes once it has been read (see
+        stepping); with expand=False the search stops there instead.
+        """
+        index = self._adjacent_index(self.current_index if start is None else start, step)
+        while index is not None:
+            kind = self.row_kinds[index]
+            if kind == ROW_COLLAPSED or (kind == ROW_EXPANDED and index == self.tab.expanding):
+                if not expand:
+                    return None
+                if kind == ROW_COLLAPSED:
+                    self._expand(index, step=step)
+                else:
+                    self.tab.pending_step = (step, None)
+                if self.stepping:
+                    return None
+            elif self.is_playable(index):
+                return index
+            index = self._adjacent_index(index, step)
+        return None
+
+    @property
+    def stepping(self):
+        """Whether a next/previous is waiting for a nested playlist to be read"""
+        return self.tab.pending_step is not None
+
+    def _adjacent_index(self, index, step):
+        if self.search.active and self.filter_nav_var.get():
+            if step > 0:
+                return self.search.next_index(index)
+            return self.search.previous_index(min(index, len(self.playlist_files)))
+        adjacent = index + step
+        if 0 <= adjacent < len(self.playlist_files) and index <= len(self.playlist_files):
+            return adjacent
+        return None
+
+    def _select_index(self, index):
+        """Highlight and scroll to a playlist index, or clear the selection if it is filtered out"""
+        row = self.search.row_of(index)
+        if row is None:
+            self.playlist_box.selection_clear()
+        else:
+            self.playlist_box.selection_set(row)
+            self.playlist_box.see(row)
+
+    def _selected_index(self):
+        """Playlist index of the highlighted row, or None"""
+        selection = self.playlist_box.curselection()
+        return self.search.index_of(selection[0]) if selection else None
+
+    def _on_filter_typed(self, *args):
+        self._filter_selection = self._selected_index()
+        self.search.set_query(self.filter_var.get())
+
+    def _on_filter_update(self, tab, done):
+        """Redraw as filter results come in; restore the highlight once they are complete"""
+        if tab is not self.tab:
+            return
+        if done and self._filter_selection is not None:
+            self._select_index(self._filter_selection)
+            self._filter_selection = None
+        self.playlist_box.refresh()
@@ -0,0 +1,186 @@
+import os
+import threading
+import concurrent.futures
+from array import array
+from m3u_cache import M3UCache
+
+PLAYLIST_EXTENSIONS = ('.m3u', '.m3u8')
+MAX_DURATION_MS = 2 ** 32 - 1  # Durations are kept in uint32 arrays
+
+
+def is_playlist_path(path):
+    """Whether an entry is a local M3U/M3U8 file to expand rather than media to play
+
+    Remote .m3u8 URLs are HLS streams, which VLC plays itself.
+    """
+    return '://' not in path and path.lower().endswith(PLAYLIST_EXTENSIONS)
+
+
+def parse_extinf(line):
+    """(duration in ms, title or None) from an #EXTINF line; duration 0 when unknown or live"""
+    info, _, title = line[8:].partition(',')
+    try:
+        # Attributes (tvg-id="..." etc.) may follow the duration
+        duration_ms = int(float(info.split(None, 1)[0]) * 1000) if info.strip() else 0
+    except (ValueError, OverflowError):
+        duration_ms = 0
+    return min(max(0, duration_ms), MAX_DURATION_MS), title.strip() or None
+
+
+class M3UStreamParser:
+    """Parse an M3U/M3U8 file line by line, yielding entries in batches
+
+    Meant to run on a worker thread via BackgroundLoader. Each yield is a
+    (entries, progress) tuple where entries is a list of (path, display name,
+    duration in ms) and progress is the fraction of the file read so far.
+    The duration comes from #EXTINF and is 0 when it is missing or -1.
+
+    With a cache (an M3UCache), an unchanged playlist is served from it
+    without parsing, and a freshly parsed one is stored in it.
+    """
+
+    def __init__(self, file_path, batch_size=2000, cache=None):
+        self.file_path = file_path
+        self.batch_size = batch_size
+        self.cache = cache
+        self.playlist_title = ""
+        self.from_cache = False
+
+    def __call__(self, cancel_event):
+        stat = os.stat(self.file_path)
+        if self.cache is not None:
+            cached = self.cache.load(self.file_path, stat)
+            if cached is not None:
+                yield from self._replay(cached, cancel_event)
+                return
+
+        playlist_dir = os.path.dirname(self.file_path)
+        total_size = stat.st_size or 1
+        bytes_read = 0
+        current_title = None
+        current_duration = 0
+        batch = []
+        parsed = [] if self.cache is not None else None
+
+        with open(self.file_path, 'rb') as f:
+            for raw_line in f:
+                bytes_read += len(raw_line)
+                line = raw_line.decode('utf-8', errors='ignore').strip()
+
+                # Skip empty lines and comments (except #EXTINF)
+                if not line:
+                    continue
+
+                # Handle playlist title
+                if line.startswith('#PLAYLIST:'):
+                    self.playlist_title = line[10:].strip()
+
+                # Handle track info
+                elif line.startswith('#EXTINF:'):
+                    current_duration, current_title = parse_extinf(line)
+
+                # Skip other comments
+                elif line.startswith('#'):
+                    continue
+
+                # This should be a file path or URL
+                else:
+                    file_url = line
+                    display_name = current_title if current_title else os.path.basename(file_url)
+
+                    # Handle relative paths
+                    if not (file_url.startswith('http') or file_url.startswith('https') or os.path.isabs(file_url)):
+                        file_url = os.path.join(playlist_dir, file_url)
+                        file_url = os.path.normpath(file_url)
+
+                    batch.append((file_url, display_name, current_duration))
+
+                    # Reset current title for next track
+                    current_title = None
+                    current_duration = 0
+
+                    if len(batch) >= self.batch_size:
+                        if cancel_event.is_set():
+                            return
+                        if parsed is not None:
+                            parsed.extend(batch)
+                        yield batch, bytes_read / total_size
+                        batch = []
+
+        if parsed is not None and not cancel_event.is_set():
+            parsed.extend(batch)
+            self.cache.store(self.file_path, stat, self.playlist_title, [path for path, _, _ in parsed],
+                             [name for _, name, _ in parsed], [duration for _, _, duration in parsed])
+        yield batch, 1.0
+
+    def _replay(self, cached, cancel_event):
+        """Yield a cached playlist in the same batches a parse would"""
+        self.from_cache = True
+        self.playlist_title, paths, names, durations = cached
+        yield from _batches(paths, names, durations, self.batch_size, cancel_event)
+
+
+def _batches(paths, names, durations, batch_size, cancel_event):
+    """(entries, progress) batches from parsed columns"""
+    total = len(paths) or 1
+    for start in range(0, len(paths), batch_size):
+        if cancel_event.is_set():
+            return
+        end = start + batch_size
+        yield list(zip(paths[start:end], names[start:end], durations[start:end])), min(end, total) / total
+    if not paths:
+        yield [], 1.0
+
+
+def parse_m3u(file_path, cache=None):
+    """Parse a whole M3U/M3U8 file synchronously; returns (title, [(path, display name, duration ms)])"""
+    parser = M3UStreamParser(file_path, cache=cache)
+    entries = []
+    for batch, _ in parser(threading.Event()):
+        entries.extend(batch)
+    return parser.playlist_title, entries
+
+
+def parse_m3u_columns(file_path, cache_root=None):
+    """Parse a whole playlist in a worker process; returns (title, paths, names, durations, from_cache)
+
+    Columns pickle back to the parent much smaller and faster than a list of
+    entry tuples. With cache_root the worker reads and fills the M3UCache there.
+    """
+    parser = M3UStreamParser(file_path, batch_size=50000,
+                             cache=M3UCache(cache_root) if cache_root is not None else None)
+    paths, names, durations = [], [], array('I')
+    for batch, _ in parser(threading.Event()):
+        paths.extend(path for path, _, _ in batch)
+        names.extend(name for _, name, _ in batch)
+        durations.extend(duration for _, _, duration in batch)
+    return parser.playlist_title, paths, names, durations, parser.from_cache
+
+
+class PooledM3UParse:
+    """Parse a playlist on a process pool, as a BackgroundLoader producer
+
+    The parse is submitted as soon as the object is created, so creating
+    several lets them run in parallel. Once the worker is done the entries
+    are yielded in the same (entries, progress) batches M3UStreamParser
+    gives, and playlist_title and from_cache are set the same way.
+    """
+
+    def __init__(self, executor, file_path, batch_size=2000, cache_root=None):
+        self.file_path = file_path
+        self.batch_size = batch_size
+        self.playlist_title = ""
+        self.from_cache = False
+        self.future = executor.submit(parse_m3u_columns, file_path, cache_root)
+
+    def __call__(self, cancel_event):
+        while True:
+            try:
+                result = self.future.result(timeout=0.1)
+                break
+            except concurrent.futures.TimeoutError:
+                if cancel_event.is_set():
+                    self.future.cancel()
+                    return
+        self.playlist_title, paths, names, durations, self.from_cache = result
+        yield from _batches(paths, names, durations, self.batch_size, cancel_event)
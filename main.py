@@ -2,22 +2,43 @@ import tkinter as tk
 from tkinter import filedialog
 import vlc
 import logging
+import time
 from playlist_panel import PlaylistPanel
 from m3u_panel import M3UPanel
+from library_index import LibraryIndex
+from m3u_cache import M3UCache
+from media_metadata import MediaPreparser
+from url_prober import UrlProber
+from media_cache import MediaCache
+from player_events import PlayerEventBridge
+from tk_wakeup import TkWakeup
+from log_setup import setup_logging, LogThrottle
+from tag_store import TagStore
+from resume_store import ResumeStore
+from tag_panel import TagPanel
+from stats_panel import StatsPanel
+from perf import perf, timed
+from thumbnails import ThumbnailGenerator, PRIORITY_CURRENT, PRIORITY_NEXT
+from seek_preview import SeekPreview
+from seek_scheduler import SeekScheduler
+from list_engine import ListPlayerEngine, PLAYBACK_MODES
+from vlc_profiles import ProfileConfig
+
+# Upper bound on how often playback events (time slider updates) reach the UI
+PLAYER_EVENT_RATE = 4
+# Arrow key jumps, in ms (with Shift held: the long one)
+JUMP_MS = 5000
+LONG_JUMP_MS = 30000
 
 class SimpleVideoPlayer:
-    def __init__(self, root):
-        # Set up logger to log to a file
+    def __init__(self, root, profile=None, probe_urls=True):
+        # Handlers are installed by setup_logging(); this only queues records
         self.logger = logging.getLogger(__name__)
-        logging.basicConfig(
-            level=logging.DEBUG,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler("vlc_tagger.log", encoding="utf-8"),
-                logging.StreamHandler()
-            ]
-        )
         self.logger.debug('Initializing SimpleVideoPlayer')
+        self.init_started = time.perf_counter()
+
+        # Volume/seek fire on every slider move, so their logging is throttled
+        self.log_throttle = LogThrottle(interval=0.5)
 
         self.root = root
         self.root.title("Simple Video Player")
@@ -39,14 +60,55 @@ class SimpleVideoPlayer:
         self.sidebar_frame.pack(side=tk.RIGHT, fill=tk.Y)
         self.sidebar_frame.pack_propagate(False)  # Maintain fixed width
 
+        # Persistent index of scanned folders, so reopening one is instant
+        try:
+            self.library = LibraryIndex()
+        except Exception as e:
+            self.logger.error('Library index unavailable, folders will be rescanned: %s', e)
+            self.library = None
+
+        # Background preparsing of durations/resolution, results are drained on the Tk thread when woken
+        self.metadata_wakeup = TkWakeup(self.root, self.on_metadata_ready)
+        self.preparser = MediaPreparser(notify=self.metadata_wakeup.set)
+
         # Folder playlist panel (top half)
-        self.playlist_panel = PlaylistPanel(self.sidebar_frame, self.play_file)
+        self.playlist_panel = PlaylistPanel(self.sidebar_frame, self.play_file, library=self.library,
+                                            metadata=self.preparser)
         self.playlist_panel.frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=2, pady=(2, 1))
 
+        # Parsed playlists, so reopening an unchanged M3U skips parsing
+        try:
+            self.m3u_cache = M3UCache()
+        except OSError as e:
+            self.logger.error('Playlist cache unavailable: %s', e)
+            self.m3u_cache = None
+
+        # Reachability checks for stream URLs in M3U playlists, drained the same way
+        # (probe_urls=False turns them off, e.g. for benchmarks that must stay off the network)
+        self.probe_wakeup = TkWakeup(self.root, self.on_probe_results)
+        self.url_prober = UrlProber(notify=self.probe_wakeup.set) if probe_urls else None
+
         # M3U playlist panel (bottom half)
-        self.m3u_panel = M3UPanel(self.sidebar_frame, self.play_file)
+        self.m3u_panel = M3UPanel(self.sidebar_frame, self.play_file, metadata=self.preparser,
+                                  playlist_cache=self.m3u_cache, prober=self.url_prober,
+                                  on_rows_changed=self.on_playlist_rows_changed)
         self.m3u_panel.frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=2, pady=(1, 2))
 
+        # Timestamp tags for the current file
+        self.current_file = None
+        self.tag_store = TagStore()
+        self.tag_panel = TagPanel(self.sidebar_frame, self.tag_store, self.get_position, self.seek_to)
+        self.tag_panel.frame.pack(side=tk.TOP, fill=tk.BOTH, padx=2, pady=(1, 2))
+
+        # Where each file was left off, restored with one seek when it starts playing again
+        self.resume_store = ResumeStore()
+        self.pending_resume = None  # (path, position ms) until MediaPlayerPlaying arrives
+
+        # Tagging hotkeys work during playback, except while typing in an entry
+        for key, action in (('i', self.tag_panel.mark_in), ('o', self.tag_panel.mark_out),
+                            ('t', self.tag_panel.quick_tag)):
+            self.root.bind(f'<KeyPress-{key}>', lambda event, action=action: self.on_hotkey(event, action))
+
         # Track which panel is currently active
         self.active_panel = 'folder'  # 'folder' or 'm3u'
 
@@ -54,9 +116,18 @@ class SimpleVideoPlayer:
         self.controls_frame = tk.Frame(self.main_frame)
         self.controls_frame.pack(fill=tk.X)
 
-        # VLC instance and media player
-        self.instance = vlc.Instance()
-        self.player = self.instance.media_player_new()
+        # VLC instance, media player and the parts built on them are created by ensure_player()
+        # on first playback, with the arguments of the chosen profile from vlc_profiles.json
+        self.vlc_profiles = ProfileConfig()
+        self.vlc_profile = profile
+        self.instance = None
+        self.player = None
+        self.media_cache = None
+        self.list_engine = None
+
+        # Track switch latency: button press (or play request) to MediaPlayerPlaying
+        self.switch_started = None
+        self.first_frame_started = None
 
         # Open button
         self.open_button = tk.Button(self.controls_frame, text="Open Video", command=self.open_file)
@@ -89,30 +160,115 @@ class SimpleVideoPlayer:
         self.volume_slider.set(100)
         self.volume_slider.pack(side=tk.LEFT)
 
-        # Time bar (seek bar) - bind to drag events instead of command
-        self.time_slider = tk.Scale(self.controls_frame, from_=0, to=100, orient=tk.HORIZONTAL, length=300)
+        # Time bar (seek bar) - fast seeks follow the pointer while dragging, one precise seek on release
+        self.time_slider = tk.Scale(self.controls_frame, from_=0, to=100, resolution=0.1, orient=tk.HORIZONTAL,
+                                    length=300, command=self.on_seek_drag)
         self.time_slider.pack(side=tk.LEFT)
         self.time_slider.bind("<ButtonRelease-1>", self.on_seek_release)
         self.time_slider.bind("<Button-1>", self.on_seek_start)
 
-        self.updating_slider = False
+        # Every seek goes through one scheduler, so only one is ever in flight
+        self.seeker = SeekScheduler(self.root, lambda: self.media_length)
+        for key, action in (('Left', lambda: self.seeker.jump(-JUMP_MS)),
+                            ('Right', lambda: self.seeker.jump(JUMP_MS)),
+                            ('Shift-Left', lambda: self.seeker.jump(-LONG_JUMP_MS)),
+                            ('Shift-Right', lambda: self.seeker.jump(LONG_JUMP_MS)),
+                            ('comma', lambda: self.seeker.step_frame(-1)),
+                            ('period', lambda: self.seeker.step_frame(1))):
+            self.root.bind(f'<KeyPress-{key}>', lambda event, action=action: self.on_hotkey(event, action))
+
+        # Hover thumbnails over the seek bar, generated by a background process pool
+        self.thumbnails = ThumbnailGenerator()
+        self.seek_preview = SeekPreview(self.root, self.time_slider, self.thumbnails, lambda: self.current_file)
+
         self.seeking = False
-        self.root.after(500, self.update_time_slider)
+        self.media_length = 0
+
+        # Position/length/end-of-media arrive as libvlc events instead of polling
+        self.player_events = PlayerEventBridge(self.root, max_rate=PLAYER_EVENT_RATE)
+
+        # Optional engine mode: libvlc's MediaListPlayer advances through the active panel
+        self.engine_var = tk.BooleanVar(value=False)
+        self.engine_var.trace_add('write', self._on_engine_toggled)
+        self.engine_check = tk.Checkbutton(self.controls_frame, text="libvlc playlist", variable=self.engine_var)
+        self.engine_check.pack(side=tk.LEFT)
+        self.playback_mode_var = tk.StringVar(value=PLAYBACK_MODES[0])
+        self.playback_mode_menu = tk.OptionMenu(self.controls_frame, self.playback_mode_var, *PLAYBACK_MODES,
+                                                command=self.set_playback_mode)
+        self.playback_mode_menu.pack(side=tk.LEFT)
+
+        # Performance overlay (F12); sampling only runs while it is enabled
+        self.stats_panel = StatsPanel(self.root, self.player)
+        self.root.bind('<F12>', self.stats_panel.toggle)
+
+        # Time until the window is drawn and idle, libvlc startup is no longer part of it
+        self.root.after_idle(self.on_window_ready)
+
+    def on_window_ready(self):
+        perf.record('startup.window_ready', time.perf_counter() - self.init_started)
+        self.logger.info('Window ready after %.0f ms', (time.perf_counter() - self.init_started) * 1000)
+
+    def ensure_player(self):
+        """Create the libvlc instance and everything that needs it, once, on first playback"""
+        if self.player is not None:
+            return
+        with perf.span('player.create_instance'):
+            self._create_player()
+
+    def _create_player(self):
+        args = self.vlc_profiles.args(self.vlc_profile)
+        self.logger.info('Creating VLC instance (profile %s): %s',
+                         self.vlc_profile or self.vlc_profiles.active, ' '.join(args))
+        self.instance = vlc.Instance(args)
+        self.player = self.instance.media_player_new()
+        self.player.audio_set_volume(int(self.volume_slider.get()))
+
+        # Recently used and prefetched neighbour media, so track switches skip the probe
+        self.media_cache = MediaCache(self.instance, capacity=8)
+
+        events = self.player.event_manager()
+        events.event_attach(vlc.EventType.MediaPlayerPlaying, self.on_player_playing)
+        events.event_attach(vlc.EventType.MediaPlayerVout, self.on_player_vout)
+        self.player_events.connect(events, vlc.EventType.MediaPlayerTimeChanged, self.update_time_slider,
+                                   extract=lambda event: event.u.new_time)
+        self.player_events.connect(events, vlc.EventType.MediaPlayerLengthChanged, self.on_length_changed,
+                                   extract=lambda event: event.u.new_length)
+        self.player_events.connect(events, vlc.EventType.MediaPlayerEndReached, self.on_end_reached)
+        self.player_events.connect(events, vlc.EventType.MediaPlayerPlaying, self.on_playing)
+        self.seeker.attach(self.player, events, vlc.EventType.MediaPlayerPositionChanged)
+
+        self.list_engine = ListPlayerEngine(self.instance, self.player, self.player_events,
+                                            on_track=self.on_engine_track, on_finished=self.on_engine_finished)
+        self.list_engine.set_mode(self.playback_mode_var.get())
+        self.stats_panel.player = self.player
+
+    def _on_engine_toggled(self, *args):
+        """Turning the libvlc playlist off detaches its list; the current track plays on and next_track takes over"""
+        if not self.engine_var.get() and self.list_engine is not None and self.list_engine.media_list is not None:
+            self.logger.info('libvlc playlist turned off, detaching the list player')
+            self.list_engine.detach()
+
+    def set_playback_mode(self, mode):
+        if self.list_engine is not None:
+            self.list_engine.set_mode(mode)
 
     def open_file(self):
         self.logger.debug('Open file dialog triggered')
         file_path = filedialog.askopenfilename(filetypes=[("Video files", "*.mp4 *.avi *.mkv")])
         if file_path:
-            self.logger.info(f'File selected: {file_path}')
+            self.logger.info('File selected: %s', file_path)
             # Add to folder playlist
             self.playlist_panel.add_to_playlist(file_path)
             self.play_file(file_path)
         else:
             self.logger.info('No file selected')
 
+    @timed('player.play_file')
     def play_file(self, file_path):
         """Play a specific file"""
-        self.logger.info(f'Playing file: {file_path}')
+        self.logger.info('Playing file: %s', file_path)
+        if self.switch_started is None:
+            self.switch_started = time.perf_counter()
 
         # Determine which panel contains the file and set it as active
         in_folder_panel = file_path in self.playlist_panel.playlist_files
@@ -145,14 +301,114 @@ class SimpleVideoPlayer:
             self.playlist_panel.clear_visual_selection()
             self.m3u_panel.clear_visual_selection()
 
+        self.ensure_player()
+        self.seeker.cancel()
+        self.save_resume_position()
         self.player.set_xwindow(self.canvas.winfo_id())
-        media = self.instance.media_new(file_path)
-        self.player.set_media(media)
-        self.player.play()
+        self.media_length = 0  # Updated by MediaPlayerLengthChanged once the media opens
+        self.time_slider.set(0)
+        panel = self.get_active_panel()
+        if (self.engine_var.get() and file_path in panel.playlist_files
+                and panel.is_playable(panel.current_index)):
+            self.list_engine.play(panel.playlist_files, panel.current_index, playable=panel.is_playable)
+        else:
+            self.list_engine.stop()
+            media = self.media_cache.get(file_path)
+            self.player.set_media(media)
+            self.player.play()
         self.play_pause_button.config(text="Pause")
 
+        self.current_file = file_path
+        self.tag_panel.set_file(file_path)
+        self.prefetch_neighbours()
+        self.seek_preview.request(file_path, PRIORITY_CURRENT)
+        self.queue_resume(file_path)
+
+    def queue_resume(self, file_path):
+        """Seek to the saved position of file_path once it is playing"""
+        position = self.resume_store.position(file_path)
+        self.pending_resume = (file_path, position) if position is not None else None
+
+    def save_resume_position(self):
+        """Record where the current file is, before switching away from it or closing"""
+        if self.current_file is not None:
+            self.resume_store.update(self.current_file, self.player.get_time(), self.media_length)
+
+    def on_playing(self, value=None):
+        """MediaPlayerPlaying handler (Tk thread): apply a pending resume position"""
+        self.apply_resume()
+
+    def apply_resume(self):
+        """Seek to the pending resume position through the seeker, once the media length is known"""
+        if self.pending_resume is None or self.media_length <= 0:
+            return  # The seeker ignores seeks into media of unknown length
+        pending, self.pending_resume = self.pending_resume, None
+        if pending[0] == self.current_file:
+            self.logger.info('Resuming %s at %d ms', pending[0], pending[1])
+            self.seeker.seek(pending[1])
+
+    def get_active_panel(self):
+        return self.playlist_panel if self.active_panel == 'folder' else self.m3u_panel
+
+    def engine_running(self):
+        return self.engine_var.get() and self.list_engine is not None and self.list_engine.media_list is not None
+
+    def on_engine_track(self, index):
+        """The list player started another item on its own: follow it in the panels"""
+        file_path = self.list_engine.paths[index]
+        panel = self.get_active_panel()
+        if panel.playlist_files is self.list_engine.paths:
+            panel.current_index = index
+        panel.update_visual_selection(file_path)
+        if file_path != self.current_file:
+            # The previous file's position came in with its last time sample, the player has moved on
+            self.current_file = file_path
+            self.tag_panel.set_file(file_path)
+            self.prefetch_neighbours()
+            self.seek_preview.request(file_path, PRIORITY_CURRENT)
+            self.queue_resume(file_path)
+            if self.player.get_state() == vlc.State.Playing:
+                self.on_playing()
+
+    def on_playlist_rows_changed(self, playlist, start, removed, inserted):
+        """Opening or closing a nested playlist moved rows: keep the list player's mirror in step"""
+        if self.engine_running() and self.list_engine.paths is playlist:
+            self.list_engine.rows_changed(start, removed, inserted)
+
+    def on_engine_finished(self, value=None):
+        """The list player ran off the end of the active panel; fall back to the other one"""
+        self.logger.debug('List player reached the end of its playlist')
+        self.next_track()
+
+    def prefetch_neighbours(self):
+        """Prepare the likely next and previous tracks, following next_track's panel fallback"""
+        if self.active_panel == 'folder':
+            panels = (self.playlist_panel, self.m3u_panel)
+        else:
+            panels = (self.m3u_panel, self.playlist_panel)
+
+        for peek in ('peek_next', 'peek_previous'):
+            for panel in panels:
+                path = getattr(panel, peek)()
+                if path:
+                    self.media_cache.prefetch(path)
+                    if peek == 'peek_next':
+                        self.seek_preview.request(path, PRIORITY_NEXT)
+                    break
+
+    def on_player_playing(self, event):
+        """libvlc thread: log how long the last switch took to start playing"""
+        started, self.switch_started = self.switch_started, None
+        self.first_frame_started = started
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            perf.record('player.track_switch', elapsed)
+            self.logger.info('Track switch took %.0f ms', elapsed * 1000)
+
     def play_pause(self):
         self.logger.debug('Play/Pause button pressed')
+        if self.player is None:
+            return  # Nothing has been played yet
         is_playing = self.player.is_playing()
         if is_playing:
             self.logger.info('Pausing playback')
@@ -165,10 +421,15 @@ class SimpleVideoPlayer:
 
     def stop(self):
         self.logger.debug('Stop button pressed')
-        self.player.stop()
+        if self.player is not None:
+            self.player.stop()
 
+    @timed('player.previous_track')
     def previous_track(self):
         self.logger.debug('Previous track button pressed')
+        self.switch_started = time.perf_counter()
+        if self.engine_running() and self.list_engine.previous():
+            return
 
         # Try the active panel first, then fall back to the other panel
         prev_track = None
@@ -178,16 +439,23 @@ class SimpleVideoPlayer:
                 prev_track = self.m3u_panel.previous_track()
         else:
             prev_track = self.m3u_panel.previous_track()
-            if not prev_track:
+            if not prev_track and not self.m3u_panel.stepping:
                 prev_track = self.playlist_panel.previous_track()
 
         if prev_track:
             self.play_file(prev_track)
+        elif self.m3u_panel.stepping:
+            self.logger.info('Waiting for a nested playlist to be read before playing the previous track')
         else:
+            self.switch_started = None
             self.logger.info('No previous track available')
 
+    @timed('player.next_track')
     def next_track(self):
         self.logger.debug('Next track button pressed')
+        self.switch_started = time.perf_counter()
+        if self.engine_running() and self.list_engine.next():
+            return
 
         # Try the active panel first, then fall back to the other panel
         next_track = None
@@ -197,16 +465,21 @@ class SimpleVideoPlayer:
                 next_track = self.m3u_panel.next_track()
         else:
             next_track = self.m3u_panel.next_track()
-            if not next_track:
+            if not next_track and not self.m3u_panel.stepping:
                 next_track = self.playlist_panel.next_track()
 
         if next_track:
             self.play_file(next_track)
+        elif self.m3u_panel.stepping:
+            self.logger.info('Waiting for a nested playlist to be read before playing the next track')
         else:
+            self.switch_started = None
             self.logger.info('No next track available')
 
     def mute(self):
         self.logger.debug('Mute button pressed')
+        if self.player is None:
+            return
         is_muted = self.player.audio_get_mute()
         self.player.audio_toggle_mute()
         if is_muted:
@@ -218,17 +491,17 @@ class SimpleVideoPlayer:
 
     def set_volume(self, value):
         volume = int(value)
-        self.logger.debug(f'Setting volume to {volume}')
-        self.player.audio_set_volume(volume)
-        self.logger.info(f'Volume set to {volume}')
-
-    def seek(self, value):
-        if self.player.get_length() > 0:
-            self.updating_slider = True
-            seek_time = int(float(value) / 100 * self.player.get_length())
-            self.logger.debug(f'Seeking to {seek_time} ms')
-            self.player.set_time(seek_time)
-            self.updating_slider = False
+        if self.player is not None:  # Otherwise applied when the player is created
+            self.player.audio_set_volume(volume)
+        if self.log_throttle.ready('volume'):
+            self.logger.debug('Volume set to %d', volume)
+
+    def on_seek_drag(self, value):
+        """Slider value changed; while the user drags it, let the picture follow"""
+        if self.seeking:
+            if self.log_throttle.ready('seek'):
+                self.logger.debug('Scrubbing to %.1f%%', float(value))
+            self.seeker.scrub(float(value) / 100)
 
     def on_seek_start(self, event):
         """Called when user starts dragging the time slider"""
@@ -236,31 +509,101 @@ class SimpleVideoPlayer:
 
     def on_seek_release(self, event):
         """Called when user releases the time slider"""
-        if self.player.get_length() > 0:
+        if self.media_length > 0:
             value = self.time_slider.get()
-            seek_time = int(float(value) / 100 * self.player.get_length())
-            self.logger.debug(f'Seeking to {seek_time} ms')
-            self.player.set_time(seek_time)
+            seek_time = int(float(value) / 100 * self.media_length)
+            self.logger.debug('Seeking to %d ms', seek_time)
+            self.seeker.seek(seek_time)
         self.seeking = False
 
-    def update_time_slider(self):
-        if self.player.get_length() > 0 and not self.updating_slider and not self.seeking:
-            pos = self.player.get_time() / self.player.get_length() * 100
+    def update_time_slider(self, time_ms):
+        """MediaPlayerTimeChanged handler (Tk thread, rate limited)"""
+        self.tag_panel.update_time(time_ms)
+        if self.seeking or self.seeker.busy:
+            return  # The reported time is from before the seek still landing
+        if self.current_file is not None:
+            self.resume_store.update(self.current_file, time_ms, self.media_length)
+        if self.media_length > 0:
+            pos = time_ms / self.media_length * 100
             self.time_slider.set(pos)
-        self.root.after(500, self.update_time_slider)
+
+    def on_length_changed(self, length_ms):
+        self.media_length = length_ms
+        if self.pending_resume is not None and self.player.get_state() == vlc.State.Playing:
+            self.apply_resume()  # Playing came first, the seek waited for the length
+
+    def on_end_reached(self, value=None):
+        """Advance automatically when the current media finishes"""
+        self.logger.debug('End of media reached')
+        if self.engine_running():
+            return  # The list player moves on by itself
+        self.next_track()
+
+    def on_metadata_ready(self):
+        """Hand newly parsed media info to both panels"""
+        results = self.preparser.poll()
+        if results:
+            self.playlist_panel.on_metadata(results)
+            self.m3u_panel.on_metadata(results)
+
+    def on_probe_results(self):
+        results = self.url_prober.poll()
+        if results:
+            self.m3u_panel.on_probe_results(results)
+
+    def on_player_vout(self, event):
+        """libvlc thread: video output is up, i.e. the first frame is about to be shown"""
+        started = self.first_frame_started or self.switch_started
+        self.first_frame_started = None
+        if started is not None:
+            perf.record('player.first_frame', time.perf_counter() - started)
+
+    def get_position(self):
+        """(path, time in ms) of the current media, for tagging"""
+        if self.current_file is None:
+            return None, 0
+        return self.current_file, max(0, self.player.get_time())
+
+    def seek_to(self, time_ms):
+        self.seeker.seek(time_ms)
+
+    def on_hotkey(self, event, action):
+        if isinstance(event.widget, tk.Entry):
+            return
+        action()
 
     def on_close(self):
         self.logger.info('Closing application, releasing VLC player')
-        try:
-            self.player.stop()
-            self.player.release()
-            self.instance.release()
-        except Exception as e:
-            self.logger.error(f'Error releasing VLC resources: {e}')
+        if self.player is not None:
+            try:
+                self.save_resume_position()
+                self.player.stop()
+                self.list_engine.release()
+                self.media_cache.clear()
+                self.player.release()
+                self.instance.release()
+            except Exception as e:
+                self.logger.error('Error releasing VLC resources: %s', e)
+        self.player_events.close()
+        self.preparser.shutdown()
+        if self.url_prober is not None:
+            self.url_prober.shutdown()
+        self.metadata_wakeup.close()
+        self.probe_wakeup.close()
+        self.m3u_panel.shutdown()
+        self.thumbnails.shutdown()
+        self.tag_store.close()
+        self.resume_store.close()
+        self.playlist_panel.stop_watching()
+        if self.library is not None:
+            self.playlist_panel.loader.cancel()
+            self.library.close()
         self.root.destroy()
 
 if __name__ == "__main__":
+    log_listener = setup_logging()
     root = tk.Tk()
     app = SimpleVideoPlayer(root)
     root.protocol("WM_DELETE_WINDOW", app.on_close)
     root.mainloop()
+    log_listener.stop()
@@ -0,0 +1,62 @@
+import logging
+from collections import OrderedDict
+
+
+class MediaCache:
+    """Size-capped LRU cache of vlc.Media objects
+
+    The cache owns one reference to every Media it holds and releases it on
+    eviction; a MediaPlayer that was given the media keeps its own reference,
+    so evicting the currently playing item is safe. Prefetched items are
+    preparsed asynchronously so the demuxer probe is already done when the
+    track is switched to.
+    """
+
+    def __init__(self, instance, capacity=8, parse_timeout_ms=3000):
+        self.logger = logging.getLogger(__name__)
+        self.instance = instance
+        self.capacity = capacity
+        self.parse_timeout_ms = parse_timeout_ms
+        self._media = OrderedDict()
+
+    def __contains__(self, path):
+        return path in self._media
+
+    def __len__(self):
+        return len(self._media)
+
+    def get(self, path):
+        """Media for path, created on a miss; the cache keeps ownership"""
+        media = self._media.get(path)
+        if media is not None:
+            self._media.move_to_end(path)
+            self.logger.debug('Media cache hit: %s', path)
+            return media
+
+        media = self.instance.media_new(path)
+        self._media[path] = media
+        self._evict()
+        return media
+
+    def prefetch(self, path):
+        """Create and preparse the media for a track that is likely to be played next"""
+        if path in self._media:
+            self._media.move_to_end(path)
+            return
+        import vlc
+
+        media = self.get(path)
+        flags = vlc.MediaParseFlag.network if '://' in path else vlc.MediaParseFlag.local
+        media.parse_with_options(flags, self.parse_timeout_ms)
+        self.logger.debug('Prefetching %s', path)
+
+    def clear(self):
+        while self._media:
+            _, media = self._media.popitem(last=False)
+            media.release()
+
+    def _evict(self):
+        while len(self._media) > self.capacity:
+            path, media = self._media.popitem(last=False)
+            media.release()
+            self.logger.debug('Evicted media from cache: %s', path)
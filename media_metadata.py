@@ -0,0 +1,254 @@
+import os
+import heapq
+import queue
+import sqlite3
+import threading
+import logging
+from collections import namedtuple
+from app_paths import data_path
+
+MediaInfo = namedtuple('MediaInfo', ['duration_ms', 'width', 'height', 'codec'])
+
+# Request priorities: rows on screen are parsed before the rest of the playlist
+PRIORITY_VISIBLE = 0
+PRIORITY_BACKGROUND = 1
+
+
+def format_duration(duration_ms):
+    """Format milliseconds as H:MM:SS or M:SS"""
+    seconds = int(duration_ms // 1000)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if hours:
+        return f'{hours}:{minutes:02d}:{seconds:02d}'
+    return f'{minutes}:{seconds:02d}'
+
+
+class MetadataCache:
+    """SQLite cache of parsed media info keyed by (path, size, mtime)
+
+    Not thread-safe: it is only used from the preparser's dispatch thread.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or data_path('metadata.db')
+        self._conn = sqlite3.connect(self.db_path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS media ('
+            'path TEXT PRIMARY KEY, size INTEGER, mtime REAL, '
+            'duration_ms INTEGER, width INTEGER, height INTEGER, codec TEXT)'
+        )
+        self._conn.commit()
+
+    def get(self, path, size, mtime):
+        row = self._conn.execute(
+            'SELECT duration_ms, width, height, codec FROM media WHERE path = ? AND size = ? AND mtime = ?',
+            (path, size, mtime)
+        ).fetchone()
+        return MediaInfo(*row) if row else None
+
+    def put(self, path, size, mtime, info):
+        self._conn.execute(
+            'INSERT OR REPLACE INTO media (path, size, mtime, duration_ms, width, height, codec) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (path, size, mtime) + tuple(info)
+        )
+
+    def commit(self):
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+def _default_instance():
+    import vlc
+    return vlc.Instance('--quiet', '--no-video', '--no-audio')
+
+
+class MediaPreparser:
+    """Background pool that preparses media with libvlc and caches the results
+
+    Paths are requested with request(); the ones currently on screen can be
+    bumped with prioritize(). A single dispatch thread checks the on-disk
+    cache first and otherwise starts Media.parse_with_options, keeping at most
+    max_concurrent parses in flight. Finished results are collected on a queue;
+    notify() is called from the worker thread when the queue goes from empty to
+    non-empty, and the Tk side drains it with poll().
+    """
+
+    def __init__(self, notify=None, instance_factory=_default_instance, cache_path=None,
+                 max_concurrent=4, timeout_ms=5000):
+        self.logger = logging.getLogger(__name__)
+        self.notify = notify
+        self.instance_factory = instance_factory
+        self.cache_path = cache_path
+        self.max_concurrent = max_concurrent
+        self.timeout_ms = timeout_ms
+
+        # Results known so far, readable from the Tk thread
+        self.known = {}
+        # Paths that cannot be parsed (URLs, missing or broken files)
+        self._skipped = set()
+        # Paths whose result was published, possibly not polled into known yet
+        self._published = set()
+
+        self._results = queue.Queue()
+        self._condition = threading.Condition()
+        self._heap = []
+        self._queued = {}     # path -> best queued priority
+        self._in_flight = {}  # path -> (media, size, mtime)
+        self._finished = []   # (path, info) reported by libvlc callbacks
+        self._seq = 0
+        self._stopped = False
+        self._thread = None
+
+    def request(self, paths, priority=PRIORITY_BACKGROUND):
+        """Queue local files for parsing; already known, published or queued paths are skipped
+
+        Every path is published at most once, so callers can add up durations
+        from poll() without checking for repeats.
+        """
+        with self._condition:
+            for path in paths:
+                if path in self._published or path in self._in_flight or path in self._skipped:
+                    continue
+                queued = self._queued.get(path)
+                if queued is not None and queued <= priority:
+                    continue
+                self._queued[path] = priority
+                self._seq += 1
+                heapq.heappush(self._heap, (priority, self._seq, path))
+            self._ensure_thread()
+            self._condition.notify()
+
+    def prioritize(self, paths):
+        """Move paths (typically the visible rows) to the front of the queue"""
+        self.request(paths, PRIORITY_VISIBLE)
+
+    def info(self, path):
+        """Cached MediaInfo for path, or None if it is not known yet"""
+        return self.known.get(path)
+
+    def poll(self):
+        """Drain finished results on the Tk thread; returns a list of (path, info)"""
+        results = []
+        while True:
+            try:
+                path, info = self._results.get_nowait()
+            except queue.Empty:
+                return results
+            self.known[path] = info
+            results.append((path, info))
+
+    def shutdown(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='media-preparser', daemon=True)
+            self._thread.start()
+
+    def _publish(self, path, info):
+        with self._condition:
+            self._published.add(path)
+        was_empty = self._results.empty()
+        self._results.put((path, info))
+        if was_empty and self.notify is not None:
+            self.notify()
+
+    def _run(self):
+        cache = MetadataCache(self.cache_path)
+        instance = None
+        try:
+            while True:
+                with self._condition:
+                    while not self._stopped and not self._finished and (
+                            not self._heap or len(self._in_flight) >= self.max_concurrent):
+                        self._condition.wait()
+                    if self._stopped:
+                        return
+                    finished, self._finished = self._finished, []
+                    path = None
+                    if self._heap and len(self._in_flight) < self.max_concurrent:
+                        priority, _, path = heapq.heappop(self._heap)
+                        # Stale heap entry superseded by a higher priority request
+                        if self._queued.get(path) != priority:
+                            path = None
+                        else:
+                            del self._queued[path]
+                            # Requeued while the dispatcher was still handling it
+                            if path in self._published or path in self._in_flight:
+                                path = None
+
+                for done_path, info in finished:
+                    entry = self._in_flight.pop(done_path, None)
+                    if entry is None:
+                        continue  # Duplicate parsed event
+                    media, size, mtime = entry
+                    media.release()
+                    if info is None:
+                        self._skipped.add(done_path)
+                    else:
+                        cache.put(done_path, size, mtime, info)
+                        self._publish(done_path, info)
+                if finished:
+                    cache.commit()
+
+                if path is None:
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # URLs and missing files are not preparsed
+                    self._skipped.add(path)
+                    continue
+
+                info = cache.get(path, stat.st_size, stat.st_mtime)
+                if info is not None:
+                    self._publish(path, info)
+                    continue
+
+                if instance is None:
+                    instance = self.instance_factory()
+                self._start_parse(instance, path, stat)
+        except Exception as e:
+            self.logger.error('Media preparser stopped: %s', e)
+        finally:
+            cache.close()
+
+    def _start_parse(self, instance, path, stat):
+        import vlc
+
+        media = instance.media_new(path)
+        with self._condition:
+            self._in_flight[path] = (media, stat.st_size, stat.st_mtime)
+        media.event_manager().event_attach(vlc.EventType.MediaParsedChanged, self._on_parsed, path, media)
+        if media.parse_with_options(vlc.MediaParseFlag.local, self.timeout_ms) != 0:
+            self._on_parsed(None, path, media)
+
+    def _on_parsed(self, event, path, media):
+        """libvlc callback thread: read the parsed info and hand the media back for release"""
+        import vlc
+
+        info = None
+        if media.get_parsed_status() == vlc.MediaParsedStatus.done:
+            width = height = 0
+            codec = ''
+            for track in media.tracks_get() or ():
+                if track.type == vlc.TrackType.video:
+                    width, height = track.video.contents.width, track.video.contents.height
+                    codec = vlc.libvlc_media_get_codec_description(track.type, track.codec) or ''
+                    if isinstance(codec, bytes):
+                        codec = codec.decode('utf-8', errors='ignore')
+                    break
+            info = MediaInfo(max(0, media.get_duration()), width, height, codec)
+        else:
+            self.logger.debug('Preparse failed for %s', path)
+
+        with self._condition:
+            self._finished.append((path, info))
+            self._condition.notify()
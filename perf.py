@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import threading
+import functools
+from contextlib import nullcontext
+
+_NULL_SPAN = nullcontext()
+
+
+class SpanStats:
+    __slots__ = ('count', 'total', 'max', 'last')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'avg_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'max_ms': self.max * 1000,
+            'last_ms': self.last * 1000,
+        }
+
+
+class _Span:
+    __slots__ = ('instrumentation', 'name', 'started')
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.instrumentation.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class Instrumentation:
+    """Timing spans and gauges for production performance tracing
+
+    Disabled by default (set VLC_TAGGER_PERF=1 or call enable()). While
+    disabled span() returns a shared no-op context manager and record()/
+    gauge() return immediately, so instrumented code pays one attribute check.
+    Spans may be recorded from any thread.
+    """
+
+    def __init__(self):
+        self.enabled = os.environ.get('VLC_TAGGER_PERF', '') not in ('', '0')
+        self._lock = threading.Lock()
+        self._spans = {}
+        self._gauges = {}
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def span(self, name):
+        """Context manager timing the enclosed block under name"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def record(self, name, seconds):
+        """Record an already measured duration (e.g. start and end in different callbacks)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._spans.get(name)
+            if stats is None:
+                stats = self._spans[name] = SpanStats()
+            stats.add(seconds)
+
+    def gauge(self, name, value):
+        """Set a point-in-time value such as a bitrate or frame counter"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[name] = value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'timestamp': time.time(),
+                'spans': {name: stats.as_dict() for name, stats in self._spans.items()},
+                'gauges': dict(self._gauges),
+            }
+
+    def dump(self, path):
+        """Write the current snapshot as JSON (atomically replacing path)"""
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(temp_path, path)
+
+
+# Shared by every module
+perf = Instrumentation()
+
+
+def timed(name):
+    """Decorator recording each call of the wrapped function as a span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not perf.enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                perf.record(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
@@ -0,0 +1,70 @@
+import threading
+import time
+import logging
+from tk_wakeup import TkWakeup
+
+
+class PlayerEventBridge:
+    """Forward libvlc events to the Tk thread, coalesced and rate limited
+
+    libvlc calls event handlers on its own threads, where Tk must not be
+    touched. Each connected event stores its latest value in a pending map
+    and wakes the Tk loop through a TkWakeup, which never blocks the libvlc
+    thread; bursts (TimeChanged
+    fires several times a second) collapse into one delivery carrying the
+    newest value, and deliveries are spaced at most max_rate per second.
+    When nothing is playing no events arrive, so there are no wakeups at all.
+    """
+
+    def __init__(self, root, max_rate=10):
+        self.logger = logging.getLogger(__name__)
+        self.root = root
+        self.min_interval = 1.0 / max_rate
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._handlers = {}
+        self._flush_scheduled = False
+        self._last_flush = 0.0
+
+        self._wakeup = TkWakeup(root, self._on_wakeup)
+
+    def connect(self, event_manager, event_type, handler, extract=None):
+        """Call handler(value) on the Tk thread when event_type fires
+
+        extract(event) runs on the libvlc thread and picks the value to pass
+        along (e.g. event.u.new_time); without it the handler gets None.
+        """
+        self._handlers[event_type] = handler
+        event_manager.event_attach(event_type, self._on_vlc_event, event_type, extract)
+
+    def _on_vlc_event(self, event, event_type, extract):
+        value = extract(event) if extract is not None else None
+        with self._lock:
+            self._pending[event_type] = value
+        self._wakeup.set()
+
+    def close(self):
+        self._wakeup.close()
+
+    def _on_wakeup(self):
+        if self._flush_scheduled:
+            return
+        wait = self.min_interval - (time.monotonic() - self._last_flush)
+        if wait > 0:
+            self._flush_scheduled = True
+            self.root.after(int(wait * 1000) + 1, self._flush)
+        else:
+            self._flush()
+
+    def _flush(self):
+        self._flush_scheduled = False
+        self._last_flush = time.monotonic()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        for event_type, value in pending.items():
+            try:
+                self._handlers[event_type](value)
+            except Exception as e:
+                self.logger.error('Error handling player event %s: %s', event_type, e)
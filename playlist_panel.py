@@ -2,16 +2,36 @@ import tkinter as tk
 from tkinter import filedialog
 import os
 import logging
+import time
+from bisect import bisect_left
+from virtual_list import VirtualListbox
+from indexed_playlist import IndexedPlaylist
+from media_metadata import format_duration
+from background_loader import BackgroundLoader
+from folder_scanner import FolderScanner, VIDEO_EXTENSIONS
+from folder_watcher import FolderWatcher, FolderChanges
+from perf import perf, timed
+from search_index import PlaylistFilter, path_tail
+
 
 class PlaylistPanel:
-    def __init__(self, parent, callback_play):
+    # Extensions picked up when scanning a folder
+    video_extensions = VIDEO_EXTENSIONS
+
+    def __init__(self, parent, callback_play, library=None, metadata=None):
         self.logger = logging.getLogger(__name__)
         self.logger.debug('Initializing PlaylistPanel')
 
         self.parent = parent
         self.callback_play = callback_play
-        self.playlist_files = []
+        self.library = library  # Optional LibraryIndex for instant reopening
+        self.metadata = metadata  # Optional MediaPreparser for durations
+        self.playlist_files = IndexedPlaylist()
         self.current_index = -1
+        self.total_duration_ms = 0
+        self.folder_path = None
+        self.recursive = False
+        self.watcher = None
 
         # Create main frame for playlist
         self.frame = tk.Frame(parent, width=200)
@@ -20,6 +40,32 @@ class PlaylistPanel:
         self.folder_button = tk.Button(self.frame, text="Select Folder", command=self.select_folder)
         self.folder_button.pack(fill=tk.X, padx=5, pady=5)
 
+        # Recursive scan toggle and scan status
+        self.recursive_var = tk.BooleanVar(value=False)
+        self.recursive_check = tk.Checkbutton(self.frame, text="Include subfolders", variable=self.recursive_var)
+        self.recursive_check.pack(anchor=tk.W, padx=5)
+
+        # Keep the loaded folder in sync with files appearing and disappearing on disk
+        self.watch_var = tk.BooleanVar(value=False)
+        self.watch_check = tk.Checkbutton(self.frame, text="Watch for changes", variable=self.watch_var,
+                                          command=self._on_watch_toggled)
+        self.watch_check.pack(anchor=tk.W, padx=5)
+
+        self.status_label = tk.Label(self.frame, text="No folder loaded")
+        self.status_label.pack(fill=tk.X, padx=5)
+
+        # Filter box: narrows the list to entries containing the typed text
+        self.search = PlaylistFilter(self.frame, self._search_text, self._on_filter_update)
+        self._filter_selection = None
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add('write', self._on_filter_typed)
+        self.filter_entry = tk.Entry(self.frame, textvariable=self.filter_var)
+        self.filter_entry.pack(fill=tk.X, padx=5, pady=(5, 0))
+
+        self.filter_nav_var = tk.BooleanVar(value=False)
+        self.filter_nav_check = tk.Checkbutton(self.frame, text="Next/previous within filter", variable=self.filter_nav_var)
+        self.filter_nav_check.pack(anchor=tk.W, padx=5)
+
         # Create a listbox to display files
         self.list_frame = tk.Frame(self.frame)
         self.list_frame.pack(fill=tk.BOTH, expand=True, padx=5)
@@ -27,16 +73,27 @@ class PlaylistPanel:
         self.scrollbar = tk.Scrollbar(self.list_frame)
         self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-        self.playlist_box = tk.Listbox(self.list_frame)
+        # Only the visible rows are drawn, straight from the playlist model
+        self.playlist_box = VirtualListbox(
+            self.list_frame,
+            row_count=lambda: self.search.row_count(len(self.playlist_files)),
+            row_text=lambda row: self.get_display_name(self.search.index_of(row)),
+            yscrollcommand=self.scrollbar.set,
+            on_view_change=self._on_view_change
+        )
         self.playlist_box.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-
-        # Connect scrollbar to listbox
-        self.playlist_box.config(yscrollcommand=self.scrollbar.set)
         self.scrollbar.config(command=self.playlist_box.yview)
 
+        # Total duration of the entries whose metadata is known
+        self.duration_label = tk.Label(self.frame, text="")
+        self.duration_label.pack(fill=tk.X, padx=5)
+
         # Bind double-click to play selected file
         self.playlist_box.bind("<Double-Button-1>", self.play_selected)
 
+        # Streams scan results in from worker threads
+        self.loader = BackgroundLoader(self.frame)
+
         self.logger.debug('PlaylistPanel initialized')
 
     def select_folder(self):
@@ -44,75 +101,296 @@ class PlaylistPanel:
         self.logger.debug('Selecting folder for playlist')
         folder_path = filedialog.askdirectory()
         if folder_path:
-            self.logger.info(f'Folder selected: {folder_path}')
+            self.logger.info('Folder selected: %s', folder_path)
             self.load_playlist(folder_path)
         else:
             self.logger.info('No folder selected')
 
-    def load_playlist(self, folder_path):
-        """Load all video files from the selected folder"""
-        self.logger.debug(f'Loading playlist from {folder_path}')
+    @timed('playlist_panel.load_playlist')
+    def load_playlist(self, folder_path, recursive=None):
+        """Load all video files from the selected folder in the background"""
+        if recursive is None:
+            recursive = self.recursive_var.get()
+        self.logger.debug('Loading playlist from %s (recursive=%s)', folder_path, recursive)
 
-        # Clear current playlist
-        self.playlist_box.delete(0, tk.END)
-        self.playlist_files = []
+        # Clear current playlist (this also cancels a scan still in progress)
+        self.loader.cancel()
+        self.stop_watching()
+        self.folder_path = folder_path
+        self.recursive = recursive
+        self.playlist_files = IndexedPlaylist()
+        self.search.reset()
+        self.current_index = -1
+        self.total_duration_ms = 0
+        self._update_duration_label()
+        self.playlist_box.selection_clear()
+        self.status_label.config(text="Scanning...")
+        self._load_started = time.perf_counter()
 
-        # Video file extensions to look for
-        video_extensions = ('.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv')
+        if self.library is None:
+            scanner = FolderScanner(folder_path, recursive=recursive, extensions=self.video_extensions)
+            self.loader.start(
+                scanner,
+                on_batch=self._on_scan_batch,
+                on_done=self._on_scan_done
+            )
+            return
 
+        # Show the indexed listing right away, then reconcile it with the disk
         try:
-            # Get all files in the folder
-            files = os.listdir(folder_path)
+            cached = self.library.cached_files(folder_path, recursive, self.video_extensions)
+            self.playlist_files.extend(cached)
+            self._entries_added(cached)
+        except Exception as e:
+            self.logger.error('Error reading library index: %s', e)
+        self.playlist_box.refresh()
+        if self.playlist_files:
+            self.logger.info('Loaded %s video files from library index', len(self.playlist_files))
+            self.status_label.config(text=f"{len(self.playlist_files)} videos (checking for changes...)")
 
-            # Filter for video files and add them to the playlist
-            for file in files:
-                if file.lower().endswith(video_extensions):
-                    full_path = os.path.join(folder_path, file)
-                    self.playlist_files.append(full_path)
-                    self.playlist_box.insert(tk.END, file)  # Show just the filename
+        self.loader.start(
+            self.library.rescan(folder_path, recursive, self.video_extensions),
+            on_batch=self._on_library_changes,
+            on_done=self._on_scan_done
+        )
 
-            self.logger.info(f'Loaded {len(self.playlist_files)} video files')
-        except Exception as e:
-            self.logger.error(f'Error loading playlist: {e}')
+    def _on_scan_batch(self, paths):
+        """Append a sorted batch of discovered video files"""
+        self.playlist_files.extend(paths)
+        self._entries_added(paths)
+        self.playlist_box.refresh()
+        self.status_label.config(text=f"Scanning... {len(self.playlist_files)} files")
+
+    def _on_library_changes(self, changes):
+        """Apply (added, removed) differences found by a library rescan"""
+        added, removed = changes
+        if removed:
+            self._remove_files(set(removed))
+        added = [path for path in added if path not in self.playlist_files]
+        self.playlist_files.extend(added)
+        self._entries_added(added)
+        self.playlist_box.refresh()
+        self.status_label.config(text=f"Scanning... {len(self.playlist_files)} files")
+
+    def _remove_files(self, removed):
+        """Drop the rows of the removed paths"""
+        self._remove_rows(sorted(position for path in removed for position in self.playlist_files.positions(path)))
+
+    def _remove_rows(self, positions):
+        """Delete the rows at the sorted positions, keeping the current and selected entries in place
+
+        Only the removed rows are looked at: their durations are subtracted
+        and the filter index is patched instead of rebuilt.
+        """
+        if not positions:
+            return
+        if self.metadata is not None:
+            for position in positions:
+                info = self.metadata.info(self.playlist_files[position])
+                if info is not None:
+                    self.total_duration_ms -= info.duration_ms
+            self._update_duration_label()
+        selected_index = self._selected_index()
+
+        self.playlist_files.delete_positions(positions)
+        self.search.entries_removed(positions)
+
+        removed = set(positions)
+        if self.current_index >= 0:
+            shifted = self.current_index - bisect_left(positions, self.current_index)
+            self.current_index = min(shifted, len(self.playlist_files) - 1)
+        if selected_index is not None and selected_index not in removed:
+            selected_index -= bisect_left(positions, selected_index)
+            self._filter_selection = selected_index
+            self._select_index(selected_index)
+        else:
+            self._filter_selection = None
+            self.playlist_box.selection_clear()
+
+    def _on_scan_done(self, error):
+        if error is not None:
+            self.logger.error('Error loading playlist: %s', error)
+            self.status_label.config(text="Error loading folder")
+            return
+        self.status_label.config(text=f"{len(self.playlist_files)} videos")
+        perf.record('playlist_panel.load_total', time.perf_counter() - self._load_started)
+        self.logger.info('Loaded %s video files', len(self.playlist_files))
+        if self.watch_var.get():
+            self.start_watching()
+
+    def start_watching(self):
+        """Follow changes to the loaded folder until another one is loaded"""
+        if self.folder_path is None or self.watcher is not None:
+            return
+        self.watcher = FolderWatcher(self.frame, self.folder_path, self.recursive, self._on_folder_changes,
+                                     extensions=self.video_extensions)
+        self.watcher.start()
+
+    def stop_watching(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+
+    def _on_watch_toggled(self):
+        if not self.watch_var.get():
+            self.stop_watching()
+        elif not self.loader.is_running():
+            self.start_watching()
+
+    def _on_folder_changes(self, changes):
+        """Apply a debounced batch of FolderChanges as a diff, keeping the current entry in place"""
+        if changes.resync:
+            self._resync_folder()
+
+        removed = set(changes.removed)
+        added = list(changes.added)
+        renamed = False
+        for old, new in changes.renamed.items():
+            if old in self.playlist_files and new not in self.playlist_files:
+                # Renamed in place, so the row and current_index do not move
+                positions = self.playlist_files.positions(old)
+                for position in positions:
+                    self.playlist_files.replace(position, new)
+                self.search.entries_changed(positions, [path_tail(old).lower()] * len(positions))
+                self._rename_duration(old, new, len(positions))
+                renamed = True
+            else:
+                removed.add(old)
+                added.append(new)
+
+        positions = {position for path in removed for position in self.playlist_files.positions(path)}
+        if changes.removed_dirs:
+            positions.update(self.playlist_files.positions_under(tuple(path + os.sep for path in changes.removed_dirs)))
+        self._remove_rows(sorted(positions))
+        if renamed and self.metadata is not None:
+            self.metadata.request(list(changes.renamed.values()))
+
+        added = [path for path in dict.fromkeys(added) if path not in self.playlist_files]
+        self.playlist_files.extend(added)
+        self._entries_added(added)
+        self.playlist_box.refresh()
+        self.status_label.config(text=f"{len(self.playlist_files)} videos")
+        if added or positions or renamed:
+            self.logger.info('Folder changed: %s added, %s removed, %s renamed',
+                             len(added), len(positions), len(changes.renamed) if renamed else 0)
+
+    def _resync_folder(self):
+        """Watch events were lost: rescan the folder and diff it against the playlist"""
+        if self.loader.is_running():
+            return
+        found = []
+        self.loader.start(
+            FolderScanner(self.folder_path, recursive=self.recursive, extensions=self.video_extensions),
+            on_batch=found.extend,
+            on_done=lambda error: self._on_resync_done(found, error)
+        )
+
+    def _on_resync_done(self, found, error):
+        if error is not None:
+            self.logger.error('Error rescanning %s: %s', self.folder_path, error)
+            return
+        found_set = set(found)
+        removed = {path for path in self.playlist_files if path not in found_set}
+        added = [path for path in found if path not in self.playlist_files]
+        self._on_folder_changes(FolderChanges(added, removed, {}, [], False))
+
+    def get_display_name(self, index):
+        """Text shown for a playlist row - just the filename"""
+        name = self.playlist_files.name(index)
+        info = self.metadata.info(self.playlist_files[index]) if self.metadata is not None else None
+        if info is not None:
+            return f'{name}  [{format_duration(info.duration_ms)}]'
+        return name
+
+    def is_playable(self, index):
+        """Every row of a folder playlist is a media file"""
+        return True
+
+    def _search_text(self, index):
+        """What the filter matches against - the file and folder name"""
+        return path_tail(self.playlist_files[index]).lower()
+
+    def _entries_added(self, paths):
+        """Index new entries for the filter, count known durations and queue the rest for preparsing"""
+        self.search.entries_added(len(self.playlist_files) - len(paths), len(self.playlist_files))
+        if self.metadata is None:
+            return
+        for path in paths:
+            info = self.metadata.info(path)
+            if info is not None:
+                self.total_duration_ms += info.duration_ms
+        self.metadata.request(paths)
+        self._update_duration_label()
+
+    def _rename_duration(self, old, new, count):
+        """Move the known duration of count rows from their old path to the new one"""
+        if self.metadata is None:
+            return
+        for path, sign in ((old, -1), (new, 1)):
+            info = self.metadata.info(path)
+            if info is not None:
+                self.total_duration_ms += sign * info.duration_ms * count
+        self._update_duration_label()
+
+    def on_metadata(self, results):
+        """Fold freshly parsed media info into the total duration and redraw"""
+        changed = False
+        for path, info in results:
+            if path in self.playlist_files:
+                self.total_duration_ms += info.duration_ms * len(self.playlist_files.positions(path))
+                changed = True
+        if changed:
+            self._update_duration_label()
+            self.playlist_box.refresh()
+
+    def _update_duration_label(self):
+        text = f"Total: {format_duration(self.total_duration_ms)}" if self.total_duration_ms else ""
+        self.duration_label.config(text=text)
+
+    def _on_view_change(self, top, rows):
+        """Parse the rows on screen before the rest of the playlist"""
+        if self.metadata is not None:
+            if self.search.active:
+                rows = min(rows, len(self.search.rows) - top)
+                self.metadata.prioritize([self.playlist_files[index] for index in self.search.rows[top:top + rows]])
+            else:
+                self.metadata.prioritize(self.playlist_files[top:top + rows])
 
     def add_to_playlist(self, file_path):
         """Add a single file to the playlist"""
         if file_path not in self.playlist_files:
             self.playlist_files.append(file_path)
             filename = os.path.basename(file_path)
-            self.playlist_box.insert(tk.END, filename)
-            self.logger.debug(f'Added {filename} to playlist')
+            self._entries_added([file_path])
+            self.playlist_box.refresh()
+            self.logger.debug('Added %s to playlist', filename)
 
             # If this is the first file, set it as current
             if len(self.playlist_files) == 1:
                 self.current_index = 0
-                self.playlist_box.selection_set(0)
+                self._select_index(0)
         else:
             # If the file is already in the playlist, select it only if this panel is being used
-            index = self.playlist_files.index(file_path)
+            index = self.playlist_files.index(file_path, prefer=self.current_index)
             self.current_index = index
-            self.playlist_box.selection_clear(0, tk.END)
-            self.playlist_box.selection_set(index)
-            self.playlist_box.see(index)
-            self.logger.debug(f'File already in playlist, selected at index {index}')
+            self._select_index(index)
+            self.logger.debug('File already in playlist, selected at index %s', index)
 
     def set_current_file(self, file_path):
         """Set current file without affecting UI selection - for internal tracking only"""
         if file_path in self.playlist_files:
-            self.current_index = self.playlist_files.index(file_path)
-            self.logger.debug(f'Updated current index to {self.current_index} for file: {file_path}')
+            self.current_index = self.playlist_files.index(file_path, prefer=self.current_index)
+            self.logger.debug('Updated current index to %s for file: %s', self.current_index, file_path)
             return True
         return False
 
     def update_visual_selection(self, file_path):
         """Update the visual selection in this panel"""
         if file_path in self.playlist_files:
-            index = self.playlist_files.index(file_path)
+            index = self.playlist_files.index(file_path, prefer=self.current_index)
             self.current_index = index
-            self.playlist_box.selection_clear(0, tk.END)
-            self.playlist_box.selection_set(index)
-            self.playlist_box.see(index)
-            self.logger.debug(f'Updated visual selection to index {index}')
+            self._select_index(index)
+            self.logger.debug('Updated visual selection to index %s', index)
 
     def clear_visual_selection(self):
         """Clear the visual selection in this panel"""
@@ -120,15 +398,13 @@ class PlaylistPanel:
 
     def play_selected(self, event=None):
         """Play the selected file in the playlist"""
-        selection = self.playlist_box.curselection()
-        if selection:
-            index = selection[0]
+        index = self._selected_index()
+        if index is not None:
             self.current_index = index
-            self.logger.debug(f'Selected file at index {index}: {self.playlist_files[index]}')
+            self.logger.debug('Selected file at index %s: %s', index, self.playlist_files[index])
             self.callback_play(self.playlist_files[index])
             # Highlight the currently playing item
-            self.playlist_box.selection_clear(0, tk.END)
-            self.playlist_box.selection_set(index)
+            self._select_index(index)
 
     def next_track(self):
         """Play the next track in the playlist"""
@@ -136,12 +412,11 @@ class PlaylistPanel:
             self.logger.debug('No tracks in playlist')
             return None
 
-        if self.current_index < len(self.playlist_files) - 1:
-            self.current_index += 1
-            self.playlist_box.selection_clear(0, tk.END)
-            self.playlist_box.selection_set(self.current_index)
-            self.playlist_box.see(self.current_index)  # Ensure visible
-            self.logger.info(f'Moving to next track: {self.playlist_files[self.current_index]}')
+        index = self._step_index(1)
+        if index is not None:
+            self.current_index = index
+            self._select_index(index)  # Ensure visible
+            self.logger.info('Moving to next track: %s', self.playlist_files[self.current_index])
             return self.playlist_files[self.current_index]
         else:
             self.logger.info('Already at last track')
@@ -153,13 +428,62 @@ class PlaylistPanel:
             self.logger.debug('No tracks in playlist')
             return None
 
-        if self.current_index > 0:
-            self.current_index -= 1
-            self.playlist_box.selection_clear(0, tk.END)
-            self.playlist_box.selection_set(self.current_index)
-            self.playlist_box.see(self.current_index)  # Ensure visible
-            self.logger.info(f'Moving to previous track: {self.playlist_files[self.current_index]}')
+        index = self._step_index(-1)
+        if index is not None:
+            self.current_index = index
+            self._select_index(index)  # Ensure visible
+            self.logger.info('Moving to previous track: %s', self.playlist_files[self.current_index])
             return self.playlist_files[self.current_index]
         else:
             self.logger.info('Already at first track')
             return None
+
+    def peek_next(self):
+        """Path next_track would move to, without moving"""
+        index = self._step_index(1)
+        return self.playlist_files[index] if index is not None else None
+
+    def peek_previous(self):
+        """Path previous_track would move to, without moving"""
+        index = self._step_index(-1)
+        return self.playlist_files[index] if index is not None else None
+
+    def _step_index(self, step):
+        """Playlist index one track forward (step=1) or back (step=-1), or None at either end
+
+        With "Next/previous within filter" ticked, entries hidden by the
+        filter are skipped.
+        """
+        if self.search.active and self.filter_nav_var.get():
+            if step > 0:
+                return self.search.next_index(self.current_index)
+            return self.search.previous_index(min(self.current_index, len(self.playlist_files)))
+        index = self.current_index + step
+        if 0 <= index < len(self.playlist_files) and self.current_index <= len(self.playlist_files):
+            return index
+        return None
+
+    def _select_index(self, index):
+        """Highlight and scroll to a playlist index, or clear the selection if it is filtered out"""
+        row = self.search.row_of(index)
+        if row is None:
+            self.playlist_box.selection_clear()
+        else:
+            self.playlist_box.selection_set(row)
+            self.playlist_box.see(row)
+
+    def _selected_index(self):
+        """Playlist index of the highlighted row, or None"""
+        selection = self.playlist_box.curselection()
+        return self.search.index_of(selection[0]) if selection else None
+
+    def _on_filter_typed(self, *args):
+        self._filter_selection = self._selected_index()
+        self.search.set_query(self.filter_var.get())
+
+    def _on_filter_update(self, done):
+        """Redraw as filter results come in; restore the highlight once they are complete"""
+        if done and self._filter_selection is not None:
+            self._select_index(self._filter_selection)
+            self._filter_selection = None
+        self.playlist_box.refresh()
@@ -0,0 +1,96 @@
+import time
+import sqlite3
+import logging
+from app_paths import data_path
+from perf import perf
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS positions (
+    path TEXT PRIMARY KEY,
+    position_ms INTEGER NOT NULL,
+    length_ms INTEGER NOT NULL,
+    updated REAL
+) WITHOUT ROWID;
+'''
+
+# Positions this close to the start are not worth resuming...
+RESUME_MIN_MS = 10000
+# ...and this close to the end the file counts as watched, so its position is dropped
+RESUME_END_MARGIN_MS = 15000
+
+
+class ResumeStore:
+    """Last playback position per file, written behind in batches
+
+    update() is called with every playback time sample and only touches an
+    in-memory map of pending changes; they are written to SQLite in one
+    transaction once flush_interval seconds have passed since the last
+    write or flush_threshold files are pending, and on close(). position()
+    answers from the pending map first and otherwise with a primary-key
+    lookup in a WITHOUT ROWID table, so lookups stay flat with hundreds of
+    thousands of files and nothing is loaded up front.
+    """
+
+    def __init__(self, db_path=None, flush_interval=15.0, flush_threshold=200):
+        self.logger = logging.getLogger(__name__)
+        self.db_path = db_path or data_path('resume.db')
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+
+        self._conn = sqlite3.connect(self.db_path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+        self._pending = {}  # path -> (position_ms, length_ms), or None to forget the file
+        self._last_flush = time.monotonic()
+
+    def update(self, path, position_ms, length_ms):
+        """Record a playback time sample; near the start or end the saved position is cleared"""
+        if position_ms <= 0 or length_ms <= 0:
+            return  # Not playing, or a live stream without a length
+        if position_ms < RESUME_MIN_MS or position_ms > length_ms - RESUME_END_MARGIN_MS:
+            self._pending[path] = None
+        else:
+            self._pending[path] = (int(position_ms), int(length_ms))
+        if (len(self._pending) >= self.flush_threshold
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def position(self, path):
+        """Saved position of path in ms, or None"""
+        if path in self._pending:
+            pending = self._pending[path]
+            return pending[0] if pending is not None else None
+        row = self._conn.execute('SELECT position_ms FROM positions WHERE path = ?', (path,)).fetchone()
+        return row[0] if row is not None else None
+
+    def flush(self):
+        """Write every pending change in a single transaction"""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        started = time.perf_counter()
+        now = time.time()
+        try:
+            with self._conn:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO positions (path, position_ms, length_ms, updated) VALUES (?, ?, ?, ?)',
+                    [(path, value[0], value[1], now) for path, value in pending.items() if value is not None])
+                self._conn.executemany(
+                    'DELETE FROM positions WHERE path = ?',
+                    [(path,) for path, value in pending.items() if value is None])
+        except sqlite3.Error as e:
+            self.logger.error('Could not save resume positions: %s', e)
+            # Keep them for the next attempt, unless newer samples arrived meanwhile
+            pending.update(self._pending)
+            self._pending = pending
+            return
+        perf.record('resume.flush', time.perf_counter() - started)
+        self.logger.debug('Saved %d resume positions', len(pending))
+
+    def close(self):
+        self.flush()
+        self._conn.close()
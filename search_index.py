@@ -0,0 +1,351 @@
+import os
+import time
+import itertools
+from collections import deque
+from array import array
+from bisect import bisect_left, bisect_right
+from perf import perf
+
+# Candidates checked per Tk tick while a filter is being computed
+FILTER_CHUNK = 5000
+# Entries indexed per Tk tick in the background
+INDEX_CHUNK = 2000
+
+
+def path_tail(path):
+    """Last two components of a path ('folder/file.mp4'), the part worth searching"""
+    head, name = os.path.split(path)
+    return f'{os.path.basename(head)}/{name}'
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """Map of three-character substrings to the sorted ids of the texts containing them
+
+    Ids are assigned in insertion order, so posting lists stay sorted by
+    construction and adding a batch only appends. Ids are playlist indices:
+    insert(), remove() and replace() patch the posting lists in place when
+    rows are inserted, deleted or renamed mid-playlist, re-deriving only the
+    texts of the rows involved. Texts are not stored; callers re-derive them
+    when a candidate has to be verified.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self.size = 0
+
+    def add(self, texts):
+        postings = self._postings
+        for text in texts:
+            doc_id = self.size
+            self.size += 1
+            for gram in _trigrams(text):
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array('I')
+                posting.append(doc_id)
+
+    def clear(self):
+        self._postings = {}
+        self.size = 0
+
+    def insert(self, start, texts):
+        """Index texts as ids start, start + 1, ...; the ids from start on move up to make room"""
+        new = {}
+        count = 0
+        for doc_id, text in enumerate(texts, start):
+            count += 1
+            for gram in _trigrams(text):
+                doc_ids = new.get(gram)
+                if doc_ids is None:
+                    doc_ids = new[gram] = array('I')
+                doc_ids.append(doc_id)
+        if not count:
+            return
+        postings = self._postings
+        for posting in postings.values():
+            position = bisect_left(posting, start)
+            if position < len(posting):
+                posting[position:] = array('I', [doc_id + count for doc_id in posting[position:]])
+        for gram, doc_ids in new.items():
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = doc_ids
+            else:
+                position = bisect_left(posting, start)
+                posting[position:position] = doc_ids
+        self.size += count
+
+    def remove(self, doc_ids):
+        """Drop the sorted doc_ids; the ids after them move down to close the gaps"""
+        if not doc_ids:
+            return
+        first, removed = doc_ids[0], set(doc_ids)
+        postings = self._postings
+        for gram, posting in list(postings.items()):
+            position = bisect_left(posting, first)
+            if position == len(posting):
+                continue
+            posting[position:] = array('I', [doc_id - bisect_left(doc_ids, doc_id) for doc_id in posting[position:]
+                                             if doc_id not in removed])
+            if not posting:
+                del postings[gram]
+        self.size -= len(doc_ids)
+
+    def replace(self, doc_id, old_text, new_text):
+        """Re-index doc_id, whose text changed from old_text to new_text"""
+        old, new = _trigrams(old_text), _trigrams(new_text)
+        postings = self._postings
+        for gram in old - new:
+            posting = postings.get(gram)
+            if posting is None:
+                continue
+            position = bisect_left(posting, doc_id)
+            if position < len(posting) and posting[position] == doc_id:
+                del posting[position]
+                if not posting:
+                    del postings[gram]
+        for gram in new - old:
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array('I')
+            posting.insert(bisect_left(posting, doc_id), doc_id)
+
+    def candidates(self, query):
+        """Shortest posting list among the query's trigrams, or None for queries under three characters
+
+        Every text containing query is in the returned list; for a
+        three-character query the list is the exact answer.
+        """
+        if len(query) < 3:
+            return None
+        shortest = None
+        for i in range(len(query) - 2):
+            posting = self._postings.get(query[i:i + 3])
+            if posting is None:
+                return array('I')
+            if shortest is None or len(posting) < len(shortest):
+                shortest = posting
+        return shortest
+
+
+class PlaylistFilter:
+    """Incremental substring filter over a playlist panel's rows
+
+    text_for(index) returns the lower-case searchable text of a playlist
+    entry. New entries are indexed INDEX_CHUNK at a time from the Tk loop so
+    streaming a large playlist in is not slowed down; until they are, a
+    query scans them directly. The trigram index narrows a query to one
+    posting list; candidates that still need checking are verified
+    FILTER_CHUNK at a time, so a keystroke never blocks the UI for long even
+    on huge playlists. While that runs the matching rows grow in order and
+    on_update(done) is called after every chunk. Typing further (a query
+    containing the previous one) only re-checks the previous matches.
+
+    rows is None while no filter is active, otherwise the sorted playlist
+    indices that match.
+    """
+
+    def __init__(self, widget, text_for, on_update):
+        self.widget = widget
+        self.text_for = text_for
+        self.on_update = on_update
+        self.index = TrigramIndex()
+        self.total = 0
+        self.query = ''
+        self.rows = None
+        self._sources = deque()
+        self._pending = None
+        self._job = None
+        self._index_job = None
+
+    @property
+    def active(self):
+        return self.rows is not None
+
+    def set_query(self, query):
+        """Start filtering on query (an empty query shows everything)"""
+        query = query.strip().lower()
+        previous, self.query = self.query, query
+        if query == previous and self._pending is None:
+            return
+        refine = bool(previous) and previous in query and self.rows is not None and self._pending is None
+        self._cancel()
+
+        if not query:
+            self.rows = None
+            self.on_update(True)
+            return
+
+        started = time.perf_counter()
+        candidates = self.index.candidates(query)
+        unindexed = range(self.index.size, self.total)
+        if candidates is not None and len(query) == 3 and not unindexed:
+            self.rows = array('I', candidates)
+        else:
+            if candidates is None:
+                checked, sources = self.total, [range(self.total)]
+            else:
+                # Background indexing may append to the posting list meanwhile
+                checked = len(candidates) + len(unindexed)
+                sources = [itertools.islice(candidates, len(candidates)), unindexed]
+            if refine and len(self.rows) < checked:
+                sources = [self.rows]
+            self.rows = array('I')
+            self._sources = deque(sources)
+            self._pending = self._drain()
+            self._verify()
+        perf.record('search.query', time.perf_counter() - started)
+        if self._pending is None:
+            self.on_update(True)
+
+    def entries_added(self, start, end):
+        """Queue playlist entries start..end-1 for indexing and filter them if a query is active"""
+        self.total = end
+        if self._index_job is None:
+            self._index_job = self.widget.after(1, self._index_step)
+        if self.rows is None:
+            return
+        if self._pending is not None:
+            self._sources.append(range(start, end))
+            return
+        query = self.query
+        self.rows.extend(i for i in range(start, end) if query in self.text_for(i))
+
+    def entries_inserted(self, start, count):
+        """count entries were inserted before index start: shift what comes after, index only the new ones"""
+        self.total += count
+        if start <= self.index.size:
+            self.index.insert(start, [self.text_for(i) for i in range(start, start + count)])
+        if self.rows is None:
+            return
+        if self._pending is not None:
+            self._requery()
+            return
+        query, rows = self.query, self.rows
+        position = bisect_left(rows, start)
+        rows[position:] = array('I', [i for i in range(start, start + count) if query in self.text_for(i)]
+                                + [row + count for row in rows[position:]])
+
+    def entries_removed(self, indices):
+        """The entries at the sorted indices (numbered as before the removal) were deleted"""
+        if not indices:
+            return
+        self.total -= len(indices)
+        self.index.remove(indices[:bisect_left(indices, self.index.size)])
+        if self.rows is None:
+            return
+        if self._pending is not None:
+            self._requery()
+            return
+        rows, removed = self.rows, set(indices)
+        position = bisect_left(rows, indices[0])
+        rows[position:] = array('I', [row - bisect_left(indices, row) for row in rows[position:] if row not in removed])
+
+    def entries_changed(self, indices, old_texts):
+        """The entries at indices now have other texts (e.g. renamed files); old_texts are what they were"""
+        for index, old_text in zip(indices, old_texts):
+            if index < self.index.size:
+                self.index.replace(index, old_text, self.text_for(index))
+        if self.rows is None:
+            return
+        if self._pending is not None:
+            self._requery()
+            return
+        rows = self.rows
+        for index in indices:
+            position = bisect_left(rows, index)
+            listed = position < len(rows) and rows[position] == index
+            if self.query in self.text_for(index):
+                if not listed:
+                    rows.insert(position, index)
+            elif listed:
+                del rows[position]
+
+    def reset(self):
+        """Forget every entry (the playlist was cleared); the query stays"""
+        self._cancel()
+        if self._index_job is not None:
+            self.widget.after_cancel(self._index_job)
+            self._index_job = None
+        self.index.clear()
+        self.total = 0
+        if self.query:
+            self.rows = array('I')
+
+    def rebuild(self, count):
+        """Re-index entries 0..count-1 after the playlist was rebuilt, then re-run the query"""
+        self.reset()
+        if count:
+            self.total = count
+            self._index_job = self.widget.after(1, self._index_step)
+        self._requery()
+
+    def row_count(self, total):
+        return total if self.rows is None else len(self.rows)
+
+    def index_of(self, row):
+        """Playlist index shown at a list row"""
+        return row if self.rows is None else self.rows[row]
+
+    def row_of(self, index):
+        """List row showing a playlist index, or None if it is filtered out"""
+        if self.rows is None:
+            return index
+        position = bisect_left(self.rows, index)
+        if position < len(self.rows) and self.rows[position] == index:
+            return position
+        return None
+
+    def next_index(self, index):
+        """First matching playlist index after index, or None"""
+        position = bisect_right(self.rows, index)
+        return self.rows[position] if position < len(self.rows) else None
+
+    def previous_index(self, index):
+        """Last matching playlist index before index, or None"""
+        position = bisect_left(self.rows, index)
+        return self.rows[position - 1] if position > 0 else None
+
+    def _index_step(self):
+        end = min(self.index.size + INDEX_CHUNK, self.total)
+        self.index.add(self.text_for(i) for i in range(self.index.size, end))
+        if end < self.total:
+            self._index_job = self.widget.after(1, self._index_step)
+        else:
+            self._index_job = None
+
+    def _drain(self):
+        # New entries may be queued behind the candidates while this runs
+        while self._sources:
+            yield from self._sources.popleft()
+
+    def _verify(self):
+        """Check the next chunk of candidates; reschedules itself until done"""
+        self._job = None
+        query = self.query
+        text_for = self.text_for
+        chunk = list(itertools.islice(self._pending, FILTER_CHUNK))
+        self.rows.extend(i for i in chunk if query in text_for(i))
+        if len(chunk) < FILTER_CHUNK:
+            self._pending = None
+        else:
+            self._job = self.widget.after(1, self._step)
+
+    def _step(self):
+        self._verify()
+        self.on_update(self._pending is None)
+
+    def _requery(self):
+        """Run the current query again from scratch"""
+        query, self.query = self.query, ''
+        self.set_query(query)
+
+    def _cancel(self):
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+        self._pending = None
@@ -0,0 +1,107 @@
+import logging
+import tkinter as tk
+from collections import OrderedDict
+from thumbnails import file_key
+
+# Files whose decoded frames are kept in memory
+MEMORY_CACHE_FILES = 4
+POLL_INTERVAL = 500
+
+
+class SeekPreview:
+    """Thumbnail popup shown while hovering over the seek bar
+
+    Frames come from a ThumbnailGenerator's disk cache and are only decoded
+    into PhotoImages when the pointer first lands on them; a few files worth
+    of images are kept in memory. get_current_file() returns the path of the
+    media that is playing.
+    """
+
+    def __init__(self, root, slider, generator, get_current_file):
+        self.logger = logging.getLogger(__name__)
+        self.root = root
+        self.slider = slider
+        self.generator = generator
+        self.get_current_file = get_current_file
+
+        self._images = OrderedDict()  # key -> [frame path or PhotoImage]
+        self._key_cache = (None, None)
+        self._polling = False
+
+        self.popup = tk.Toplevel(root)
+        self.popup.overrideredirect(True)
+        self.popup.withdraw()
+        self.image_label = tk.Label(self.popup, borderwidth=1, relief=tk.SOLID)
+        self.image_label.pack()
+
+        self.slider.bind('<Motion>', self.on_motion, add='+')
+        self.slider.bind('<Leave>', self.hide, add='+')
+
+    def request(self, path, priority):
+        """Queue thumbnail generation for path and make sure results are collected"""
+        self.generator.request(path, priority)
+        if not self._polling:
+            self._polling = True
+            self.root.after(0, self._poll)
+
+    def _poll(self):
+        self.generator.poll()
+        if self.generator.busy():
+            self.root.after(POLL_INTERVAL, self._poll)
+        else:
+            self._polling = False
+
+    def on_motion(self, event):
+        frames = self._frames_for(self.get_current_file())
+        if not frames:
+            self.hide()
+            return
+
+        pad = (int(self.slider.cget('sliderlength')) // 2 + int(self.slider.cget('borderwidth'))
+               + int(self.slider.cget('highlightthickness')))
+        usable = max(1, self.slider.winfo_width() - 2 * pad)
+        fraction = min(1.0, max(0.0, (event.x - pad) / usable))
+        index = min(int(fraction * len(frames)), len(frames) - 1)
+
+        image = frames[index]
+        if isinstance(image, str):
+            try:
+                image = frames[index] = tk.PhotoImage(file=image)
+            except tk.TclError:
+                self.hide()
+                return
+
+        self.image_label.config(image=image)
+        x = event.x_root - image.width() // 2
+        y = self.slider.winfo_rooty() - image.height() - 6
+        self.popup.geometry(f'+{x}+{y}')
+        self.popup.deiconify()
+        self.popup.lift()
+
+    def hide(self, event=None):
+        self.popup.withdraw()
+
+    def _frames_for(self, path):
+        if path is None:
+            return None
+        cached_path, key = self._key_cache
+        if cached_path != path:
+            try:
+                key = file_key(path)
+            except OSError:
+                key = None
+            self._key_cache = (path, key)
+        if key is None:
+            return None
+
+        frames = self._images.get(key)
+        if frames is not None:
+            self._images.move_to_end(key)
+            return frames
+        paths = self.generator.cache.frames(key)
+        if not paths:
+            return None
+        frames = self._images[key] = list(paths)
+        while len(self._images) > MEMORY_CACHE_FILES:
+            self._images.popitem(last=False)
+        return frames
@@ -0,0 +1,173 @@
+import time
+import inspect
+import logging
+from collections import namedtuple
+from perf import perf
+from tk_wakeup import TkWakeup
+
+# Shortest gap between two fast seeks while the seek bar is dragged
+SCRUB_INTERVAL_MS = 60
+# A seek libvlc never confirms counts as landed after this long
+SEEK_TIMEOUT_MS = 400
+DEFAULT_FPS = 25.0
+
+# kind: 'fast' (value is a 0..1 position) or 'precise' (value in ms)
+SeekRequest = namedtuple('SeekRequest', 'kind value')
+
+
+def _supports_fast_flag(player):
+    """libvlc 4 bindings take set_position/set_time(value, fast); libvlc 3 only the value"""
+    try:
+        return len(inspect.signature(player.set_position).parameters) >= 2
+    except (TypeError, ValueError):
+        return False
+
+
+class SeekScheduler:
+    """Single-flight, coalescing seeks for the media player
+
+    At most one seek is in flight: it lands when libvlc reports a position
+    closer to the target than to where the seek started (playback itself
+    keeps reporting positions), or after SEEK_TIMEOUT_MS. Requests made in
+    the meantime replace each other and only the newest is issued once the
+    previous seek has landed. scrub() is for dragging the seek bar: fast
+    (keyframe) seeks spaced at least SCRUB_INTERVAL_MS apart. seek() is a
+    precise seek, used on release; jump() and step_frame() build on it and
+    count from the last requested target, so repeated key presses add up
+    even while seeks are still landing.
+
+    With libvlc 3 there is no per-seek fast flag; scrub() then goes through
+    set_position() and precision follows the instance's --input-fast-seek.
+    attach() hooks up the player once it exists; nothing happens before.
+    """
+
+    def __init__(self, widget, get_length):
+        self.logger = logging.getLogger(__name__)
+        self.widget = widget
+        self.get_length = get_length
+        self.player = None
+        self._fast_flag = False
+
+        self._pending = None     # SeekRequest waiting for the in-flight one to land
+        self._in_flight = None   # SeekRequest issued and not landed yet
+        self._issued_at = 0.0
+        self._from_position = 0.0  # Where the in-flight seek started and is headed, 0..1
+        self._to_position = 0.0
+        self._last_scrub = 0.0
+        self._job = None
+        self._landed = TkWakeup(widget, self._on_landed)
+
+    @property
+    def busy(self):
+        """True while a seek is in flight or waiting, the reported time is stale meanwhile"""
+        return self._in_flight is not None or self._pending is not None
+
+    def attach(self, player, event_manager, position_event):
+        self.player = player
+        self._fast_flag = _supports_fast_flag(player)
+        event_manager.event_attach(position_event, self._on_position_changed)
+
+    def scrub(self, fraction):
+        """Fast seek to a fraction of the media while dragging"""
+        self._request(SeekRequest('fast', min(max(fraction, 0.0), 1.0)))
+
+    def seek(self, time_ms):
+        """Precise seek to time_ms"""
+        length = self.get_length()
+        if length > 0:
+            time_ms = min(time_ms, length - 1)
+        self._request(SeekRequest('precise', max(0, int(time_ms))))
+
+    def jump(self, delta_ms):
+        """Precise seek delta_ms away from where the last request was headed"""
+        self.seek(self.target_ms() + delta_ms)
+
+    def step_frame(self, direction):
+        """Pause and move one frame forward (direction=1) or back (direction=-1)"""
+        if self.player is None:
+            return
+        if self.player.is_playing():
+            self.player.set_pause(1)
+        if direction > 0 and not self.busy:
+            self.player.next_frame()  # Exact, no seek needed
+            return
+        fps = self.player.get_fps() or DEFAULT_FPS
+        self.jump(direction * 1000.0 / fps)
+
+    def target_ms(self):
+        """Time the player is at or is being moved to"""
+        for request in (self._pending, self._in_flight):
+            if request is not None:
+                return request.value if request.kind == 'precise' else request.value * self.get_length()
+        return max(0, self.player.get_time()) if self.player is not None else 0
+
+    def cancel(self):
+        """Forget a waiting request (e.g. the media changed)"""
+        self._pending = None
+        self._in_flight = None
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+
+    def _request(self, request):
+        if self.player is None or self.get_length() <= 0:
+            return
+        self._pending = request
+        self._pump()
+
+    def _pump(self):
+        """Issue the waiting request if nothing is in flight and the scrub spacing allows it"""
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+        now = time.monotonic()
+        if self._in_flight is not None:
+            overdue = (now - self._issued_at) * 1000 - SEEK_TIMEOUT_MS
+            if overdue < 0:
+                self._job = self.widget.after(int(-overdue) + 1, self._pump)
+                return
+            self.logger.debug('Seek to %s not confirmed, issuing the next one', self._in_flight)
+            self._in_flight = None
+        request = self._pending
+        if request is None:
+            return
+        if request.kind == 'fast':
+            wait = SCRUB_INTERVAL_MS - (now - self._last_scrub) * 1000
+            if wait > 0:
+                self._job = self.widget.after(int(wait) + 1, self._pump)
+                return
+            self._last_scrub = now
+        self._pending = None
+        self._in_flight = request
+        self._issued_at = now
+        self._issue(request)
+        # Covers a seek that libvlc never confirms
+        self._job = self.widget.after(SEEK_TIMEOUT_MS, self._pump)
+
+    def _issue(self, request):
+        self._from_position = self.player.get_position()
+        self._to_position = request.value if request.kind == 'fast' else request.value / self.get_length()
+        if request.kind == 'fast':
+            if self._fast_flag:
+                self.player.set_position(request.value, True)
+            else:
+                self.player.set_position(request.value)
+        elif self._fast_flag:
+            self.player.set_time(request.value, False)
+        else:
+            self.player.set_time(request.value)
+
+    def _on_position_changed(self, event):
+        """libvlc thread: wake the Tk side once the in-flight seek has landed"""
+        if self._in_flight is None:
+            return
+        position = event.u.new_position
+        if abs(position - self._to_position) > abs(position - self._from_position):
+            return  # Ordinary playback progress from before the seek
+        self._landed.set()
+
+    def _on_landed(self):
+        if self._in_flight is not None:
+            perf.record(f'seek.{self._in_flight.kind}', time.monotonic() - self._issued_at)
+            self._in_flight = None
+        self._pump()
@@ -0,0 +1,125 @@
+import time
+import logging
+import tkinter as tk
+from perf import perf
+from app_paths import data_path
+
+# Sampling periods while instrumentation is on, in milliseconds
+LAG_PROBE_INTERVAL = 100
+SAMPLE_INTERVAL = 1000
+DUMP_INTERVAL = 10000
+
+
+class StatsPanel:
+    """Live performance overlay, libvlc stats sampler and periodic JSON dump
+
+    Nothing here runs while instrumentation is disabled. Showing the panel
+    (toggle(), bound to F12) enables it; hiding it turns it back off unless
+    it was enabled from the environment. While enabled, Tk event-loop lag is
+    probed every LAG_PROBE_INTERVAL ms, libvlc media stats are sampled every
+    second, and the snapshot is written to perf_stats.json in the data dir.
+    """
+
+    def __init__(self, root, player):
+        self.logger = logging.getLogger(__name__)
+        self.root = root
+        self.player = player
+        self.window = None
+        self.text_label = None
+        self.dump_path = data_path('perf_stats.json')
+
+        self._always_on = perf.enabled
+        self._running = False
+        self._last_sample = 0.0
+        self._last_dump = 0.0
+
+        if perf.enabled:
+            self._start_sampling()
+
+    def toggle(self, event=None):
+        if self.window is None:
+            self.show()
+        else:
+            self.hide()
+
+    def show(self):
+        self.window = tk.Toplevel(self.root)
+        self.window.title("Performance")
+        self.window.protocol("WM_DELETE_WINDOW", self.hide)
+        self.text_label = tk.Label(self.window, justify=tk.LEFT, anchor=tk.NW, font=("Courier", 9))
+        self.text_label.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        perf.enable()
+        self._start_sampling()
+        self._render()
+
+    def hide(self):
+        if self.window is not None:
+            self.window.destroy()
+        self.window = None
+        self.text_label = None
+        if not self._always_on:
+            perf.enable(False)
+
+    def _start_sampling(self):
+        if self._running:
+            return
+        self._running = True
+        self._last_sample = time.monotonic()
+        expected = time.perf_counter() + LAG_PROBE_INTERVAL / 1000
+        self.root.after(LAG_PROBE_INTERVAL, self._tick, expected)
+
+    def _tick(self, expected):
+        """Single sampling loop: lag probe every tick, stats and dump less often"""
+        if not perf.enabled:
+            self._running = False
+            return
+        now = time.perf_counter()
+        perf.record('tk_loop_lag', max(0.0, now - expected))
+
+        if time.monotonic() - self._last_sample >= SAMPLE_INTERVAL / 1000:
+            self._last_sample = time.monotonic()
+            self._sample()
+
+        self.root.after(LAG_PROBE_INTERVAL, self._tick, time.perf_counter() + LAG_PROBE_INTERVAL / 1000)
+
+    def _sample(self):
+        self._sample_vlc_stats()
+
+        now = time.monotonic()
+        if now - self._last_dump >= DUMP_INTERVAL / 1000:
+            self._last_dump = now
+            try:
+                perf.dump(self.dump_path)
+            except OSError as e:
+                self.logger.warning('Could not write performance stats: %s', e)
+
+        self._render()
+
+    def _sample_vlc_stats(self):
+        import vlc
+
+        if self.player is None:
+            return  # Set once the player is created on first playback
+        media = self.player.get_media()
+        if media is None:
+            return
+        stats = vlc.MediaStats()
+        if media.get_stats(stats):
+            perf.gauge('vlc.decoded_video', stats.decoded_video)
+            perf.gauge('vlc.displayed_pictures', stats.displayed_pictures)
+            perf.gauge('vlc.lost_pictures', stats.lost_pictures)
+            perf.gauge('vlc.input_bitrate_kbps', round(stats.input_bitrate * 8000, 1))
+            perf.gauge('vlc.demux_bitrate_kbps', round(stats.demux_bitrate * 8000, 1))
+
+    def _render(self):
+        if self.text_label is None:
+            return
+        snapshot = perf.snapshot()
+        lines = [f'{"span":28s} {"n":>6s} {"avg ms":>9s} {"max ms":>9s} {"last ms":>9s}']
+        for name, stats in sorted(snapshot['spans'].items()):
+            lines.append(f'{name:28s} {stats["count"]:6d} {stats["avg_ms"]:9.1f} '
+                         f'{stats["max_ms"]:9.1f} {stats["last_ms"]:9.1f}')
+        lines.append('')
+        for name, value in sorted(snapshot['gauges'].items()):
+            lines.append(f'{name:28s} {value}')
+        self.text_label.config(text='\n'.join(lines))
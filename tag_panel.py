@@ -0,0 +1,140 @@
+import tkinter as tk
+import logging
+from media_metadata import format_duration
+
+# A quick tag covers the moments just before the key press
+QUICK_TAG_SPAN_MS = 5000
+
+
+class TagPanel:
+    """Tag list and tagging controls for the file that is currently playing
+
+    Tags are created without pausing: mark_in/mark_out bracket a range, and
+    quick_tag labels the last few seconds. get_position() must return
+    (path, time_ms) for the current media, and callback_seek(time_ms) jumps
+    playback to a tag when it is double-clicked.
+    """
+
+    def __init__(self, parent, tag_store, get_position, callback_seek):
+        self.logger = logging.getLogger(__name__)
+        self.logger.debug('Initializing TagPanel')
+
+        self.parent = parent
+        self.tag_store = tag_store
+        self.get_position = get_position
+        self.callback_seek = callback_seek
+
+        self.current_file = None
+        self.file_tags = []
+        self.active_ids = set()
+        self.mark_in_ms = None
+
+        self.frame = tk.Frame(parent, width=200)
+
+        self.title_label = tk.Label(self.frame, text="Tags", font=("Arial", 10, "bold"))
+        self.title_label.pack(fill=tk.X, padx=5, pady=(5, 0))
+
+        # Label used for new tags
+        self.label_var = tk.StringVar(value="tag")
+        self.label_entry = tk.Entry(self.frame, textvariable=self.label_var)
+        self.label_entry.pack(fill=tk.X, padx=5, pady=2)
+        self.label_entry.bind("<Return>", lambda event: self.parent.focus_set())
+
+        self.buttons_frame = tk.Frame(self.frame)
+        self.buttons_frame.pack(fill=tk.X, padx=5)
+        self.in_button = tk.Button(self.buttons_frame, text="In [i]", command=self.mark_in)
+        self.in_button.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.out_button = tk.Button(self.buttons_frame, text="Out [o]", command=self.mark_out)
+        self.out_button.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.quick_button = tk.Button(self.buttons_frame, text="Quick [t]", command=self.quick_tag)
+        self.quick_button.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+        self.status_label = tk.Label(self.frame, text="")
+        self.status_label.pack(fill=tk.X, padx=5)
+
+        # Tags of the current file; the ones under the playhead are highlighted
+        self.list_frame = tk.Frame(self.frame)
+        self.list_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=(0, 5))
+
+        self.scrollbar = tk.Scrollbar(self.list_frame)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tag_box = tk.Listbox(self.list_frame, height=6, yscrollcommand=self.scrollbar.set)
+        self.tag_box.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.config(command=self.tag_box.yview)
+
+        self.tag_box.bind("<Double-Button-1>", self.seek_to_selected)
+        self.tag_box.bind("<Delete>", self.delete_selected)
+
+        self.logger.debug('TagPanel initialized')
+
+    def set_file(self, path):
+        """Show the tags of a newly playing file"""
+        if path == self.current_file:
+            return
+        self.current_file = path
+        self.mark_in_ms = None
+        self.status_label.config(text="")
+        self.reload()
+
+    def reload(self):
+        self.file_tags = self.tag_store.tags_for_file(self.current_file) if self.current_file else []
+        self.active_ids = set()
+        self.tag_box.delete(0, tk.END)
+        for tag in self.file_tags:
+            self.tag_box.insert(tk.END, self._format_tag(tag))
+
+    def update_time(self, time_ms):
+        """Highlight the tags overlapping the playhead; called on every position update"""
+        if self.current_file is None:
+            return
+        active = {tag.id for tag in self.tag_store.tags_at(self.current_file, time_ms)}
+        if active == self.active_ids:
+            return
+        self.active_ids = active
+        for row, tag in enumerate(self.file_tags):
+            self.tag_box.itemconfig(row, background='#ffe08a' if tag.id in active else '')
+
+    def mark_in(self):
+        path, time_ms = self.get_position()
+        if path is None:
+            return
+        self.mark_in_ms = time_ms
+        self.status_label.config(text=f"In at {format_duration(time_ms)}")
+
+    def mark_out(self):
+        path, time_ms = self.get_position()
+        if path is None or self.mark_in_ms is None:
+            return
+        self._add_tag(path, self.mark_in_ms, time_ms)
+        self.mark_in_ms = None
+
+    def quick_tag(self):
+        path, time_ms = self.get_position()
+        if path is None:
+            return
+        self._add_tag(path, max(0, time_ms - QUICK_TAG_SPAN_MS), time_ms)
+
+    def seek_to_selected(self, event=None):
+        selection = self.tag_box.curselection()
+        if selection:
+            self.callback_seek(self.file_tags[selection[0]].start_ms)
+
+    def delete_selected(self, event=None):
+        selection = self.tag_box.curselection()
+        if selection:
+            tag = self.file_tags[selection[0]]
+            self.tag_store.remove(tag)
+            self.logger.info('Removed tag %s (%s)', tag.id, tag.label)
+            self.reload()
+
+    def _add_tag(self, path, start_ms, end_ms):
+        label = self.label_var.get().strip() or "tag"
+        tag = self.tag_store.add(path, label, start_ms, end_ms)
+        self.status_label.config(text=f"Tagged '{label}' {format_duration(tag.start_ms)}-{format_duration(tag.end_ms)}")
+        if path == self.current_file:
+            self.reload()
+
+    @staticmethod
+    def _format_tag(tag):
+        return f'{format_duration(tag.start_ms)}-{format_duration(tag.end_ms)}  {tag.label}'
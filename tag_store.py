@@ -0,0 +1,279 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import random
+from collections import namedtuple, OrderedDict
+from app_paths import data_path
+
+Tag = namedtuple('Tag', ['id', 'path', 'label', 'start_ms', 'end_ms'])
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tags (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    label TEXT NOT NULL,
+    start_ms INTEGER NOT NULL,
+    end_ms INTEGER NOT NULL,
+    created REAL
+);
+CREATE INDEX IF NOT EXISTS tags_path_start ON tags (path, start_ms);
+CREATE INDEX IF NOT EXISTS tags_label_path ON tags (label, path);
+'''
+
+
+class _Node:
+    __slots__ = ('key', 'tag', 'priority', 'left', 'right', 'max_end')
+
+    def __init__(self, key, tag):
+        self.key = key
+        self.tag = tag
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.max_end = tag.end_ms
+
+
+def _update(node):
+    max_end = node.tag.end_ms
+    if node.left is not None and node.left.max_end > max_end:
+        max_end = node.left.max_end
+    if node.right is not None and node.right.max_end > max_end:
+        max_end = node.right.max_end
+    node.max_end = max_end
+
+
+def _split(node, key):
+    """(nodes with keys below key, the rest)"""
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, rest = _split(node.right, key)
+        _update(node)
+        return node, rest
+    below, node.left = _split(node.left, key)
+    _update(node)
+    return below, node
+
+
+def _merge(left, right):
+    """Join two treaps where every key in left is below every key in right"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+def _delete(node, key):
+    if node is None:
+        return None
+    if key < node.key:
+        node.left = _delete(node.left, key)
+    elif node.key < key:
+        node.right = _delete(node.right, key)
+    else:
+        return _merge(node.left, node.right)
+    _update(node)
+    return node
+
+
+class IntervalIndex:
+    """Tags of one file in an interval tree
+
+    A treap ordered by (start, end, id) where every node also holds the
+    largest end time in its subtree. overlapping(t) skips subtrees that end
+    before t and right subtrees of tags that start after t. A lookup costs
+    O((k + 1) log n) for k hits, also when a few long tags (whole-file or
+    chapter tags) span everything. add() and remove() are O(log n).
+    """
+
+    def __init__(self, tags=()):
+        self._root = None
+        self._keys = {}  # Tag id -> key
+        for tag in tags:
+            self.add(tag)
+
+    @staticmethod
+    def _key(tag):
+        return tag.start_ms, tag.end_ms, tag.id
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        stack, node = [], self._root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.tag
+            node = node.right
+
+    def add(self, tag):
+        key = self._key(tag)
+        self._keys[tag.id] = key
+        below, rest = _split(self._root, key)
+        self._root = _merge(_merge(below, _Node(key, tag)), rest)
+
+    def remove(self, tag_id):
+        key = self._keys.pop(tag_id, None)
+        if key is None:
+            return None
+        below, rest = _split(self._root, key)
+        node, rest = _split(rest, (key[0], key[1], key[2] + 1))
+        self._root = _merge(below, rest)
+        return node.tag
+
+    def overlapping(self, time_ms):
+        """Tags whose [start, end] range contains time_ms, in start order"""
+        found = []
+        stack, node = [], self._root
+        while stack or node is not None:
+            while node is not None and node.max_end >= time_ms:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                break
+            node = stack.pop()
+            if node.tag.start_ms > time_ms:
+                break  # In-order: every tag from here on starts too late
+            if node.tag.end_ms >= time_ms:
+                found.append(node.tag)
+            node = node.right
+        return found
+
+
+class TagStore:
+    """Persistent store of labelled time ranges
+
+    New tags and deletions are appended to a JSON-lines log, which is cheap
+    enough to do on every hotkey press. The log is periodically compacted
+    into SQLite in a single transaction (replaying it is idempotent, so a crash
+    mid-compaction loses nothing). Per-file interval indexes are built on
+    demand and kept for the most recently used files.
+    """
+
+    def __init__(self, db_path=None, log_path=None, compact_threshold=500, cached_files=64):
+        self.logger = logging.getLogger(__name__)
+        self.db_path = db_path or data_path('tags.db')
+        self.log_path = log_path or data_path('tags.log')
+        self.compact_threshold = compact_threshold
+        self.cached_files = cached_files
+
+        self._conn = sqlite3.connect(self.db_path)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+        self._indexes = OrderedDict()
+        self._pending = 0
+        self.compact()
+
+        row = self._conn.execute('SELECT MAX(id) FROM tags').fetchone()
+        self._next_id = (row[0] or 0) + 1
+        self._log = open(self.log_path, 'a', encoding='utf-8')
+
+    def add(self, path, label, start_ms, end_ms):
+        """Record a tag and return it"""
+        start_ms, end_ms = sorted((int(start_ms), int(end_ms)))
+        tag = Tag(self._next_id, path, label, start_ms, end_ms)
+        self._next_id += 1
+        self._append({'op': 'add', 'id': tag.id, 'path': path, 'label': label,
+                      'start_ms': start_ms, 'end_ms': end_ms, 'created': time.time()})
+        if path in self._indexes:
+            self._indexes[path].add(tag)
+        self.logger.debug('Added tag %s %r on %s (%d-%d ms)', tag.id, label, path, start_ms, end_ms)
+        return tag
+
+    def remove(self, tag):
+        self._append({'op': 'delete', 'id': tag.id})
+        if tag.path in self._indexes:
+            self._indexes[tag.path].remove(tag.id)
+
+    def tags_for_file(self, path):
+        """All tags of a file, sorted by start time"""
+        return list(self._index(path))
+
+    def tags_at(self, path, time_ms):
+        """Tags of a file overlapping the given timestamp"""
+        return self._index(path).overlapping(time_ms)
+
+    def files_with_label(self, label):
+        """Sorted paths of every file carrying a tag with this label"""
+        self.compact()
+        rows = self._conn.execute('SELECT DISTINCT path FROM tags WHERE label = ? ORDER BY path', (label,))
+        return [row[0] for row in rows]
+
+    def labels(self):
+        self.compact()
+        return [row[0] for row in self._conn.execute('SELECT DISTINCT label FROM tags ORDER BY label')]
+
+    def compact(self):
+        """Replay the append log into SQLite and truncate it"""
+        if getattr(self, '_log', None) is not None:
+            self._log.flush()
+        if not os.path.exists(self.log_path) or os.path.getsize(self.log_path) == 0:
+            self._pending = 0
+            return
+
+        added = deleted = 0
+        with open(self.log_path, 'r', encoding='utf-8') as f, self._conn:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn final line after a crash
+                if record['op'] == 'add':
+                    self._conn.execute(
+                        'INSERT OR REPLACE INTO tags (id, path, label, start_ms, end_ms, created) '
+                        'VALUES (?, ?, ?, ?, ?, ?)',
+                        (record['id'], record['path'], record['label'],
+                         record['start_ms'], record['end_ms'], record.get('created'))
+                    )
+                    added += 1
+                elif record['op'] == 'delete':
+                    self._conn.execute('DELETE FROM tags WHERE id = ?', (record['id'],))
+                    deleted += 1
+
+        # Truncate in place so the open append handle stays valid
+        with open(self.log_path, 'r+', encoding='utf-8') as f:
+            f.truncate(0)
+        self._pending = 0
+        self.logger.debug('Compacted tag log: %d added, %d deleted', added, deleted)
+
+    def close(self):
+        self.compact()
+        self._log.close()
+        self._conn.close()
+
+    def _append(self, record):
+        self._log.write(json.dumps(record) + '\n')
+        self._log.flush()
+        self._pending += 1
+        if self._pending >= self.compact_threshold:
+            self.compact()
+
+    def _index(self, path):
+        index = self._indexes.get(path)
+        if index is not None:
+            self._indexes.move_to_end(path)
+            return index
+
+        # Only compacted tags are in SQLite, so fold the log in first
+        if self._pending:
+            self.compact()
+        rows = self._conn.execute(
+            'SELECT id, path, label, start_ms, end_ms FROM tags WHERE path = ?', (path,))
+        index = IntervalIndex(Tag(*row) for row in rows)
+        self._indexes[path] = index
+        while len(self._indexes) > self.cached_files:
+            self._indexes.popitem(last=False)
+        return index
@@ -0,0 +1,151 @@
+import random
+import time
+
+import pytest
+
+from entry_store import EntryStore
+from indexed_playlist import IndexedPlaylist
+
+SIZES = (10, 1000, 100000)
+
+
+def make_paths(count, duplicates=0):
+    paths = [f'/media/show{i % 97}/episode{i}.mp4' for i in range(count)]
+    rng = random.Random(count)
+    for _ in range(duplicates):
+        paths.insert(rng.randrange(len(paths) + 1), rng.choice(paths))
+    return paths
+
+
+def assert_matches(playlist, reference):
+    assert len(playlist) == len(reference)
+    assert list(playlist) == reference
+    for path in set(reference):
+        positions = tuple(i for i, p in enumerate(reference) if p == path)
+        assert path in playlist
+        assert playlist.index(path) == positions[0]
+        assert playlist.positions(path) == positions
+
+
+@pytest.mark.parametrize('count', SIZES[:2])
+def test_lookup_matches_list(count):
+    paths = make_paths(count, duplicates=count // 10)
+    playlist = IndexedPlaylist(paths, store=EntryStore())
+    assert_matches(playlist, paths)
+    assert '/media/missing.mp4' not in playlist
+    with pytest.raises(ValueError):
+        playlist.index('/media/missing.mp4')
+
+
+def test_index_prefers_current_duplicate():
+    playlist = IndexedPlaylist(['a', 'b', 'a', 'c', 'a'], store=EntryStore())
+    assert playlist.index('a') == 0
+    assert playlist.index('a', prefer=2) == 2
+    assert playlist.index('a', prefer=4) == 4
+    assert playlist.index('a', prefer=1) == 0
+
+
+@pytest.mark.parametrize('count', SIZES[:2])
+def test_insert_and_remove_match_list(count):
+    rng = random.Random(count)
+    paths = make_paths(count)
+    store = EntryStore()
+    playlist = IndexedPlaylist(paths, store=store)
+    reference = list(paths)
+    for step in range(50):
+        action = rng.random()
+        if action < 0.3:
+            index = rng.randrange(len(reference) + 1)
+            path = rng.choice(paths + [f'/new/{step}.mp4'])
+            playlist.insert(index, path)
+            reference.insert(index, path)
+        elif action < 0.5:
+            index = rng.randrange(len(reference) + 1)
+            new = [rng.choice(paths) for _ in range(rng.randrange(1, 5))]
+            playlist.insert_many(index, new)
+            reference[index:index] = new
+        elif action < 0.7 and reference:
+            index = rng.randrange(len(reference))
+            assert playlist.pop(index) == reference.pop(index)
+        elif action < 0.85 and reference:
+            start = rng.randrange(len(reference))
+            end = min(len(reference), start + rng.randrange(1, 5))
+            playlist.delete(start, end)
+            del reference[start:end]
+        elif reference:
+            index = rng.randrange(len(reference))
+            path = rng.choice(paths)
+            playlist.replace(index, path)
+            reference[index] = path
+    assert_matches(playlist, reference)
+
+
+def track_change_seconds(playlist, paths, rounds=2000):
+    """Best-of-5 time for rounds of what a track change does: membership, index and next path"""
+    rng = random.Random(0)
+    picks = [rng.choice(paths) for _ in range(rounds)]
+    best = float('inf')
+    for _ in range(5):
+        started = time.perf_counter()
+        for path in picks:
+            if path in playlist:
+                index = playlist.index(path, prefer=0)
+                if index + 1 < len(playlist):
+                    playlist[index + 1]
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def test_track_change_cost_is_flat():
+    timings = {}
+    for count in SIZES:
+        paths = make_paths(count, duplicates=count // 100)
+        timings[count] = track_change_seconds(IndexedPlaylist(paths, store=EntryStore()), paths)
+    # A list scan would be ~10000x slower at the largest size; allow generous noise
+    assert timings[SIZES[-1]] < timings[SIZES[0]] * 5, timings
+
+
+def test_store_keeps_only_referenced_paths():
+    store = EntryStore()
+    first = IndexedPlaylist(make_paths(1000), store=store)
+    second = IndexedPlaylist(make_paths(500) + ['/other/a.mp4'], store=store)
+    assert len(store) == 1001  # Paths in both playlists are stored once
+
+    first.delete(0, 100)
+    assert len(store) == 1001  # Still in the second playlist
+    first.delete(400, 900)
+    assert len(store) == 501
+    assert '/media/show0/episode500.mp4' not in first
+
+    second.replace(500, '/other/b.mp4')
+    assert store.find('/other/a.mp4') == -1
+    assert second[500] == '/other/b.mp4'
+
+    del first, second
+    assert len(store) == 0
+
+
+def test_released_ids_are_reused():
+    store = EntryStore()
+    for load in range(10):
+        paths = [f'/load{load}/{i}.mp4' for i in range(5000)]
+        playlist = IndexedPlaylist(paths, store=store)
+        assert list(playlist) == paths
+        assert playlist.index(paths[-1]) == len(paths) - 1
+    assert len(store) == 5000
+    assert len(store._refs) <= 10000  # At most the old and the new playlist at once
+    assert len(playlist._first) <= 4 * len(playlist)
+
+
+def test_delete_positions_and_positions_under():
+    store = EntryStore()
+    paths = make_paths(1000, duplicates=50)
+    playlist = IndexedPlaylist(paths, store=store)
+    under = playlist.positions_under(('/media/show3/', '/media/show40/'))
+    assert under == [i for i, path in enumerate(paths) if path.startswith(('/media/show3/', '/media/show40/'))]
+
+    removed = sorted(set(under) | {0, 500, len(paths) - 1})
+    playlist.delete_positions(removed)
+    reference = [path for i, path in enumerate(paths) if i not in set(removed)]
+    assert_matches(playlist, reference)
+    assert len(store) == len(set(reference))
@@ -0,0 +1,83 @@
+import random
+import tkinter
+
+import pytest
+
+from search_index import PlaylistFilter, TrigramIndex
+
+
+def make_texts(count, rng):
+    return [f'show{rng.randrange(30)}/episode {rng.randrange(1000)}.mp4' for _ in range(count)]
+
+
+def matches(texts, query):
+    return [i for i, text in enumerate(texts) if query in text]
+
+
+def test_trigram_index_patches_match_a_fresh_index():
+    rng = random.Random(1)
+    texts = make_texts(500, rng)
+    index = TrigramIndex()
+    index.add(texts)
+    for _ in range(100):
+        action = rng.random()
+        if action < 0.4:
+            start = rng.randrange(len(texts) + 1)
+            new = make_texts(rng.randrange(1, 20), rng)
+            texts[start:start] = new
+            index.insert(start, new)
+        elif action < 0.8:
+            removed = sorted(rng.sample(range(len(texts)), rng.randrange(1, 20)))
+            for position in reversed(removed):
+                del texts[position]
+            index.remove(removed)
+        else:
+            position = rng.randrange(len(texts))
+            old, texts[position] = texts[position], make_texts(1, rng)[0]
+            index.replace(position, old, texts[position])
+
+    fresh = TrigramIndex()
+    fresh.add(texts)
+    assert index.size == len(texts)
+    assert {gram: list(posting) for gram, posting in index._postings.items()} == \
+        {gram: list(posting) for gram, posting in fresh._postings.items()}
+
+
+@pytest.fixture
+def widget():
+    return tkinter.Tcl()  # after() without a display
+
+
+def test_filter_rows_follow_inserts_removals_and_renames(widget):
+    rng = random.Random(2)
+    texts = make_texts(300, rng)
+    search = PlaylistFilter(widget, lambda i: texts[i], lambda done: None)
+    search.entries_added(0, len(texts))
+    search._index_step()  # Index everything now instead of from the Tk loop
+    search.set_query('show1')
+    assert list(search.rows) == matches(texts, 'show1')
+
+    new = make_texts(10, rng)
+    texts[50:50] = new
+    search.entries_inserted(50, len(new))
+    assert list(search.rows) == matches(texts, 'show1')
+
+    removed = [0, 49, 50, 51, 200]
+    for position in reversed(removed):
+        del texts[position]
+    search.entries_removed(removed)
+    assert list(search.rows) == matches(texts, 'show1')
+
+    old, texts[10] = texts[10], 'show1/renamed.mp4'
+    search.entries_changed([10], [old])
+    assert list(search.rows) == matches(texts, 'show1')
+
+    search.set_query('')
+    search.set_query('renamed')
+    assert list(search.rows) == [10]
+
+    texts.append('show2/appended.mp4')
+    search.entries_inserted(len(texts) - 1, 1)  # After the last entry of a complete index
+    assert search.index.size == len(texts)
+    search.set_query('appended')
+    assert list(search.rows) == [len(texts) - 1]
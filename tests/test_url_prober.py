@@ -0,0 +1,100 @@
+import asyncio
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from url_prober import UrlProber, probe_urls
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self, status, headers=(), body=b''):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        if self.path == '/head-refused':
+            self._reply(405)
+        else:
+            self.do_GET()
+
+    def do_GET(self):
+        if self.path in ('/ok', '/head-refused'):
+            self._reply(200, body=b'x')
+        elif self.path == '/moved':
+            self._reply(302, [('Location', '/ok')])
+        elif self.path == '/slow':
+            time.sleep(2)
+            self._reply(200)
+        else:
+            self._reply(404)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_probe_urls_statuses(server):
+    refused = f'http://127.0.0.1:{closed_port()}/'
+    urls = [f'{server}/ok', f'{server}/missing', f'{server}/moved', f'{server}/head-refused', refused]
+    results = asyncio.run(probe_urls(urls, timeout=1.0))
+
+    assert results[f'{server}/ok'].alive and results[f'{server}/ok'].status == 200
+    assert not results[f'{server}/missing'].alive and results[f'{server}/missing'].error == 'HTTP 404'
+    assert results[f'{server}/moved'].alive and results[f'{server}/moved'].status == 200
+    assert results[f'{server}/head-refused'].alive
+    assert not results[refused].alive and results[refused].status == 0
+
+
+def test_probe_timeout(server):
+    result = asyncio.run(probe_urls([f'{server}/slow'], timeout=0.3))[f'{server}/slow']
+    assert not result.alive and result.error == 'timed out'
+
+
+def test_prober_notifies_and_caches(server):
+    woken = threading.Event()
+    prober = UrlProber(notify=woken.set, concurrency=4, ttl=60, timeout=1.0)
+    try:
+        urls = [f'{server}/ok', f'{server}/missing']
+        prober.request(urls)
+        results = {}
+        deadline = time.monotonic() + 5
+        while len(results) < len(urls) and time.monotonic() < deadline:
+            woken.wait(0.1)
+            woken.clear()
+            results.update(prober.poll())
+        assert set(results) == set(urls)
+        assert not prober.is_dead(f'{server}/ok')
+        assert prober.is_dead(f'{server}/missing')
+
+        # Fresh results are not probed again
+        prober.request(urls)
+        time.sleep(0.2)
+        assert prober.poll() == []
+    finally:
+        prober.shutdown()
@@ -0,0 +1,225 @@
+import os
+import time
+import heapq
+import shutil
+import hashlib
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from app_paths import data_path
+
+# Frames sampled per file and their width in pixels (height keeps the aspect ratio)
+FRAMES_PER_FILE = 20
+THUMBNAIL_WIDTH = 160
+CACHE_LIMIT_BYTES = 256 * 1024 * 1024
+
+PRIORITY_CURRENT = 0
+PRIORITY_NEXT = 1
+PRIORITY_BACKGROUND = 2
+
+
+def file_key(path):
+    """Cache key for a media file: changes whenever the file is replaced or edited"""
+    stat = os.stat(path)
+    identity = f'{path}|{stat.st_size}|{stat.st_mtime_ns}'
+    return hashlib.sha1(identity.encode('utf-8', errors='surrogatepass')).hexdigest()
+
+
+def frame_name(index):
+    return f'frame_{index:03d}.png'
+
+
+def generate_thumbnails(path, out_dir, count=FRAMES_PER_FILE, width=THUMBNAIL_WIDTH, timeout=10.0):
+    """Worker process: snapshot count evenly spaced frames of path into out_dir
+
+    Runs a private headless libvlc instance (dummy interface and video output,
+    no audio). Frames are written to a temporary directory that is renamed
+    into place at the end, so a half-finished set is never picked up.
+    Returns the number of frames written.
+    """
+    import vlc
+
+    temp_dir = out_dir + '.partial'
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+
+    instance = vlc.Instance('--intf=dummy', '--vout=dummy', '--no-audio', '--quiet',
+                            '--no-video-title-show', '--no-snapshot-preview')
+    player = instance.media_player_new()
+    media = instance.media_new(path)
+    player.set_media(media)
+    written = 0
+    try:
+        player.play()
+        deadline = time.monotonic() + timeout
+        while not player.is_playing() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        player.pause()  # Hold still between seeks, only decode what is snapshotted
+
+        for index in range(count):
+            player.set_position((index + 0.5) / count)
+            time.sleep(0.15)  # Let the decoder reach the new keyframe
+            target = os.path.join(temp_dir, frame_name(index))
+            if player.video_take_snapshot(0, target, width, 0) == 0:
+                frame_deadline = time.monotonic() + 2.0
+                while not os.path.exists(target) and time.monotonic() < frame_deadline:
+                    time.sleep(0.02)
+                written += os.path.exists(target)
+    finally:
+        player.stop()
+        player.release()
+        media.release()
+        instance.release()
+
+    if written:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.replace(temp_dir, out_dir)
+    else:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return written
+
+
+class ThumbnailCache:
+    """Size-bounded on-disk store of per-file frame strips with LRU eviction
+
+    Every file gets a directory named after file_key(). Access refreshes the
+    directory's mtime, which is what eviction orders by once the total size
+    passes limit_bytes.
+    """
+
+    def __init__(self, root=None, limit_bytes=CACHE_LIMIT_BYTES):
+        self.logger = logging.getLogger(__name__)
+        self.root = root or data_path('thumbnails')
+        self.limit_bytes = limit_bytes
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._sizes = {}
+        for name in os.listdir(self.root):
+            entry_dir = os.path.join(self.root, name)
+            if name.endswith('.partial'):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            elif os.path.isdir(entry_dir):
+                self._sizes[name] = self._dir_size(entry_dir)
+
+    def entry_dir(self, key):
+        return os.path.join(self.root, key)
+
+    def frames(self, key):
+        """Sorted frame image paths for key (refreshing its LRU position), or None"""
+        entry_dir = self.entry_dir(key)
+        if key not in self._sizes:
+            return None
+        try:
+            os.utime(entry_dir)
+            return [os.path.join(entry_dir, name) for name in sorted(os.listdir(entry_dir))]
+        except OSError:
+            return None
+
+    def __contains__(self, key):
+        return key in self._sizes
+
+    def added(self, key):
+        """Account for a freshly generated entry and evict old ones if over the limit"""
+        with self._lock:
+            self._sizes[key] = self._dir_size(self.entry_dir(key))
+            total = sum(self._sizes.values())
+            if total <= self.limit_bytes:
+                return
+            by_age = sorted(self._sizes, key=lambda k: self._mtime(self.entry_dir(k)))
+            for old_key in by_age:
+                if total <= self.limit_bytes:
+                    break
+                if old_key == key:
+                    continue
+                total -= self._sizes.pop(old_key)
+                shutil.rmtree(self.entry_dir(old_key), ignore_errors=True)
+                self.logger.debug('Evicted thumbnails %s', old_key)
+
+    @staticmethod
+    def _dir_size(entry_dir):
+        try:
+            return sum(entry.stat().st_size for entry in os.scandir(entry_dir))
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _mtime(entry_dir):
+        try:
+            return os.stat(entry_dir).st_mtime
+        except OSError:
+            return 0
+
+
+class ThumbnailGenerator:
+    """Prioritized front end to a process pool of headless snapshotters
+
+    request() queues a file; lower priority numbers run first, so the playing
+    file and the next queued item are generated before anything else. Only
+    max_workers jobs are handed to the pool at a time so a late high-priority
+    request never waits behind a long backlog. poll() runs on the Tk thread,
+    submits work and returns the paths that finished since the last call.
+    """
+
+    def __init__(self, cache=None, max_workers=2):
+        self.logger = logging.getLogger(__name__)
+        self.cache = cache or ThumbnailCache()
+        self.max_workers = max_workers
+        self._executor = None
+        self._heap = []
+        self._queued = {}
+        self._running = {}
+        self._seq = 0
+
+    def request(self, path, priority=PRIORITY_BACKGROUND):
+        if not path or '://' in path or path in self._running:
+            return
+        queued = self._queued.get(path)
+        if queued is not None and queued <= priority:
+            return
+        self._queued[path] = priority
+        self._seq += 1
+        heapq.heappush(self._heap, (priority, self._seq, path))
+
+    def busy(self):
+        return bool(self._heap or self._running)
+
+    def poll(self):
+        """Collect finished jobs and start queued ones; returns finished paths"""
+        finished = []
+        for future in [f for f in self._running.values() if f.done()]:
+            path = future.path
+            del self._running[path]
+            try:
+                if future.result():
+                    self.cache.added(future.key)
+                    finished.append(path)
+            except Exception as e:
+                self.logger.warning('Thumbnail generation failed for %s: %s', path, e)
+
+        while self._heap and len(self._running) < self.max_workers:
+            priority, _, path = heapq.heappop(self._heap)
+            if self._queued.get(path) != priority:
+                continue
+            del self._queued[path]
+            try:
+                key = file_key(path)
+            except OSError:
+                continue
+            if key in self.cache:
+                continue
+            if self._executor is None:
+                # Spawned, not forked: by now libvlc threads may hold locks a forked child would inherit
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            future = self._executor.submit(generate_thumbnails, path, self.cache.entry_dir(key))
+            future.path = path
+            future.key = key
+            self._running[path] = future
+        return finished
+
+    def shutdown(self):
+        self._heap.clear()
+        self._queued.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
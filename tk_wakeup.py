@@ -0,0 +1,100 @@
+import os
+import logging
+import tkinter as tk
+
+# Where Tk cannot watch file descriptors (Windows) a flag is polled instead: this often
+# while wakeups keep coming, backing off to IDLE_POLL_MS once they stop
+POLL_MS = 20
+IDLE_POLL_MS = 100
+
+
+class TkWakeup:
+    """Run a callback on the Tk thread, triggered from any thread without calling into Tk
+
+    Calling Tk from another thread, event_generate included, hands the call
+    to the Tk thread and blocks until it is served. If the Tk thread is
+    waiting for that thread at the time (libvlc joins its event thread in
+    set_media() and stop()), both hang. set() only writes a byte to a
+    non-blocking pipe that the Tk loop watches with createfilehandler.
+    Wakeups coalesce: while one is pending set() does nothing, so the
+    callback should drain everything queued for it.
+
+    Without file handlers set() cannot start a timer either (after() is a
+    Tk call), so the flag is polled: every POLL_MS right after a wakeup,
+    doubling up to IDLE_POLL_MS while none come.
+    """
+
+    def __init__(self, widget, callback):
+        self.logger = logging.getLogger(__name__)
+        self.widget = widget
+        self.callback = callback
+        self._pending = False
+        self._read_fd = None
+        self._write_fd = None
+        self._poll_job = None
+        self._poll_ms = None  # Current polling interval, None unless polling
+
+        read_fd, write_fd = os.pipe()
+        try:
+            os.set_blocking(read_fd, False)
+            os.set_blocking(write_fd, False)
+            widget.tk.createfilehandler(read_fd, tk.READABLE, self._on_readable)
+        except (AttributeError, OSError, tk.TclError):
+            os.close(read_fd)
+            os.close(write_fd)
+            self._poll_ms = IDLE_POLL_MS
+            self._poll_job = widget.after(self._poll_ms, self._poll)
+        else:
+            self._read_fd, self._write_fd = read_fd, write_fd
+
+    def set(self):
+        """Any thread: have the callback run on the Tk thread soon; never blocks"""
+        if self._pending:
+            return
+        self._pending = True
+        write_fd = self._write_fd
+        if write_fd is not None:
+            try:
+                os.write(write_fd, b'\0')
+            except OSError:
+                pass  # Pipe full (a wakeup is on its way anyway) or already closed
+
+    def close(self):
+        if self._read_fd is not None:
+            try:
+                self.widget.tk.deletefilehandler(self._read_fd)
+            except tk.TclError:
+                pass
+            read_fd, write_fd = self._read_fd, self._write_fd
+            self._read_fd = self._write_fd = None
+            os.close(read_fd)
+            os.close(write_fd)
+        if self._poll_job is not None:
+            self.widget.after_cancel(self._poll_job)
+            self._poll_job = None
+        self._poll_ms = None
+
+    def _on_readable(self, fd, mask):
+        try:
+            os.read(fd, 4096)
+        except OSError:
+            pass
+        self._fire()
+
+    def _poll(self):
+        self._poll_job = None
+        if self._pending:
+            self._poll_ms = POLL_MS  # More are likely to follow soon
+            self._fire()
+        else:
+            self._poll_ms = min(self._poll_ms * 2, IDLE_POLL_MS)
+        if self._poll_ms is not None:  # Unless the callback closed it
+            self._poll_job = self.widget.after(self._poll_ms, self._poll)
+
+    def _fire(self):
+        # Cleared first: a set() from here on wakes the loop again
+        self._pending = False
+        try:
+            self.callback()
+        except Exception as e:
+            self.logger.error('Error in Tk wakeup callback %s: %s', self.callback, e)
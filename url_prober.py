@@ -0,0 +1,268 @@
+import ssl
+import time
+import queue
+import asyncio
+import logging
+import threading
+import collections
+from urllib.parse import urlsplit, urljoin
+
+PROBE_CONCURRENCY = 32
+PER_HOST_CONCURRENCY = 4
+PROBE_TIMEOUT = 5.0
+RESULT_TTL = 600.0
+MAX_REDIRECTS = 3
+MAX_IDLE_PER_HOST = 4
+
+DEFAULT_PORTS = {'http': 80, 'https': 443, 'rtsp': 554, 'rtmp': 1935, 'mms': 1755}
+
+# alive: reachable (HTTP status below 400, or a TCP connect for other schemes)
+# status: final HTTP status (0 for plain TCP checks and failures)
+# latency_ms: time to the response headers; error: failure reason or ''
+ProbeResult = collections.namedtuple('ProbeResult', 'alive status latency_ms error checked')
+
+
+class ConnectionPool:
+    """Idle keep-alive connections per (scheme, host, port)"""
+
+    def __init__(self, max_idle=MAX_IDLE_PER_HOST):
+        self.max_idle = max_idle
+        self._idle = collections.defaultdict(list)
+        self._ssl = ssl.create_default_context()
+
+    async def acquire(self, scheme, host, port):
+        """(reader, writer, reused) for the host, reusing an idle connection when there is one"""
+        idle = self._idle[(scheme, host, port)]
+        while idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+        context = self._ssl if scheme == 'https' else None
+        reader, writer = await asyncio.open_connection(host, port, ssl=context,
+                                                       server_hostname=host if context else None)
+        return reader, writer, False
+
+    def release(self, scheme, host, port, reader, writer, reusable):
+        idle = self._idle[(scheme, host, port)]
+        if reusable and len(idle) < self.max_idle and not writer.is_closing():
+            idle.append((reader, writer))
+        else:
+            writer.close()
+
+    def close(self):
+        for idle in self._idle.values():
+            for _, writer in idle:
+                writer.close()
+        self._idle.clear()
+
+
+async def _http_request(pool, method, url):
+    """One request; returns (status, headers). The body is skipped so the connection can be reused"""
+    parts = urlsplit(url)
+    port = parts.port or DEFAULT_PORTS[parts.scheme]
+    target = parts.path or '/'
+    if parts.query:
+        target += '?' + parts.query
+    host_header = parts.hostname if parts.port is None else f'{parts.hostname}:{parts.port}'
+    request = (f'{method} {target} HTTP/1.1\r\nHost: {host_header}\r\nUser-Agent: vlc_tagger\r\n'
+               f'Accept: */*\r\nConnection: keep-alive\r\n')
+    if method == 'GET':
+        request += 'Range: bytes=0-0\r\n'
+    request = (request + '\r\n').encode('latin-1')
+
+    # A pooled connection may have been closed by the server meanwhile, retry once on a fresh one
+    for attempt in range(2):
+        reader, writer, reused = await pool.acquire(parts.scheme, parts.hostname, port)
+        try:
+            writer.write(request)
+            await writer.drain()
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionError('connection closed')
+            status = int(status_line.split()[1])
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+        except (ConnectionError, IndexError, ValueError):
+            writer.close()
+            if reused and attempt == 0:
+                continue
+            raise
+        except BaseException:
+            writer.close()
+            raise
+
+        reusable = headers.get('connection', '').lower() != 'close'
+        length = headers.get('content-length')
+        if method != 'HEAD' and status not in (204, 304):
+            if length is not None and length.isdigit() and int(length) <= 64 * 1024:
+                await reader.readexactly(int(length))
+            else:
+                reusable = False  # Streaming or chunked body: drop the connection instead
+        pool.release(parts.scheme, parts.hostname, port, reader, writer, reusable)
+        return status, headers
+
+
+async def probe_url(pool, url, timeout=PROBE_TIMEOUT):
+    """Check one URL; returns a ProbeResult"""
+    started = time.monotonic()
+    try:
+        scheme = urlsplit(url).scheme.lower()
+        if scheme not in ('http', 'https'):
+            parts = urlsplit(url)
+            port = parts.port or DEFAULT_PORTS.get(scheme)
+            if not parts.hostname or port is None:
+                return ProbeResult(False, 0, 0.0, f'unsupported URL scheme {scheme!r}', time.monotonic())
+            _, writer = await asyncio.wait_for(asyncio.open_connection(parts.hostname, port), timeout)
+            writer.close()
+            return ProbeResult(True, 0, (time.monotonic() - started) * 1000, '', time.monotonic())
+
+        status = 0
+        for _ in range(MAX_REDIRECTS + 1):
+            status, headers = await asyncio.wait_for(_http_request(pool, 'HEAD', url), timeout)
+            if status in (405, 501):
+                # Some stream servers refuse HEAD; ask for a single byte instead
+                status, headers = await asyncio.wait_for(_http_request(pool, 'GET', url), timeout)
+            if status in (301, 302, 303, 307, 308) and headers.get('location'):
+                url = urljoin(url, headers['location'])
+                continue
+            break
+        latency = (time.monotonic() - started) * 1000
+        error = '' if status < 400 else f'HTTP {status}'
+        return ProbeResult(status < 400, status, latency, error, time.monotonic())
+    except asyncio.TimeoutError:
+        return ProbeResult(False, 0, (time.monotonic() - started) * 1000, 'timed out', time.monotonic())
+    except (OSError, ValueError, asyncio.IncompleteReadError, ssl.SSLError) as e:
+        return ProbeResult(False, 0, (time.monotonic() - started) * 1000, str(e) or type(e).__name__,
+                           time.monotonic())
+
+
+async def probe_urls(urls, concurrency=PROBE_CONCURRENCY, timeout=PROBE_TIMEOUT):
+    """Probe urls concurrently over pooled connections; returns {url: ProbeResult}"""
+    pool = ConnectionPool()
+    semaphore = asyncio.Semaphore(concurrency)
+    host_limits = collections.defaultdict(lambda: asyncio.Semaphore(PER_HOST_CONCURRENCY))
+
+    async def one(url):
+        async with semaphore, host_limits[urlsplit(url).netloc]:
+            return url, await probe_url(pool, url, timeout)
+
+    try:
+        return dict(await asyncio.gather(*(one(url) for url in dict.fromkeys(urls))))
+    finally:
+        pool.close()
+
+
+class UrlProber:
+    """Background reachability checks for stream URLs with a TTL result cache
+
+    An asyncio event loop runs on its own thread. request() queues URLs
+    (skipping ones with a fresh result or already queued); concurrency
+    workers take them in order, with at most PER_HOST_CONCURRENCY requests
+    per host and keep-alive connections reused through a ConnectionPool.
+    Results are collected on a queue; notify() is called from the loop
+    thread when it goes from empty to non-empty and the Tk side drains it
+    with poll(). result() answers from the cache, which forgets entries
+    after ttl seconds so they are checked again on the next request().
+    """
+
+    def __init__(self, notify=None, concurrency=PROBE_CONCURRENCY, ttl=RESULT_TTL, timeout=PROBE_TIMEOUT):
+        self.logger = logging.getLogger(__name__)
+        self.notify = notify
+        self.concurrency = concurrency
+        self.ttl = ttl
+        self.timeout = timeout
+
+        self.known = {}  # url -> ProbeResult, readable from the Tk thread
+        self._queued = set()
+        self._results = queue.Queue()
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    def request(self, urls):
+        now = time.monotonic()
+        fresh = []
+        for url in urls:
+            if url in self._queued:
+                continue
+            result = self.known.get(url)
+            if result is not None and now - result.checked < self.ttl:
+                continue
+            self._queued.add(url)
+            fresh.append(url)
+        if fresh:
+            self._ensure_loop()
+            self._loop.call_soon_threadsafe(self._enqueue, fresh)
+
+    def result(self, url):
+        """Cached ProbeResult for url, or None if unknown or expired"""
+        result = self.known.get(url)
+        if result is None or time.monotonic() - result.checked >= self.ttl:
+            return None
+        return result
+
+    def is_dead(self, url):
+        result = self.result(url)
+        return result is not None and not result.alive
+
+    def poll(self):
+        """Drain finished checks on the Tk thread; returns a list of (url, ProbeResult)"""
+        results = []
+        while True:
+            try:
+                url, result = self._results.get_nowait()
+            except queue.Empty:
+                return results
+            self._queued.discard(url)
+            self.known[url] = result
+            results.append((url, result))
+
+    def shutdown(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _ensure_loop(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='url-prober', daemon=True)
+            self._thread.start()
+            self._ready.wait()
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._pending = asyncio.Queue()
+        self._pool = ConnectionPool()
+        self._host_limits = collections.defaultdict(lambda: asyncio.Semaphore(PER_HOST_CONCURRENCY))
+        workers = [loop.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            self._pool.close()
+            loop.run_until_complete(asyncio.gather(*workers, return_exceptions=True))
+            loop.close()
+
+    def _enqueue(self, urls):
+        for url in urls:
+            self._pending.put_nowait(url)
+
+    async def _worker(self):
+        while True:
+            url = await self._pending.get()
+            async with self._host_limits[urlsplit(url).netloc]:
+                result = await probe_url(self._pool, url, self.timeout)
+            if not result.alive:
+                self.logger.info('Stream unreachable: %s (%s)', url, result.error)
+            was_empty = self._results.empty()
+            self._results.put((url, result))
+            if was_empty and self.notify is not None:
+                self.notify()
@@ -0,0 +1,155 @@
+import tkinter as tk
+import tkinter.font as tkfont
+from perf import timed
+
+
+class VirtualListbox(tk.Canvas):
+    """Listbox replacement that only draws the rows currently on screen
+
+    Rows are never stored in the widget. row_count() returns the number of
+    rows in the model and row_text(index) the text of a single row, so the
+    cost of scrolling, selecting and redrawing depends on the widget height
+    rather than the size of the playlist. The selection methods mirror the
+    subset of the tk.Listbox API the playlist panels use.
+
+    on_view_change(top, rows), if given, is called after each redraw with
+    the range of rows on screen.
+    """
+
+    def __init__(self, parent, row_count, row_text, yscrollcommand=None, font=None, on_view_change=None, **kwargs):
+        kwargs.setdefault('background', 'white')
+        kwargs.setdefault('highlightthickness', 0)
+        kwargs.setdefault('width', 150)
+        kwargs.setdefault('height', 150)
+        super().__init__(parent, **kwargs)
+
+        self.row_count = row_count
+        self.row_text = row_text
+        self.yscrollcommand = yscrollcommand
+        self.on_view_change = on_view_change
+        self.font = font or tkfont.nametofont('TkDefaultFont')
+        self.row_height = self.font.metrics('linespace') + 2
+
+        self.top = 0  # Index of the first visible row
+        self.selected = None
+
+        self._redraw_pending = False
+        self._text_items = []
+        self._highlight = self.create_rectangle(0, 0, 0, 0, fill='#3875d7', outline='', state=tk.HIDDEN)
+
+        self.bind('<Configure>', lambda event: self.refresh())
+        self.bind('<Button-1>', self._on_click)
+        self.bind('<MouseWheel>', self._on_mousewheel)
+        self.bind('<Button-4>', lambda event: self.yview_scroll(-3, 'units'))
+        self.bind('<Button-5>', lambda event: self.yview_scroll(3, 'units'))
+
+    def visible_rows(self):
+        """Number of rows that fit fully in the widget"""
+        return max(1, self.winfo_height() // self.row_height)
+
+    def refresh(self):
+        """Schedule a redraw; call after the underlying model changes"""
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.after_idle(self._redraw)
+
+    def yview(self, *args):
+        """Scrollbar command handler (moveto/scroll)"""
+        if not args:
+            return self._fractions()
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * self.row_count()))
+        elif args[0] == 'scroll':
+            self.yview_scroll(int(args[1]), args[2])
+
+    def yview_scroll(self, number, what):
+        step = self.visible_rows() if what == 'pages' else 1
+        self.scroll_to(self.top + number * step)
+
+    def see(self, index):
+        """Scroll so that the given row is visible"""
+        visible = self.visible_rows()
+        if index < self.top:
+            self.scroll_to(index)
+        elif index >= self.top + visible:
+            self.scroll_to(index - visible + 1)
+
+    def nearest(self, y):
+        """Return the row index closest to the given widget y coordinate"""
+        count = self.row_count()
+        if count == 0:
+            return -1
+        return min(count - 1, self.top + max(0, y) // self.row_height)
+
+    def selection_set(self, index):
+        self.selected = index
+        self.refresh()
+
+    def selection_clear(self, first=0, last=None):
+        self.selected = None
+        self.refresh()
+
+    def curselection(self):
+        if self.selected is None or self.selected >= self.row_count():
+            return ()
+        return (self.selected,)
+
+    def scroll_to(self, top):
+        """Make top the first visible row, as far as the row count allows"""
+        count = self.row_count()
+        top = min(top, count - self.visible_rows())
+        top = max(0, top)
+        if top != self.top:
+            self.top = top
+            self.refresh()
+
+    def _fractions(self):
+        count = self.row_count()
+        if count == 0:
+            return 0.0, 1.0
+        first = self.top / count
+        last = min(1.0, (self.top + self.visible_rows()) / count)
+        return first, last
+
+    @timed('virtual_list.redraw')
+    def _redraw(self):
+        self._redraw_pending = False
+        count = self.row_count()
+
+        # Model may have shrunk since the last draw
+        self.top = max(0, min(self.top, count - self.visible_rows()))
+
+        # One spare row so a partially visible last row is still drawn
+        rows = min(self.visible_rows() + 1, max(0, count - self.top))
+        while len(self._text_items) < rows:
+            self._text_items.append(self.create_text(4, 0, anchor=tk.NW, font=self.font))
+
+        for offset, item in enumerate(self._text_items):
+            if offset >= rows:
+                self.itemconfigure(item, state=tk.HIDDEN)
+                continue
+            index = self.top + offset
+            fill = 'white' if index == self.selected else 'black'
+            self.coords(item, 4, offset * self.row_height + 1)
+            self.itemconfigure(item, text=self.row_text(index), fill=fill, state=tk.NORMAL)
+
+        if self.selected is not None and self.top <= self.selected < self.top + rows:
+            y = (self.selected - self.top) * self.row_height
+            self.coords(self._highlight, 0, y, self.winfo_width(), y + self.row_height)
+            self.itemconfigure(self._highlight, state=tk.NORMAL)
+        else:
+            self.itemconfigure(self._highlight, state=tk.HIDDEN)
+
+        if self.yscrollcommand is not None:
+            self.yscrollcommand(*self._fractions())
+        if self.on_view_change is not None and rows:
+            self.on_view_change(self.top, rows)
+
+    def _on_click(self, event):
+        index = self.nearest(event.y)
+        if index >= 0:
+            self.selection_set(index)
+        self.focus_set()
+
+    def _on_mousewheel(self, event):
+        self.yview_scroll(-3 if event.delta > 0 else 3, 'units')
@@ -0,0 +1,108 @@
+import os
+import json
+import logging
+from app_paths import data_path
+
+CONFIG_NAME = 'vlc_profiles.json'
+
+# Options switched off in every built-in profile: Lua extensions and playlist scripts,
+# on-screen title, subtitle file probing and online metadata fetching
+_LEAN = ['lua', 'video-title-show', 'sub-autodetect-file', 'metadata-network-access']
+
+DEFAULT_PROFILES = {
+    'local': {
+        'description': 'Low-latency local files',
+        'file_caching': 150,
+        'network_caching': 1000,
+        'avcodec_threads': 2,  # Fewer frame threads, less decode delay
+        'skip_frames': True,
+        'drop_late_frames': True,
+        'disable': _LEAN,
+    },
+    'network': {
+        'description': 'Network streams',
+        'file_caching': 300,
+        'network_caching': 3000,
+        'avcodec_threads': 0,
+        'skip_frames': True,
+        'drop_late_frames': True,
+        'disable': _LEAN,
+    },
+    '4k-software': {
+        'description': 'High-bitrate 4K, software decode',
+        'file_caching': 1000,
+        'network_caching': 3000,
+        'avcodec_threads': 0,  # One per core
+        'avcodec_hw': 'none',
+        'skip_frames': True,
+        'drop_late_frames': True,
+        'disable': _LEAN,
+        'extra_args': ['--avcodec-skiploopfilter=4', '--avcodec-fast'],
+    },
+}
+DEFAULT_PROFILE = 'local'
+
+
+def profile_args(profile):
+    """libvlc command-line arguments for a profile dict"""
+    args = ['--quiet']
+    if 'file_caching' in profile:
+        args.append(f"--file-caching={int(profile['file_caching'])}")
+    if 'network_caching' in profile:
+        args.append(f"--network-caching={int(profile['network_caching'])}")
+    if 'avcodec_threads' in profile:
+        args.append(f"--avcodec-threads={int(profile['avcodec_threads'])}")
+    if 'avcodec_hw' in profile:
+        args.append(f"--avcodec-hw={profile['avcodec_hw']}")
+    for option in ('skip_frames', 'drop_late_frames'):
+        if option in profile:
+            name = option.replace('_', '-')
+            args.append(f'--{name}' if profile[option] else f'--no-{name}')
+    args.extend(f'--no-{name}' for name in profile.get('disable', ()))
+    args.extend(profile.get('extra_args', ()))
+    return args
+
+
+class ProfileConfig:
+    """Named libvlc instance profiles, read from vlc_profiles.json in the data dir
+
+    The file holds {"active": name, "profiles": {name: {...}}}; it is written
+    with the built-in profiles on first use so they can be edited there.
+    Profiles in the file replace built-in ones of the same name. A file that
+    cannot be read falls back to the built-ins.
+    """
+
+    def __init__(self, path=None):
+        self.logger = logging.getLogger(__name__)
+        self.path = path or data_path(CONFIG_NAME)
+        self.profiles = dict(DEFAULT_PROFILES)
+        self.active = DEFAULT_PROFILE
+        self._load()
+
+    def args(self, name=None):
+        """Instance arguments of the named profile (the active one by default)"""
+        name = name or self.active
+        profile = self.profiles.get(name)
+        if not isinstance(profile, dict):
+            self.logger.warning('Unknown VLC profile %r, using %r', name, DEFAULT_PROFILE)
+            profile = self.profiles[DEFAULT_PROFILE]
+        return profile_args(profile)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            self._write_defaults()
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            self.profiles.update(config.get('profiles', {}))
+            self.active = config.get('active', DEFAULT_PROFILE)
+        except (OSError, ValueError, AttributeError) as e:
+            self.logger.error('Could not read VLC profiles from %s, using the built-in ones: %s', self.path, e)
+
+    def _write_defaults(self):
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump({'active': self.active, 'profiles': DEFAULT_PROFILES}, f, indent=2)
+        except OSError as e:
+            self.logger.warning('Could not write %s: %s', self.path, e)